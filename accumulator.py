@@ -0,0 +1,225 @@
+"""
+Incremental meeting analytics: ingest diarization turns, transcript
+segments and sentiment results as they arrive and read current metrics
+at any moment.
+"""
+
+from bisect import bisect_right
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.alignment import segment_word_counts
+from core.bias_detection import INTERRUPTION_GAP_S
+from core.metrics import fairness_from_aggregates
+
+# Turn entry layout: [start, end, speaker, interrupted_speaker_or_None]
+_START, _END, _SPEAKER, _TARGET = 0, 1, 2, 3
+
+
+class MeetingAccumulator:
+    """
+    Stateful equivalent of analyze_bias + compute_fairness_metrics.
+
+    Turns ingested in start order cost O(1) each and reading the metrics
+    costs O(speakers), never a rescan of history. For the same turns and
+    sentiment segments the output is identical to the batch functions
+    (batches passed to ``add_turns`` are stably sorted first, like
+    ``analyze_bias``). A turn that starts before the latest ingested one
+    is inserted in place (O(log n) search plus a list insert); totals then
+    match the batch result up to float summation order. Word counts and
+    per-speaker sentiment need speaker-attributed segments (see
+    core.alignment).
+
+    With ``window_s`` set, only turns and transcript/sentiment segments
+    starting in the last ``window_s`` seconds (relative to the latest end
+    time seen) are counted, e.g. ``MeetingAccumulator(window_s=300)`` for
+    "last 5 minutes".
+    """
+
+    def __init__(self, window_s: Optional[float] = None, min_gap: float = INTERRUPTION_GAP_S):
+        self.window_s = window_s
+        self.min_gap = min_gap
+        self.reset()
+
+    def reset(self) -> None:
+        self.speakers = set()
+        self.talk_times: Dict[str, float] = {}
+        self.interruptions: Dict[str, int] = {}
+        self.interruption_pairs: Dict[Tuple[str, str], int] = {}
+        self.pos_count = 0
+        self.neg_count = 0
+        self.segment_count = 0
+        self.speaker_sentiment: Dict[str, List[int]] = {}  # [pos, neg, total]
+        self.word_counts: Dict[str, int] = {}
+        self.latest_time = 0.0
+        self._turns: List[List[Any]] = []
+        self._head = 0  # turns before this index have left the window
+        self._turn_counts: Dict[str, int] = {}
+        self._sentiments: deque = deque()
+        self._words: deque = deque()
+
+    # ---- diarization ----
+
+    def add_turn(self, turn: Dict) -> None:
+        """Ingest one diarization turn {'speaker', 'start', 'end'}."""
+        entry = [turn["start"], turn["end"], turn["speaker"], None]
+        spk = entry[_SPEAKER]
+        self.talk_times[spk] = self.talk_times.get(spk, 0) + (entry[_END] - entry[_START])
+        self.speakers.add(spk)
+        self._turn_counts[spk] = self._turn_counts.get(spk, 0) + 1
+
+        turns = self._turns
+        if len(turns) == self._head or entry[_START] >= turns[-1][_START]:
+            prev = turns[-1] if len(turns) > self._head else None
+            turns.append(entry)
+            if prev is not None:
+                self._link(prev, entry)
+        else:
+            pos = bisect_right(turns, entry[_START], lo=self._head, key=lambda t: t[_START])
+            nxt = turns[pos]
+            self._unlink(nxt)
+            turns.insert(pos, entry)
+            if pos > self._head:
+                self._link(turns[pos - 1], entry)
+            self._link(entry, nxt)
+
+        self._advance(entry[_END])
+
+    def add_turns(self, turns: Iterable[Dict]) -> None:
+        """Ingest a batch of turns (stably sorted by start first)."""
+        for turn in sorted(turns, key=lambda seg: seg["start"]):
+            self.add_turn(turn)
+
+    # ---- transcript ----
+
+    def add_segment(self, seg: Dict) -> None:
+        """Ingest one speaker-attributed transcript segment (word counts)."""
+        counts = segment_word_counts(seg)
+        self._count_words(counts, +1)
+        if self.window_s is not None:
+            self._words.append((seg.get("start", 0), counts))
+        self._advance(seg.get("end", 0))
+
+    def add_segments(self, segs: Iterable[Dict]) -> None:
+        for seg in segs:
+            self.add_segment(seg)
+
+    # ---- sentiment ----
+
+    def add_sentiment(self, seg: Dict) -> None:
+        """Ingest one per_segment sentiment result."""
+        label, spk = seg.get("label"), seg.get("speaker")
+        self._count_sentiment(label, spk, +1)
+        if self.window_s is not None:
+            self._sentiments.append((seg.get("start", 0), label, spk))
+        self._advance(seg.get("end", 0))
+
+    def add_sentiments(self, segs: Iterable[Dict]) -> None:
+        for seg in segs:
+            self.add_sentiment(seg)
+
+    # ---- results ----
+
+    def interactions(self) -> Dict[str, Any]:
+        """Current state in the analyze_bias result format."""
+        return {
+            "speakers": set(self.speakers),
+            "talk_times": dict(self.talk_times),
+            "interruptions": dict(self.interruptions),
+            "interruption_pairs": dict(self.interruption_pairs),
+            "word_counts": dict(self.word_counts),
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        """Current metrics in the compute_fairness_metrics result format."""
+        return fairness_from_aggregates(
+            self.speakers,
+            dict(self.talk_times),
+            self.interruptions,
+            self.pos_count,
+            self.neg_count,
+            self.segment_count,
+            {spk: tuple(c) for spk, c in self.speaker_sentiment.items()},
+            dict(self.word_counts),
+        )
+
+    # ---- internals ----
+
+    def _link(self, prev: List[Any], cur: List[Any]) -> None:
+        gap = cur[_START] - prev[_END]
+        if 0 <= gap < self.min_gap and prev[_SPEAKER] != cur[_SPEAKER]:
+            cur[_TARGET] = prev[_SPEAKER]
+            self._count_interruption(cur[_SPEAKER], prev[_SPEAKER], +1)
+
+    def _unlink(self, cur: List[Any]) -> None:
+        if cur[_TARGET] is not None:
+            self._count_interruption(cur[_SPEAKER], cur[_TARGET], -1)
+            cur[_TARGET] = None
+
+    def _count_interruption(self, inter: str, target: str, delta: int) -> None:
+        key = (inter, target)
+        for counts, k in ((self.interruptions, inter), (self.interruption_pairs, key)):
+            value = counts.get(k, 0) + delta
+            if value:
+                counts[k] = value
+            else:
+                del counts[k]
+
+    def _count_sentiment(self, label: Optional[str], spk: Optional[str], delta: int) -> None:
+        self.segment_count += delta
+        if label == "POSITIVE":
+            self.pos_count += delta
+        elif label == "NEGATIVE":
+            self.neg_count += delta
+
+        if spk is None:
+            return
+        counts = self.speaker_sentiment.setdefault(spk, [0, 0, 0])
+        counts[0] += delta * (label == "POSITIVE")
+        counts[1] += delta * (label == "NEGATIVE")
+        counts[2] += delta
+        if not counts[2]:
+            del self.speaker_sentiment[spk]
+
+    def _count_words(self, counts: Dict[str, int], delta: int) -> None:
+        for spk, n in counts.items():
+            value = self.word_counts.get(spk, 0) + delta * n
+            if value:
+                self.word_counts[spk] = value
+            else:
+                del self.word_counts[spk]
+
+    def _advance(self, time: float) -> None:
+        if time > self.latest_time:
+            self.latest_time = time
+        if self.window_s is not None:
+            self._evict(self.latest_time - self.window_s)
+
+    def _evict(self, cutoff: float) -> None:
+        turns = self._turns
+        while self._head < len(turns) and turns[self._head][_START] < cutoff:
+            old = turns[self._head]
+            self._unlink(old)
+            self._head += 1
+            if self._head < len(turns):
+                self._unlink(turns[self._head])
+
+            spk = old[_SPEAKER]
+            self._turn_counts[spk] -= 1
+            if self._turn_counts[spk]:
+                self.talk_times[spk] -= old[_END] - old[_START]
+            else:
+                del self._turn_counts[spk]
+                del self.talk_times[spk]
+                self.speakers.discard(spk)
+
+        # Compact once evicted entries dominate the list
+        if self._head > 1024 and self._head * 2 > len(turns):
+            del turns[:self._head]
+            self._head = 0
+
+        while self._sentiments and self._sentiments[0][0] < cutoff:
+            _, label, spk = self._sentiments.popleft()
+            self._count_sentiment(label, spk, -1)
+        while self._words and self._words[0][0] < cutoff:
+            self._count_words(self._words.popleft()[1], -1)
@@ -0,0 +1,123 @@
+"""
+Speaker attribution: join Whisper segments (or words) with diarization
+turns by maximum temporal overlap.
+"""
+
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from core.segments import SegmentTable, as_table
+
+Turns = Union[List[Dict], SegmentTable]
+
+
+def assign_speakers(items: List[Dict], diarization: Turns) -> List[Optional[str]]:
+    """
+    Speaker with the largest total overlap for each item.
+
+    Items and turns are both walked in start order with a moving lower
+    bound on the turns, so the join costs O(n log n + m log m) for the
+    sorts plus O(n + m) for typical non-nested diarization, not O(n·m).
+    Zero-length items (e.g. some word timestamps) take the speaker of a
+    turn containing their start.
+
+    Args:
+        items: Dicts with 'start' and 'end'
+        diarization: [{'speaker', 'start', 'end'}, ...] or a SegmentTable
+
+    Returns:
+        Speaker label per item (None where no turn overlaps)
+    """
+    order = sorted(range(len(items)), key=lambda i: items[i]["start"])
+    table = as_table(diarization)
+    by_start = np.argsort(table.starts, kind="stable")
+    t_starts = table.starts[by_start].tolist()
+    t_ends = table.ends[by_start].tolist()
+    t_speakers = [table.labels[code] for code in table.codes[by_start].tolist()]
+    m = len(t_starts)
+    speakers: List[Optional[str]] = [None] * len(items)
+
+    lo = 0
+    for i in order:
+        start, end = items[i]["start"], items[i]["end"]
+        # Turns ending before this item also end before every later one
+        while lo < m and t_ends[lo] <= start and t_ends[lo] < end:
+            lo += 1
+
+        scores: Dict[str, float] = {}
+        k = lo
+        while k < m and t_starts[k] <= end:
+            if end > start:
+                shared = min(end, t_ends[k]) - max(start, t_starts[k])
+                if shared > 0:
+                    scores[t_speakers[k]] = scores.get(t_speakers[k], 0.0) + shared
+            elif t_starts[k] <= start < t_ends[k]:
+                scores.setdefault(t_speakers[k], 0.0)
+                break
+            k += 1
+
+        if scores:
+            speakers[i] = max(scores, key=scores.get)
+    return speakers
+
+
+def align_transcript(
+    transcript: Dict[str, Any], diarization: Turns, words: bool = True
+) -> Dict[str, Any]:
+    """
+    Copy of ``transcript`` whose segments carry a 'speaker' key.
+
+    When ``words`` is set and segments have Whisper word timestamps, each
+    word is attributed too.
+    """
+    segments = transcript.get("segments", [])
+    diarization = as_table(diarization)
+    labels = assign_speakers(segments, diarization)
+    aligned = [dict(seg, speaker=spk) for seg, spk in zip(segments, labels)]
+
+    if words:
+        flat = [(i, w) for i, seg in enumerate(aligned) for w in seg.get("words") or []]
+        if flat:
+            word_labels = assign_speakers([w for _, w in flat], diarization)
+            per_segment: Dict[int, List[Dict]] = {}
+            for (i, w), spk in zip(flat, word_labels):
+                per_segment.setdefault(i, []).append(dict(w, speaker=spk))
+            for i, seg_words in per_segment.items():
+                aligned[i]["words"] = seg_words
+
+    return dict(transcript, segments=aligned)
+
+
+def align_sentiments(sentiments: Dict, diarization: Turns) -> Dict:
+    """Copy of analyze_sentiment output whose per_segment entries carry 'speaker'."""
+    per_segment = sentiments.get("per_segment", [])
+    labels = assign_speakers(per_segment, diarization)
+    return dict(sentiments, per_segment=[
+        dict(seg, speaker=spk) for seg, spk in zip(per_segment, labels)
+    ])
+
+
+def segment_word_counts(seg: Dict) -> Dict[str, int]:
+    """Words per speaker in one aligned segment (word-level when available)."""
+    counts: Dict[str, int] = {}
+    seg_words = seg.get("words")
+    if seg_words and any("speaker" in w for w in seg_words):
+        for w in seg_words:
+            spk = w.get("speaker") or seg.get("speaker")
+            if spk is not None and w.get("word", "").strip():
+                counts[spk] = counts.get(spk, 0) + 1
+    elif seg.get("speaker") is not None:
+        n = len(seg.get("text", "").split())
+        if n:
+            counts[seg["speaker"]] = n
+    return counts
+
+
+def word_counts(aligned_transcript: Dict[str, Any]) -> Dict[str, int]:
+    """Total words per speaker over an aligned transcript."""
+    totals: Dict[str, int] = {}
+    for seg in aligned_transcript.get("segments", []):
+        for spk, n in segment_word_counts(seg).items():
+            totals[spk] = totals.get(spk, 0) + n
+    return totals
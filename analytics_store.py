@@ -0,0 +1,434 @@
+"""
+Cross-meeting analytics store: one SQLite row per analysed meeting and per
+speaker, indexed on meeting date, team and speaker, so history queries
+aggregate in SQL instead of re-reading report files. Existing reports can
+be backfilled with:
+
+    python -m utils.analytics_store data/processed/batch --team platform
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.config import ANALYTICS_DB, THRESHOLDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    id INTEGER PRIMARY KEY,
+    meeting_id TEXT NOT NULL UNIQUE,
+    date TEXT NOT NULL,                 -- ISO date of the meeting
+    team TEXT NOT NULL DEFAULT '',
+    title TEXT,
+    source TEXT,
+    audio_hash TEXT,
+    duration_s REAL,
+    profile TEXT,
+    mode TEXT,                          -- pipeline, streaming or batch
+    n_speakers INTEGER,
+    fairness_score REAL,
+    dominance_ratio REAL,
+    interruption_index REAL,
+    sentiment_balance REAL,             -- NULL when sentiment was skipped
+    sentiment_skipped INTEGER NOT NULL DEFAULT 0,
+    recorded_at REAL NOT NULL
+);
+-- Covering indexes: team and trend aggregates read only the index, never the rows
+CREATE INDEX IF NOT EXISTS meetings_date ON meetings (
+    date, team, fairness_score, dominance_ratio, interruption_index, sentiment_balance
+);
+CREATE INDEX IF NOT EXISTS meetings_team_date ON meetings (
+    team, date, fairness_score, dominance_ratio, interruption_index, sentiment_balance
+);
+
+-- One row per speaker per meeting; date and team are copied from the meeting
+-- so speaker aggregates need no join
+CREATE TABLE IF NOT EXISTS speakers (
+    meeting INTEGER NOT NULL REFERENCES meetings (id) ON DELETE CASCADE,
+    date TEXT NOT NULL,
+    team TEXT NOT NULL,
+    speaker TEXT NOT NULL,
+    talk_time REAL,
+    talk_share REAL,
+    interruptions INTEGER,
+    words INTEGER,
+    wpm REAL,
+    sentiment REAL
+);
+CREATE INDEX IF NOT EXISTS speakers_speaker ON speakers (
+    speaker, date, team, talk_time, talk_share, interruptions, wpm, sentiment
+);
+CREATE INDEX IF NOT EXISTS speakers_team_date ON speakers (team, date);
+CREATE INDEX IF NOT EXISTS speakers_meeting ON speakers (meeting);
+"""
+
+MEETING_COLUMNS = (
+    "meeting_id", "date", "team", "title", "source", "audio_hash", "duration_s", "profile",
+    "mode", "n_speakers", "fairness_score", "dominance_ratio", "interruption_index", "sentiment_balance",
+    "sentiment_skipped", "recorded_at",
+)
+
+# Planner statistics are refreshed each time the meetings table doubles past this size
+ANALYZE_MIN_MEETINGS = 1024
+
+# Period expressions for trend(); dates are stored as YYYY-MM-DD
+PERIODS = {
+    "day": "date",
+    "week": "date(date, '-6 days', 'weekday 1')",  # Monday starting the week
+    "month": "substr(date, 1, 7)",
+    "quarter": "substr(date, 1, 4) || '-Q' || ((CAST(substr(date, 6, 2) AS INTEGER) + 2) / 3)",
+}
+
+
+def _iso_date(date: Optional[Any]) -> str:
+    if date is None:
+        return datetime.date.today().isoformat()
+    if isinstance(date, (datetime.date, datetime.datetime)):
+        return date.strftime("%Y-%m-%d")
+    return datetime.date.fromisoformat(str(date)[:10]).isoformat()
+
+
+def meeting_rows(
+    metrics: Dict[str, Any],
+    interactions: Optional[Dict[str, Any]] = None,
+    **info: Any,
+) -> Dict[str, Any]:
+    """
+    The meeting row and speaker rows for one compute_fairness_metrics
+    result (plus analyze_bias output for interruptions and word counts;
+    without it, speakers' interruptions are stored as NULL, i.e. unknown).
+    ``info`` supplies meeting_id, date, team, title, source, audio_hash,
+    duration_s, profile, mode (how it was analysed: pipeline, streaming
+    or batch) and speaker_names ({label: person}, from speaker
+    re-identification; unnamed speakers keep their meeting label).
+    """
+    talk_times = metrics.get("talk_times", {})
+    total_talk = sum(talk_times.values()) or 1.0
+    interruptions = (interactions or {}).get("interruptions", {})
+    words = (interactions or {}).get("word_counts") or {}
+    wpm = metrics.get("speaking_rate_wpm", {})
+    sentiment = metrics.get("speaker_sentiment", {})
+    names = info.get("speaker_names") or {}
+
+    meeting = {
+        "meeting_id": info.get("meeting_id") or uuid.uuid4().hex[:16],
+        "date": _iso_date(info.get("date")),
+        "team": info.get("team") or "",
+        "title": info.get("title"),
+        "source": info.get("source"),
+        "audio_hash": info.get("audio_hash"),
+        "duration_s": info.get("duration_s"),
+        "profile": info.get("profile"),
+        "mode": info.get("mode"),
+        "n_speakers": len(metrics.get("speakers", talk_times)),
+        "fairness_score": metrics.get("fairness_score"),
+        "dominance_ratio": metrics.get("dominance_ratio"),
+        "interruption_index": metrics.get("interruption_index"),
+        "sentiment_balance": metrics.get("sentiment_balance"),
+        "sentiment_skipped": int(bool(metrics.get("sentiment_skipped"))),
+        "recorded_at": time.time(),
+    }
+    speakers = [
+        {
+            "speaker": names.get(spk) or spk,
+            "talk_time": talk,
+            "talk_share": talk / total_talk,
+            "interruptions": interruptions.get(spk, 0) if interactions is not None else None,
+            "words": words.get(spk),
+            "wpm": wpm.get(spk),
+            "sentiment": sentiment.get(spk),
+        }
+        for spk, talk in talk_times.items()
+    ]
+    return {"meeting": meeting, "speakers": speakers}
+
+
+class AnalyticsStore:
+    """
+    SQLite store of meeting and per-speaker fairness metrics.
+
+    Each thread gets its own connection; the database runs in WAL mode so
+    dashboard reads never block the analyses writing to it, and several
+    processes (batch workers) can append concurrently. Recording a
+    meeting_id again replaces that meeting.
+    """
+
+    def __init__(self, path: str = ANALYTICS_DB):
+        self.path = path
+        self._local = threading.local()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Older stores lack the sentiment-skipped flag and the analysis mode
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(meetings)")}
+            if "sentiment_skipped" not in columns:
+                conn.execute("ALTER TABLE meetings ADD COLUMN sentiment_skipped INTEGER NOT NULL DEFAULT 0")
+            if "mode" not in columns:
+                conn.execute("ALTER TABLE meetings ADD COLUMN mode TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # ---- writes ----
+
+    def record_meeting(self, metrics: Dict[str, Any], interactions: Optional[Dict[str, Any]] = None,
+                       **info: Any) -> str:
+        """Store one analysed meeting (see meeting_rows for ``info``). Returns its meeting_id."""
+        rows = meeting_rows(metrics, interactions, **info)
+        self.record_many([rows])
+        return rows["meeting"]["meeting_id"]
+
+    def record_many(self, rows: Iterable[Dict[str, Any]], replace: bool = True) -> int:
+        """
+        Store meeting_rows() results in one transaction. Without ``replace``,
+        meetings already recorded are kept and their rows skipped. Returns
+        the count stored.
+        """
+        conn = self._connect()
+        placeholders = ", ".join("?" * len(MEETING_COLUMNS))
+        count = 0
+        before = self._last_id()
+        with conn:
+            for row in rows:
+                meeting = row["meeting"]
+                if not replace and conn.execute(
+                    "SELECT 1 FROM meetings WHERE meeting_id = ?", (meeting["meeting_id"],)
+                ).fetchone():
+                    continue
+                conn.execute("DELETE FROM meetings WHERE meeting_id = ?", (meeting["meeting_id"],))
+                cursor = conn.execute(
+                    f"INSERT INTO meetings ({', '.join(MEETING_COLUMNS)}) VALUES ({placeholders})",
+                    [meeting[column] for column in MEETING_COLUMNS],
+                )
+                conn.executemany(
+                    "INSERT INTO speakers (meeting, date, team, speaker, talk_time, talk_share, "
+                    "interruptions, words, wpm, sentiment) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (cursor.lastrowid, meeting["date"], meeting["team"], s["speaker"], s["talk_time"],
+                         s["talk_share"], s["interruptions"], s["words"], s["wpm"], s["sentiment"])
+                        for s in row["speakers"]
+                    ],
+                )
+                count += 1
+        after = self._last_id()
+        if after >= ANALYZE_MIN_MEETINGS and after.bit_length() > before.bit_length():
+            self.optimize()
+        return count
+
+    def _last_id(self) -> int:
+        # Ids only grow, so this tracks table growth without a COUNT(*)
+        return self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM meetings").fetchone()[0]
+
+    def optimize(self) -> None:
+        """Refresh the query planner's statistics (run automatically as the store grows)."""
+        conn = self._connect()
+        conn.execute("ANALYZE")
+        conn.commit()
+
+    def import_reports(self, paths: Sequence[str], team: str = "") -> int:
+        """
+        Backfill from JSON reports written by batch.py or the dashboard
+        (metrics plus optional 'source', 'meeting_id' and per-speaker
+        'interruptions'). Meetings already in the store are kept, since
+        they were recorded from the full analysis. The date is the
+        recording's mtime, as batch.py records it, or the report's when
+        the recording is gone.
+        """
+        rows = []
+        for path in paths:
+            try:
+                with open(path, "r") as f:
+                    report = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if "fairness_score" not in report:
+                continue
+            source = report.get("source", path)
+            dated = source if os.path.exists(source) else path
+            # Reports before interruptions were saved: leave them unknown rather than 0
+            interactions = (
+                {"interruptions": report["interruptions"], "word_counts": report.get("word_counts")}
+                if "interruptions" in report else None
+            )
+            rows.append(meeting_rows(
+                report, interactions,
+                meeting_id=report.get("meeting_id") or f"file:{os.path.abspath(source)}",
+                date=datetime.date.fromtimestamp(os.path.getmtime(dated)),
+                team=team,
+                title=os.path.basename(source),
+                speaker_names={label: match["name"] for label, match in report.get("speaker_ids", {}).items()
+                               if match.get("name")},
+                source=source,
+                duration_s=report.get("audio_duration_s"),
+                profile=(report.get("schedule") or {}).get("plan", {}).get("profile"),
+            ))
+        return self.record_many(rows, replace=False)
+
+    def rename_speakers(self, meeting_id: str, names: Dict[str, str]) -> int:
+        """Relabel a recorded meeting's speakers ({recorded name: person}). Returns the rows changed."""
+        conn = self._connect()
+        with conn:
+            return sum(
+                conn.execute(
+                    "UPDATE speakers SET speaker = ? WHERE speaker = ? AND meeting = "
+                    "(SELECT id FROM meetings WHERE meeting_id = ?)",
+                    (name, label, meeting_id),
+                ).rowcount
+                for label, name in names.items() if name
+            )
+
+    def delete_meeting(self, meeting_id: str) -> bool:
+        conn = self._connect()
+        with conn:
+            return conn.execute("DELETE FROM meetings WHERE meeting_id = ?", (meeting_id,)).rowcount > 0
+
+    # ---- queries ----
+
+    @staticmethod
+    def _filters(start: Optional[Any], end: Optional[Any], teams: Optional[Sequence[str]],
+                 prefix: str = "") -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f"{prefix}date >= ?")
+            params.append(_iso_date(start))
+        if end is not None:
+            clauses.append(f"{prefix}date <= ?")
+            params.append(_iso_date(end))
+        if teams:
+            clauses.append(f"{prefix}team IN ({', '.join('?' * len(teams))})")
+            params.extend(teams)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._connect().execute(sql, params)]
+
+    def meetings(self, start: Optional[Any] = None, end: Optional[Any] = None,
+                 teams: Optional[Sequence[str]] = None, max_fairness: Optional[float] = None,
+                 speaker: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Meetings in a date range, newest first, optionally below a fairness score or with a speaker."""
+        where, params = self._filters(start, end, teams, "m.")
+        extra = []
+        if max_fairness is not None:
+            extra.append("m.fairness_score < ?")
+            params.append(max_fairness)
+        if speaker is not None:
+            extra.append("m.id IN (SELECT meeting FROM speakers WHERE speaker = ?)")
+            params.append(speaker)
+        if extra:
+            where += (" AND " if where else " WHERE ") + " AND ".join(extra)
+        return self._query(
+            f"SELECT m.* FROM meetings m{where} ORDER BY m.date DESC, m.id DESC LIMIT ?",
+            params + [limit],
+        )
+
+    def team_summary(self, start: Optional[Any] = None, end: Optional[Any] = None,
+                     teams: Optional[Sequence[str]] = None,
+                     low_fairness: float = THRESHOLDS["fairness_low"]) -> List[Dict[str, Any]]:
+        """
+        Per team: meetings, mean fairness / dominance / interruption /
+        sentiment (over meetings where sentiment ran), and how many meetings
+        scored below ``low_fairness``.
+        """
+        where, params = self._filters(start, end, teams)
+        return self._query(
+            "SELECT team, COUNT(*) AS meetings, AVG(fairness_score) AS fairness_score, "
+            "MIN(fairness_score) AS min_fairness, AVG(dominance_ratio) AS dominance_ratio, "
+            "AVG(interruption_index) AS interruption_index, AVG(sentiment_balance) AS sentiment_balance, "
+            "SUM(fairness_score < ?) AS low_fairness_meetings "
+            f"FROM meetings{where} GROUP BY team ORDER BY fairness_score",
+            [low_fairness] + params,
+        )
+
+    def speaker_summary(self, start: Optional[Any] = None, end: Optional[Any] = None,
+                        teams: Optional[Sequence[str]] = None, speaker: Optional[str] = None,
+                        limit: int = 100) -> List[Dict[str, Any]]:
+        """Per speaker: meetings, total and mean share of talk time, interruptions, words/min, sentiment."""
+        where, params = self._filters(start, end, teams)
+        if speaker is not None:
+            where += (" AND " if where else " WHERE ") + "speaker = ?"
+            params.append(speaker)
+        return self._query(
+            "SELECT speaker, COUNT(*) AS meetings, SUM(talk_time) AS talk_time, "
+            "AVG(talk_share) AS talk_share, SUM(interruptions) AS interruptions, "
+            "AVG(wpm) AS wpm, AVG(sentiment) AS sentiment "
+            f"FROM speakers{where} GROUP BY speaker ORDER BY talk_time DESC LIMIT ?",
+            params + [limit],
+        )
+
+    def trend(self, period: str = "week", start: Optional[Any] = None, end: Optional[Any] = None,
+              teams: Optional[Sequence[str]] = None, by_team: bool = False) -> List[Dict[str, Any]]:
+        """Mean fairness score and meeting count per day / week / month / quarter."""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+        where, params = self._filters(start, end, teams)
+        group = "period, team" if by_team else "period"
+        team_column = "team, " if by_team else ""
+        return self._query(
+            f"SELECT {PERIODS[period]} AS period, {team_column}COUNT(*) AS meetings, "
+            f"AVG(fairness_score) AS fairness_score FROM meetings{where} "
+            f"GROUP BY {group} ORDER BY {group}",
+            params,
+        )
+
+    def teams(self) -> List[str]:
+        return [row["team"] for row in self._query("SELECT DISTINCT team FROM meetings ORDER BY team")]
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM meetings").fetchone()[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_store: Optional[AnalyticsStore] = None
+_store_lock = threading.Lock()
+
+
+def get_analytics_store() -> AnalyticsStore:
+    """Process-wide store at ANALYTICS_DB."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AnalyticsStore()
+    return _store
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Backfill the analytics store from JSON fairness reports.")
+    parser.add_argument("reports", nargs="+", help="report files or directories of reports")
+    parser.add_argument("--team", default="", help="team recorded with the imported meetings")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for path in args.reports:
+        if os.path.isdir(path):
+            paths += sorted(glob.glob(os.path.join(path, "**", "*.json"), recursive=True))
+        else:
+            paths.append(path)
+    store = get_analytics_store()
+    print(f"📥 Imported {store.import_reports(paths, args.team)} of {len(paths)} reports "
+          f"({store.count()} meetings in {store.path})")
+
+
+if __name__ == "__main__":
+    main()
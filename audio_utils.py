@@ -1,21 +1,233 @@
 """
 Audio preprocessing and file handling utilities.
+librosa is imported inside the functions that decode or resample.
 """
 
 import os
-import librosa
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
 import soundfile as sf
-from utils.config import PROCESSED_DIR
+from utils.config import (
+    PROCESSED_DIR,
+    STREAM_WINDOW_S,
+    STREAM_OVERLAP_S,
+    VAD_TOP_DB,
+    VAD_MIN_SPEECH_S,
+    VAD_MIN_SILENCE_S,
+    VAD_PAD_S,
+)
 
+TARGET_SR = 16000
 
-def preprocess_audio(audio_path: str) -> str:
+
+def preprocess_audio(audio_path: str, out_path: Optional[str] = None) -> str:
     """
-    Converts input audio to mono 16kHz WAV and saves to processed dir.
-    Returns processed audio path.
+    Converts input audio to mono 16kHz WAV, written to ``out_path`` or to
+    a new file in the processed dir (unique per call, so concurrent runs
+    don't overwrite each other). Returns the WAV path; the caller owns the
+    file and must delete it, or use preprocessed_audio to have it removed.
+    Prefer load_audio, which skips the WAV round trip.
     """
-    os.makedirs(PROCESSED_DIR, exist_ok=True)
-    y, sr = librosa.load(audio_path, sr=16000, mono=True)
-    out_path = os.path.join(PROCESSED_DIR, "processed.wav")
-    sf.write(out_path, y, 16000)
+    y = load_audio(audio_path)
+    if out_path is None:
+        os.makedirs(PROCESSED_DIR, exist_ok=True)
+        fd, out_path = tempfile.mkstemp(prefix="processed_", suffix=".wav", dir=PROCESSED_DIR)
+        os.close(fd)
+    sf.write(out_path, y, TARGET_SR)
     return out_path
 
+
+@contextmanager
+def preprocessed_audio(audio_path: str) -> Iterator[str]:
+    """preprocess_audio for the duration of a ``with`` block; the WAV is deleted afterwards."""
+    out_path = preprocess_audio(audio_path)
+    try:
+        yield out_path
+    finally:
+        try:
+            os.remove(out_path)
+        except OSError:
+            pass
+
+
+def load_audio(audio_path: str) -> np.ndarray:
+    """
+    Decode and resample to a single mono 16kHz float32 buffer.
+    Whisper and pyannote consume this array directly, so the file is
+    decoded once per meeting.
+    """
+    import librosa
+    y, _ = librosa.load(audio_path, sr=TARGET_SR, mono=True)
+    return np.ascontiguousarray(y, dtype=np.float32)
+
+
+def load_audio_to_mmap(audio_path: str, mmap_path: str) -> str:
+    """
+    Like load_audio, but stores the buffer as a .npy file for memory
+    mapping, so worker processes share pages instead of pickled copies.
+    Returns ``mmap_path``; open it with resolve_audio.
+    """
+    np.save(mmap_path, load_audio(audio_path))
+    return mmap_path
+
+
+def resolve_audio(audio: Union[str, np.ndarray]) -> Union[str, np.ndarray]:
+    """
+    Normalise an audio handle for the models: arrays pass through, .npy
+    paths are memory-mapped (copy-on-write, so consumers may wrap them as
+    writable tensors without copying), other paths are returned unchanged.
+    """
+    if isinstance(audio, str) and audio.endswith(".npy"):
+        return np.load(audio, mmap_mode="c")
+    return audio
+
+
+def get_audio_duration(audio_path: str) -> float:
+    """Duration of an audio file in seconds, read from its header."""
+    return sf.info(audio_path).duration
+
+
+def iter_audio_windows(
+    audio_path: str,
+    window_s: float = STREAM_WINDOW_S,
+    overlap_s: float = STREAM_OVERLAP_S,
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Read audio in overlapping windows without decoding the whole file.
+
+    Each window is downmixed to mono and resampled to 16kHz, so only one
+    window is held in memory at a time.
+
+    Args:
+        audio_path: Path to any format readable by soundfile
+        window_s: Window length in seconds
+        overlap_s: Overlap between consecutive windows in seconds
+
+    Yields:
+        (offset_seconds, float32 mono samples at 16kHz)
+    """
+    if not 0 <= overlap_s < window_s:
+        raise ValueError("overlap_s must be >= 0 and smaller than window_s")
+
+    import librosa
+
+    with sf.SoundFile(audio_path) as f:
+        native_sr = f.samplerate
+        blocksize = int(round(window_s * native_sr))
+        overlap = int(round(overlap_s * native_sr))
+        hop = blocksize - overlap
+
+        offset = 0
+        for block in f.blocks(blocksize=blocksize, overlap=overlap,
+                              dtype="float32", always_2d=True):
+            y = block.mean(axis=1)
+            if native_sr != TARGET_SR:
+                y = librosa.resample(y, orig_sr=native_sr, target_sr=TARGET_SR)
+            yield offset / native_sr, np.ascontiguousarray(y, dtype=np.float32)
+            if len(block) < blocksize:
+                break
+            offset += hop
+
+
+def detect_speech(
+    samples: np.ndarray,
+    sr: int = TARGET_SR,
+    top_db: float = VAD_TOP_DB,
+    min_speech_s: float = VAD_MIN_SPEECH_S,
+    min_silence_s: float = VAD_MIN_SILENCE_S,
+    pad_s: float = VAD_PAD_S,
+) -> List[Tuple[float, float]]:
+    """
+    Energy-based voice activity: frames within ``top_db`` of the loudest
+    frame count as speech (librosa.effects.split). Gaps shorter than
+    ``min_silence_s`` are bridged, regions shorter than ``min_speech_s``
+    dropped, and the rest padded by ``pad_s`` on both sides.
+
+    Returns:
+        Sorted, non-overlapping [(start_s, end_s), ...]
+    """
+    if len(samples) == 0 or not np.any(samples):
+        return []
+    import librosa
+    intervals = librosa.effects.split(samples, top_db=top_db, frame_length=512, hop_length=128)
+    if len(intervals) == 0:
+        return []
+
+    duration = len(samples) / sr
+    regions: List[List[float]] = []
+    for start, end in intervals / sr:
+        if regions and start - regions[-1][1] < min_silence_s:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    padded: List[Tuple[float, float]] = []
+    for start, end in regions:
+        if end - start < min_speech_s:
+            continue
+        start, end = max(0.0, start - pad_s), min(duration, end + pad_s)
+        if padded and start <= padded[-1][1]:
+            padded[-1] = (padded[-1][0], end)
+        else:
+            padded.append((float(start), float(end)))
+    return padded
+
+
+class SpeechMap:
+    """
+    Maps between the original timeline and the gated one, in which the
+    speech regions are concatenated back to back.
+    """
+
+    def __init__(self, regions: Sequence[Tuple[float, float]], duration_s: float):
+        self.regions = [(float(s), float(e)) for s, e in regions]
+        self.duration_s = float(duration_s)
+        starts = np.array([s for s, _ in self.regions], dtype=np.float64)
+        lengths = np.array([e - s for s, e in self.regions], dtype=np.float64)
+        self._orig_starts = starts
+        self._gated_starts = np.concatenate([[0.0], np.cumsum(lengths)[:-1]]) if len(lengths) else lengths
+        self.speech_s = float(lengths.sum())
+
+    def gate(self, samples: np.ndarray, sr: int = TARGET_SR) -> np.ndarray:
+        """Concatenate the speech regions of ``samples``."""
+        if not self.regions:
+            return samples[:0]
+        return np.concatenate([
+            samples[int(round(s * sr)):int(round(e * sr))] for s, e in self.regions
+        ])
+
+    def to_original(self, t: Union[float, np.ndarray], end: bool = False) -> Union[float, np.ndarray]:
+        """
+        Gated-timeline seconds back to original-timeline seconds. A time on
+        a join between regions maps to the later region's start, or with
+        ``end`` set to the earlier region's end.
+        """
+        if not self.regions:
+            return t
+        side = "left" if end else "right"
+        idx = np.clip(np.searchsorted(self._gated_starts, t, side=side) - 1, 0, None)
+        mapped = self._orig_starts[idx] + (np.asarray(t) - self._gated_starts[idx])
+        return float(mapped) if np.ndim(mapped) == 0 else mapped
+
+    def speech_overlap(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Seconds of each [start, end] (original timeline) inside speech regions."""
+        starts, ends = np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64)
+        if not self.regions:
+            return np.zeros_like(starts)
+        # Speech seconds before t is piecewise linear through the region bounds
+        xs = np.array(self.regions, dtype=np.float64).ravel()
+        cum = np.concatenate([[0.0], np.cumsum([e - s for s, e in self.regions])])
+        fp = np.column_stack([cum[:-1], cum[1:]]).ravel()
+        return np.interp(ends, xs, fp) - np.interp(starts, xs, fp)
+
+    def stats(self) -> dict:
+        """Compute-saved summary for reports."""
+        saved = max(0.0, self.duration_s - self.speech_s)
+        return {
+            "audio_s": round(self.duration_s, 3),
+            "speech_s": round(self.speech_s, 3),
+            "saved_s": round(saved, 3),
+            "saved_ratio": round(saved / self.duration_s, 4) if self.duration_s else 0.0,
+        }
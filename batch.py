@@ -0,0 +1,291 @@
+"""
+EchoEthics-ML - Headless Batch Runner
+Analyse a directory (or manifest) of meeting recordings without the dashboard:
+
+    python batch.py data/archive --output data/processed/batch --workers 4
+
+Files whose report already exists are skipped, so an interrupted run can
+simply be restarted.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.analytics_store import get_analytics_store
+from utils.config import (
+    ANALYTICS_ENABLED, PROCESSED_DIR, SENTIMENT_SERVER, SPEAKER_ID_ENABLED, STAGE_METRICS_EXPORT,
+)
+from utils.audio_utils import get_audio_duration
+from utils.report_utils import save_json_report
+from utils.result_cache import get_result_cache
+from core.instrumentation import export_stats
+from core.model_registry import get_profile, get_registry, profile_params
+from core.pipeline import PipelineExecutor
+from core.scheduler import run_plan, schedule
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
+SUMMARY_FIELDS = [
+    "file", "status", "audio_s", "wall_s", "fairness_score",
+    "dominance_ratio", "interruption_index", "sentiment_balance",
+    "speakers", "report", "error",
+]
+
+# Per-worker state, set up once by _init_worker
+_executor: Optional[PipelineExecutor] = None
+_use_cache = True
+_team = ""
+_deadline_s: Optional[float] = None
+_profile: Optional[str] = None
+_init_error: Optional[str] = None
+
+
+def find_audio_files(source: str) -> List[str]:
+    """
+    Audio files under a directory, or the paths listed in a manifest
+    (one per line; blank lines and '#' comments ignored).
+    """
+    if os.path.isdir(source):
+        found = []
+        for dirpath, _, filenames in os.walk(source):
+            for name in filenames:
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    found.append(os.path.join(dirpath, name))
+        return sorted(found)
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [
+        line if os.path.isabs(line) else os.path.join(base, line)
+        for line in lines
+        if line and not line.startswith("#")
+    ]
+
+
+def report_path_for(audio_path: str, root: str, output_dir: str) -> str:
+    """
+    Report location mirroring the file's path relative to ``root``,
+    extension included (meeting.wav and meeting.mp3 get separate reports).
+    Files outside ``root`` keep their name plus a hash of the absolute
+    path, so equal names from different directories do not collide.
+    """
+    path = os.path.abspath(audio_path)
+    try:
+        rel = os.path.relpath(path, root)
+    except ValueError:  # different drive on Windows
+        rel = os.pardir
+    if rel.startswith(os.pardir):
+        digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:10]
+        rel = f"{os.path.basename(path)}-{digest}"
+    name = rel.replace(os.sep, "__").replace("/", "__")
+    return os.path.join(output_dir, f"{name}.json")
+
+
+def _audio_duration(audio_path: str) -> float:
+    try:
+        return get_audio_duration(audio_path)
+    except Exception:
+        import librosa
+        return librosa.get_duration(path=audio_path)
+
+
+def _summary_row(audio_path: str, report_path: str, status: str, metrics: Dict[str, Any],
+                 audio_s: float = 0.0, wall_s: float = 0.0, error: str = "") -> Dict[str, Any]:
+    return {
+        "file": audio_path,
+        "status": status,
+        "audio_s": round(audio_s, 2),
+        "wall_s": round(wall_s, 2),
+        "fairness_score": metrics.get("fairness_score", ""),
+        "dominance_ratio": metrics.get("dominance_ratio", ""),
+        "interruption_index": metrics.get("interruption_index", ""),
+        "sentiment_balance": metrics.get("sentiment_balance", ""),
+        "speakers": len(metrics.get("speakers", [])) if metrics else "",
+        "report": report_path,
+        "error": error,
+    }
+
+
+def _warm_up_models(profile: str) -> List[Any]:
+    """Registry entries a batch run loads under ``profile``, with its parameters."""
+    models = profile_params(profile)
+    names: List[Any] = [("whisper", models["whisper"]), "diarization"]
+    if not SENTIMENT_SERVER or SENTIMENT_SERVER == "local":
+        # A remote server holds the sentiment model itself
+        names.append(("sentiment", models["sentiment"]))
+    if SPEAKER_ID_ENABLED:
+        names.append("speaker_embedding")
+    return names
+
+
+def _init_worker(torch_threads: int, warm_up: bool, use_cache: bool, team: str = "",
+                 deadline_s: Optional[float] = None, profile: Optional[str] = None) -> None:
+    """
+    Limit torch threads and load models once per worker process. A model
+    that fails to load is recorded rather than raised: an initializer
+    error would make the pool restart the worker forever, so instead every
+    file given to this worker fails with it.
+    """
+    global _executor, _use_cache, _team, _deadline_s, _profile, _init_error
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    _executor = PipelineExecutor("serial", max_threads=torch_threads)
+    _use_cache = use_cache
+    _team = team
+    _deadline_s = deadline_s
+    _profile = profile
+    if warm_up:
+        try:
+            get_registry().warm_up(_warm_up_models(profile or get_profile()))
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            _init_error = f"model warm-up failed: {e}"
+
+
+def _process_file(task: Tuple[str, str]) -> Dict[str, Any]:
+    audio_path, report_path = task
+    if _init_error is not None:
+        return _summary_row(audio_path, report_path, "error", {}, error=_init_error)
+    started = time.perf_counter()
+    try:
+        audio_s = _audio_duration(audio_path)
+        plan = schedule(audio_s, _deadline_s, mode=_executor.mode, profile=_profile)
+        result = run_plan(
+            audio_path, plan, executor=_executor, cache=get_result_cache() if _use_cache else None,
+            profile=_profile,
+        )
+        profile = result["profile"]
+        metrics = result["metrics"]
+        report = dict(metrics, source=audio_path, audio_duration_s=audio_s,
+                      interruptions=result["interactions"].get("interruptions", {}),
+                      word_counts=result["interactions"].get("word_counts"),
+                      stage_timings=result["timings"], stages=result["stages"], vad=result["vad"],
+                      speaker_ids=result["speaker_ids"], schedule=result["schedule"])
+
+        # Write then rename, so a crash never leaves a half-written report behind
+        tmp_path = f"{report_path}.{os.getpid()}.tmp"
+        save_json_report(report, tmp_path)
+        os.replace(tmp_path, report_path)
+        if ANALYTICS_ENABLED:
+            # Re-analysing a file replaces its row; the meeting date is the recording's mtime
+            get_analytics_store().record_meeting(
+                metrics, result["interactions"], meeting_id=f"file:{os.path.abspath(audio_path)}",
+                date=time.strftime("%Y-%m-%d", time.localtime(os.path.getmtime(audio_path))),
+                team=_team, title=os.path.basename(audio_path), source=audio_path,
+                duration_s=audio_s, profile=profile, mode="batch",
+                speaker_names={label: match["name"] for label, match in result["speaker_ids"].items()
+                               if match["name"]},
+            )
+        if STAGE_METRICS_EXPORT:
+            export_stats(result["stages"], source=audio_path, mode="batch", profile=profile)
+        return _summary_row(audio_path, report_path, "ok", metrics,
+                            audio_s, time.perf_counter() - started)
+    except Exception as e:
+        traceback.print_exc(file=sys.stderr)
+        return _summary_row(audio_path, report_path, "error", {},
+                            wall_s=time.perf_counter() - started, error=str(e))
+
+
+def _load_existing(audio_path: str, report_path: str) -> Dict[str, Any]:
+    try:
+        with open(report_path, "r") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        report = {}
+    return _summary_row(audio_path, report_path, "skipped", report,
+                        report.get("audio_duration_s", 0.0))
+
+
+def write_summary(rows: List[Dict[str, Any]], output_dir: str) -> str:
+    path = os.path.join(output_dir, "summary.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def run_batch(source: str, output_dir: str, workers: int, warm_up: bool = True,
+              use_cache: bool = True, force: bool = False, team: str = "",
+              deadline_s: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Analyse every file from ``source`` across ``workers`` processes,
+    recording each meeting under ``team`` in the analytics store. With
+    ``deadline_s``, each file is analysed with the configuration
+    core.scheduler predicts will finish it within that many seconds.
+    Returns one summary row per file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    files = find_audio_files(source)
+    root = os.path.abspath(source if os.path.isdir(source) else os.path.dirname(source))
+
+    rows: List[Dict[str, Any]] = []
+    tasks: List[Tuple[str, str]] = []
+    for audio_path in files:
+        report_path = report_path_for(audio_path, root, output_dir)
+        if not force and os.path.exists(report_path):
+            rows.append(_load_existing(audio_path, report_path))
+        else:
+            tasks.append((audio_path, report_path))
+
+    print(f"📂 {len(files)} files: {len(tasks)} to analyse, {len(rows)} already done")
+    if not tasks:
+        return rows
+
+    workers = max(1, min(workers, len(tasks)))
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    started = time.perf_counter()
+    audio_total = 0.0
+
+    # Fix the profile for the whole batch, as jobs do at submission
+    init_args = (torch_threads, warm_up, use_cache, team, deadline_s, get_profile())
+    with multiprocessing.Pool(workers, _init_worker, init_args) as pool:
+        for done, row in enumerate(pool.imap_unordered(_process_file, tasks), 1):
+            rows.append(row)
+            audio_total += row["audio_s"] if row["status"] == "ok" else 0.0
+            mark = "✅" if row["status"] == "ok" else "❌"
+            print(f"{mark} [{done}/{len(tasks)}] {row['file']} ({row['wall_s']:.1f}s)")
+
+    wall = time.perf_counter() - started
+    failed = sum(1 for row in rows if row["status"] == "error")
+    print(f"\n⏱️  {len(tasks)} files in {wall / 60:.1f} min, {failed} failed")
+    print(f"🚀 Throughput: {audio_total / wall:.2f} audio-hours per wall-clock hour")
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Batch fairness analysis of meeting recordings.")
+    parser.add_argument("source", help="directory of recordings or a manifest file (one path per line)")
+    parser.add_argument("--output", default=os.path.join(PROCESSED_DIR, "batch"),
+                        help="directory for per-meeting reports and summary.csv")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 4),
+                        help="worker processes (each keeps its own models loaded)")
+    parser.add_argument("--no-warm-up", action="store_true", help="load models lazily in workers")
+    parser.add_argument("--no-cache", action="store_true", help="do not reuse cached stage outputs")
+    parser.add_argument("--force", action="store_true", help="re-analyse files that already have reports")
+    parser.add_argument("--team", default="", help="team recorded with each meeting in the analytics store")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="seconds allowed per recording; picks the profile and stages to fit")
+    args = parser.parse_args(argv)
+
+    rows = run_batch(args.source, args.output, args.workers, warm_up=not args.no_warm_up,
+                     use_cache=not args.no_cache, force=args.force, team=args.team,
+                     deadline_s=args.deadline)
+    if rows:
+        rows.sort(key=lambda row: row["file"])
+        print(f"📄 Summary: {write_summary(rows, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
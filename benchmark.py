@@ -0,0 +1,424 @@
+"""
+EchoEthics-ML - Benchmark Suite
+Times every pipeline stage on synthetic meetings, with stub model backends
+standing in for Whisper, pyannote and DistilBERT:
+
+    python benchmark.py                      # run and compare against the baseline
+    python benchmark.py --save-baseline      # record a new baseline
+    python benchmark.py --max-turns 10000    # skip the largest sizes
+    python benchmark.py --startup            # also time cold imports and first render
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from utils.config import BENCHMARK_BASELINE, BENCHMARK_REGRESSION_RATIO
+from utils.audio_utils import preprocess_audio, load_audio, detect_speech
+from utils.plot_utils import plot_all
+from utils.report_utils import save_json_report, generate_pdf_report
+from core.bias_detection import (
+    analyze_bias, analyze_bias_arrays, INTERRUPTION_GAP_S
+)
+from core.alignment import align_transcript
+from core.segments import SegmentTable
+from core.metrics import compute_fairness_metrics
+from core.model_registry import get_registry
+from core.pipeline import PipelineExecutor, analyze_meeting
+from core.speaker_id import SpeakerIndex
+
+TURN_SIZES = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+AUDIO_DURATIONS_S = [10, 60, 600]
+PIPELINE_MAX_TURNS = 10_000
+SPEAKER_INDEX_SIZES = [1_000, 10_000, 50_000]
+EMBEDDING_DIM = 256
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STARTUP_MODULES = ["core.metrics", "core.pipeline", "app.dashboard"]
+HEAVY_MODULES = ["torch", "whisper", "transformers", "pyannote", "librosa", "plotly", "fpdf", "scipy"]
+STARTUP_REPEATS = 3
+
+
+# =========================
+# Synthetic Meetings
+# =========================
+
+def synthetic_meeting(
+    n_speakers: int = 4,
+    n_turns: int = 100,
+    duration_s: Optional[float] = None,
+    interruption_rate: float = 0.2,
+    seed: int = 0,
+) -> Tuple[Dict[str, Any], List[Dict], Dict]:
+    """
+    Build a meeting as (transcript, diarization, sentiments).
+
+    Turns follow each other; with probability ``interruption_rate`` the
+    next turn is taken by a different speaker within the interruption gap.
+    Timestamps are scaled to ``duration_s`` when given.
+    """
+    rng = random.Random(seed)
+    speakers = [f"SPEAKER_{i:02d}" for i in range(n_speakers)]
+    diarization, segments, per_segment = [], [], []
+    t = 0.0
+    prev = None
+    for _ in range(n_turns):
+        interrupt = prev is not None and n_speakers > 1 and rng.random() < interruption_rate
+        if interrupt:
+            spk = rng.choice([s for s in speakers if s != prev])
+            t += rng.uniform(0.0, INTERRUPTION_GAP_S * 0.9)
+        else:
+            spk = rng.choice(speakers)
+            t += rng.uniform(INTERRUPTION_GAP_S, 2.0)
+        length = rng.uniform(0.5, 8.0)
+        diarization.append({"speaker": spk, "start": t, "end": t + length})
+        segments.append({"start": t, "end": t + length, "text": " synthetic utterance"})
+        per_segment.append({
+            "start": t, "end": t + length, "text": " synthetic utterance",
+            "label": "POSITIVE" if rng.random() < 0.6 else "NEGATIVE",
+            "score": rng.uniform(0.5, 1.0),
+        })
+        t += length
+        prev = spk
+
+    if duration_s and t > 0:
+        scale = duration_s / t
+        for rows in (diarization, segments, per_segment):
+            for row in rows:
+                row["start"] *= scale
+                row["end"] *= scale
+
+    transcript = {"text": "".join(s["text"] for s in segments), "segments": segments}
+    return transcript, diarization, {"per_segment": per_segment}
+
+
+def write_synthetic_audio(path: str, duration_s: float, seed: int = 0) -> str:
+    """Noise bursts at 44.1kHz stereo, so preprocessing has to resample and downmix."""
+    rng = np.random.default_rng(seed)
+    sr = 44100
+    with sf.SoundFile(path, "w", samplerate=sr, channels=2, subtype="PCM_16") as f:
+        for start in range(0, int(duration_s * sr), sr * 10):
+            frames = min(sr * 10, int(duration_s * sr) - start)
+            f.write((rng.standard_normal((frames, 2)) * 0.1).astype(np.float32))
+    return path
+
+
+# =========================
+# Stub Backends
+# =========================
+
+class _StubWhisper:
+    def __init__(self, transcript: Dict[str, Any]):
+        self.transcript = transcript
+
+    def transcribe(self, audio: Any, **kwargs: Any) -> Dict[str, Any]:
+        return self.transcript
+
+
+class _StubTurn:
+    __slots__ = ("start", "end")
+
+    def __init__(self, start: float, end: float):
+        self.start = start
+        self.end = end
+
+
+class _StubAnnotation:
+    def __init__(self, diarization: List[Dict]):
+        self.diarization = diarization
+
+    def itertracks(self, yield_label: bool = False):
+        for i, seg in enumerate(self.diarization):
+            yield _StubTurn(seg["start"], seg["end"]), i, seg["speaker"]
+
+
+def _stub_sentiment(texts: List[str], **kwargs: Any) -> List[Dict[str, Any]]:
+    return [{"label": "POSITIVE" if len(t) % 2 else "NEGATIVE", "score": 0.9} for t in texts]
+
+
+def _stub_embedding(samples: np.ndarray, sample_rate: int = 16000) -> np.ndarray:
+    # Same audio, same vector
+    seed = zlib.crc32(np.ascontiguousarray(samples[:4096], dtype=np.float32).tobytes())
+    return np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+
+
+def install_stub_backends(transcript: Dict[str, Any], diarization: List[Dict]) -> None:
+    """
+    Replace the ML backends in the model registry with instant stand-ins.
+    Voice-activity gating is switched off, since the stub transcript's
+    timestamps do not follow the synthetic audio, the sentiment text
+    cache is kept in memory so stub labels never reach the on-disk cache,
+    and speakers are matched against an empty scratch index.
+    """
+    registry = get_registry()
+    registry.register_backend("whisper", lambda **kw: _StubWhisper(transcript))
+    registry.register_backend("diarization", lambda **kw: (lambda audio: _StubAnnotation(diarization)))
+    registry.register_backend("sentiment", lambda **kw: _stub_sentiment)
+    registry.register_backend("speaker_embedding", lambda **kw: _stub_embedding)
+
+    import core.diarization
+    import core.sentiment_analysis
+    import core.speaker_id
+    import core.speech_to_text
+    core.diarization.PYANNOTE_AVAILABLE = True
+    core.speaker_id._index = SpeakerIndex(tempfile.mkdtemp(prefix="echoethics_speakers_"))
+    core.sentiment_analysis.SENTIMENT_CACHE_PERSIST = False
+    core.sentiment_analysis._caches.clear()
+    core.speech_to_text.VAD_ENABLED = False
+
+
+# =========================
+# Runner
+# =========================
+
+def time_call(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Best and median wall time over ``repeat`` runs (seconds)."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"best": min(samples), "median": statistics.median(samples), "runs": repeat}
+
+
+def _repeats_for(size: int) -> int:
+    return 5 if size <= 10_000 else 1
+
+
+def run_benchmarks(turn_sizes: List[int], durations: List[float], n_speakers: int = 4,
+                   interruption_rate: float = 0.2,
+                   meeting_duration_s: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+    """Run every benchmark; returns {'function[size]': timing}."""
+    results: Dict[str, Dict[str, float]] = {}
+    workdir = tempfile.mkdtemp(prefix="echoethics_bench_")
+
+    def record(name: str, timing: Dict[str, float]) -> None:
+        results[name] = timing
+        print(f"  {name:<42} best {timing['best'] * 1000:10.2f} ms  "
+              f"median {timing['median'] * 1000:10.2f} ms")
+
+    try:
+        print("🎵 Audio preprocessing")
+        for duration in durations:
+            path = write_synthetic_audio(os.path.join(workdir, f"audio_{duration}.wav"), duration)
+            record(f"preprocess_audio[{duration}s]",
+                   time_call(lambda: preprocess_audio(path, os.path.join(workdir, "processed.wav")),
+                             3 if duration <= 60 else 1))
+            samples = load_audio(path)
+            record(f"detect_speech[{duration}s]",
+                   time_call(lambda: detect_speech(samples), 3 if duration <= 60 else 1))
+
+        print("🪪 Speaker index")
+        rng = np.random.default_rng(0)
+        for size in SPEAKER_INDEX_SIZES:
+            index = SpeakerIndex(os.path.join(workdir, f"speakers_{size}"))
+            voices = rng.standard_normal((size, EMBEDDING_DIM)).astype(np.float32)
+            index.enroll_many([f"person {n}" for n in range(size)], voices)
+            queries = voices[:8] + 0.3 * rng.standard_normal((8, EMBEDDING_DIM)).astype(np.float32)
+            record(f"SpeakerIndex.search[{size}]", time_call(lambda: index.search(queries[0]), 20))
+            record(f"SpeakerIndex.search(8 speakers)[{size}]", time_call(lambda: index.search(queries, 8), 20))
+            record(f"SpeakerIndex.enroll[{size}]", time_call(lambda: index.enroll("new", queries[0]), 5))
+            record(f"SpeakerIndex load[{size}]",
+                   time_call(lambda: len(SpeakerIndex(index.root)), 3))
+
+        print("🔍 Analysis and reporting")
+        for size in turn_sizes:
+            transcript, diarization, sentiments = synthetic_meeting(
+                n_speakers, size, meeting_duration_s, interruption_rate
+            )
+            repeat = _repeats_for(size)
+            interactions = analyze_bias(transcript, diarization)
+            metrics = compute_fairness_metrics(interactions, sentiments)
+
+            record(f"align_transcript[{size}]",
+                   time_call(lambda: align_transcript(transcript, diarization), repeat))
+            record(f"analyze_bias[{size}]",
+                   time_call(lambda: analyze_bias(transcript, diarization), repeat))
+            columns = SegmentTable.from_dicts(diarization)
+            record(f"analyze_bias_arrays[{size}]",
+                   time_call(lambda: analyze_bias_arrays(columns), repeat))
+            record(f"compute_fairness_metrics[{size}]",
+                   time_call(lambda: compute_fairness_metrics(interactions, sentiments), repeat))
+            record(f"plot_utils.plot_all[{size}]",
+                   time_call(lambda: plot_all(metrics, interactions, sentiments), repeat))
+            json_path = os.path.join(workdir, "report.json")
+            record(f"save_json_report[{size}]",
+                   time_call(lambda: save_json_report(metrics, json_path), repeat))
+            pdf_path = os.path.join(workdir, "report.pdf")
+            figures = plot_all(metrics, interactions, sentiments)
+            record(f"generate_pdf_report[{size}]",
+                   time_call(lambda: generate_pdf_report(metrics, figures, pdf_path), repeat))
+
+            if size <= PIPELINE_MAX_TURNS:
+                install_stub_backends(transcript, diarization)
+                audio = write_synthetic_audio(os.path.join(workdir, "pipeline.wav"), 10)
+                executor = PipelineExecutor("thread")
+                try:
+                    record(f"analyze_meeting(stub models)[{size}]",
+                           time_call(lambda: analyze_meeting(audio, executor), repeat))
+                finally:
+                    executor.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+# =========================
+# Startup
+# =========================
+
+_PROBE_PRELUDE = """
+import json, os, sys, time
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024  # macOS reports bytes
+
+started = time.perf_counter()
+"""
+
+_PROBE_REPORT = """
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "rss_mb": rss_mb(),
+    "heavy": sorted(m for m in {heavy!r} if m in sys.modules),
+}}))
+"""
+
+
+def _run_probe(body: str) -> Dict[str, Any]:
+    """Run ``body`` in a fresh interpreter; returns its seconds, RSS and heavy imports."""
+    code = _PROBE_PRELUDE + body + _PROBE_REPORT.format(heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR,
+                          capture_output=True, text=True, timeout=600)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "probe failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_startup_benchmarks(modules: List[str] = STARTUP_MODULES,
+                           repeat: int = STARTUP_REPEATS) -> Dict[str, Dict[str, Any]]:
+    """
+    Cold-start cost in fresh interpreters: import time and idle RSS per
+    module, and the dashboard's time to first render (a headless
+    streamlit AppTest run of main.py with no upload).
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    probes = [(f"startup:import {module}", f"import {module}\n") for module in modules]
+    probes.append((
+        "startup:first render (dashboard)",
+        "from streamlit.testing.v1 import AppTest\n"
+        "app = AppTest.from_file('main.py', default_timeout=600)\n"
+        "app.run()\n"
+        "assert not app.exception, app.exception\n",
+    ))
+
+    print("🚀 Startup")
+    for name, body in probes:
+        try:
+            samples = [_run_probe(body) for _ in range(repeat)]
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"  {name:<42} skipped ({e})")
+            continue
+        seconds = [sample["seconds"] for sample in samples]
+        results[name] = {
+            "best": min(seconds),
+            "median": statistics.median(seconds),
+            "runs": repeat,
+            "rss_mb": statistics.median(sample["rss_mb"] for sample in samples),
+            "heavy_modules": samples[-1]["heavy"],
+        }
+        heavy = ", ".join(results[name]["heavy_modules"]) or "none"
+        print(f"  {name:<42} best {min(seconds) * 1000:10.2f} ms  "
+              f"RSS {results[name]['rss_mb']:7.1f} MB  heavy: {heavy}")
+    return results
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any],
+                        ratio: float = BENCHMARK_REGRESSION_RATIO) -> List[str]:
+    """Names whose best time exceeds ``ratio`` × the baseline best time."""
+    regressions = []
+    for name, timing in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or base["best"] <= 0:
+            continue
+        slowdown = timing["best"] / base["best"]
+        if slowdown > ratio:
+            regressions.append(f"{name}: {slowdown:.2f}x slower "
+                               f"({base['best'] * 1000:.2f} → {timing['best'] * 1000:.2f} ms)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark EchoEthics-ML pipeline stages.")
+    parser.add_argument("--max-turns", type=int, default=TURN_SIZES[-1],
+                        help="largest synthetic meeting size (turns)")
+    parser.add_argument("--speakers", type=int, default=4)
+    parser.add_argument("--interruption-rate", type=float, default=0.2)
+    parser.add_argument("--meeting-duration", type=float, default=None,
+                        help="rescale synthetic meetings to this length (s)")
+    parser.add_argument("--durations", default=",".join(str(d) for d in AUDIO_DURATIONS_S),
+                        help="comma-separated audio durations (s) for preprocess_audio")
+    parser.add_argument("--startup", action="store_true",
+                        help="also measure cold import time, idle RSS and time to first render")
+    parser.add_argument("--baseline", default=BENCHMARK_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write these results as the new baseline")
+    parser.add_argument("--ratio", type=float, default=BENCHMARK_REGRESSION_RATIO,
+                        help="slowdown ratio flagged as a regression")
+    args = parser.parse_args(argv)
+
+    sizes = [size for size in TURN_SIZES if size <= args.max_turns]
+    durations = [float(d) for d in args.durations.split(",") if d.strip()]
+    results = run_benchmarks(sizes, durations, args.speakers, args.interruption_rate,
+                             args.meeting_duration)
+    if args.startup:
+        results.update(run_startup_benchmarks())
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"💾 Baseline saved: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️  No baseline found; run with --save-baseline to record one.")
+        return
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.ratio)
+    if regressions:
+        print("\n⚠️  Regressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\n✅ No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
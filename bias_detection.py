@@ -2,56 +2,161 @@
 Bias logic: interruptions, dominance, and interaction analytics.
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
+import numpy as np
 
+from utils.config import DENSE_MATRIX_MAX_SPEAKERS
+from core.alignment import align_transcript, word_counts
+from core.segments import SegmentTable, as_table
 
-def analyze_bias(transcript: Dict[str, Any], diarization: List[Dict]) -> Dict:
+# Max silence (seconds) between turns of different speakers counted as an interruption
+INTERRUPTION_GAP_S = 0.7
+
+
+class BiasArrays:
+    """
+    Result of analyze_bias_arrays, indexed by speaker code.
+
+    Attributes:
+        labels: Speaker name per code
+        talk_times: Seconds spoken per speaker
+        interruptions: Interruptions made per speaker
+        interruption_matrix: [interrupter, interrupted] counts; dense
+            ndarray, or scipy CSR beyond DENSE_MATRIX_MAX_SPEAKERS speakers
+        overlap_times: Seconds each speaker talks over someone else
+        total_overlap: Seconds with two or more speakers active
+    """
+
+    def __init__(self, labels, talk_times, interruptions, interruption_matrix,
+                 overlap_times, total_overlap, first_seen, inter_events, pair_events):
+        self.labels = labels
+        self.talk_times = talk_times
+        self.interruptions = interruptions
+        self.interruption_matrix = interruption_matrix
+        self.overlap_times = overlap_times
+        self.total_overlap = total_overlap
+        # Orderings that reproduce the dict insertion order of the loop version
+        self._first_seen = first_seen
+        self._inter_events = inter_events
+        self._pair_events = pair_events
+
+    def to_dict(self) -> Dict:
+        """The analyze_bias result format (tuple-keyed interruption_pairs)."""
+        labels = self.labels
+        n = len(labels)
+        return {
+            "speakers": {labels[c] for c in self._first_seen},
+            "talk_times": {labels[c]: float(self.talk_times[c]) for c in self._first_seen},
+            "interruptions": {labels[c]: int(self.interruptions[c]) for c in self._inter_events},
+            "interruption_pairs": {
+                (labels[p // n], labels[p % n]): int(count) for p, count in self._pair_events
+            },
+        }
+
+    def pairs_list(self) -> List[Dict[str, Any]]:
+        """JSON-friendly interruption pairs: [{'interrupter', 'interrupted', 'count'}, ...]."""
+        n = len(self.labels)
+        return [
+            {"interrupter": self.labels[p // n], "interrupted": self.labels[p % n], "count": int(count)}
+            for p, count in self._pair_events
+        ]
+
+
+def _first_occurrence_order(values: np.ndarray) -> np.ndarray:
+    """Unique values ordered by where they first appear."""
+    uniq, first = np.unique(values, return_index=True)
+    return uniq[np.argsort(first, kind="stable")]
+
+
+def _overlap_integral(starts: np.ndarray, ends: np.ndarray):
+    """
+    Sweep line over turn boundaries. Returns (times, F) where F(t) is the
+    time up to t with two or more turns active (piecewise linear).
+    """
+    times = np.concatenate([starts, ends])
+    deltas = np.concatenate([np.ones(len(starts)), -np.ones(len(ends))])
+    order = np.argsort(times, kind="stable")
+    times, deltas = times[order], deltas[order]
+    active = np.cumsum(deltas)[:-1]
+    dt = np.diff(times)
+    F = np.concatenate([[0.0], np.cumsum(np.where(active >= 2, dt, 0.0))])
+    return times, F
+
+
+def analyze_bias_arrays(
+    columns: SegmentTable,
+    min_gap: float = INTERRUPTION_GAP_S,
+    dense_max_speakers: int = DENSE_MATRIX_MAX_SPEAKERS,
+) -> BiasArrays:
+    """
+    Vectorized talk times, gap-based interruptions, overlapping speech and
+    the speaker×speaker interruption matrix, in a few passes over arrays.
+    ``columns`` holds diarization turns (every row has a speaker code).
+    """
+    n = len(columns.labels)
+    order = np.argsort(columns.starts, kind="stable")
+    starts, ends, codes = columns.starts[order], columns.ends[order], columns.codes[order]
+
+    # bincount accumulates in sorted order, matching the loop version's sums
+    talk = np.bincount(codes, weights=ends - starts, minlength=n)
+    first_seen = _first_occurrence_order(codes)
+
+    gaps = starts[1:] - ends[:-1]
+    mask = (gaps >= 0) & (gaps < min_gap) & (codes[1:] != codes[:-1])
+    inter, target = codes[1:][mask], codes[:-1][mask]
+    interruptions = np.bincount(inter, minlength=n)
+    pair_codes = inter * n + target
+
+    uniq, first, counts = np.unique(pair_codes, return_index=True, return_counts=True)
+    pair_order = np.argsort(first, kind="stable")
+    pair_events = list(zip(uniq[pair_order].tolist(), counts[pair_order].tolist()))
+    inter_events = _first_occurrence_order(inter)
+
+    if n <= dense_max_speakers:
+        matrix = np.zeros((n, n), dtype=np.int64)
+        np.add.at(matrix, (inter, target), 1)
+    else:
+        from scipy.sparse import coo_matrix
+        matrix = coo_matrix(
+            (np.ones(len(inter), dtype=np.int64), (inter, target)), shape=(n, n)
+        ).tocsr()
+
+    if len(starts):
+        times, F = _overlap_integral(starts, ends)
+        per_turn = np.interp(ends, times, F) - np.interp(starts, times, F)
+        overlap_times = np.bincount(codes, weights=per_turn, minlength=n)
+        total_overlap = float(F[-1])
+    else:
+        overlap_times, total_overlap = np.zeros(n), 0.0
+
+    return BiasArrays(
+        columns.labels, talk, interruptions, matrix, overlap_times, total_overlap,
+        first_seen.tolist(), inter_events.tolist(), pair_events,
+    )
+
+
+def analyze_bias(transcript: Dict[str, Any], diarization: Union[List[Dict], SegmentTable]) -> Dict:
     """
     Analyze interruptions and dominance per speaker.
-    
+
     Args:
-        transcript: Transcript dict with segments
-        diarization: List of speaker segments with start/end times
-        
+        transcript: Transcript dict with segments (aligned by
+            align_transcript, or aligned here when segments lack 'speaker')
+        diarization: Speaker segments with start/end times (dicts or a SegmentTable)
+
     Returns:
         {
             'speakers': set([...]),
             'talk_times': {speaker: seconds},
             'interruptions': {speaker: count},
             'interruption_pairs': {(A,B): count},  # who interrupts whom
+            'word_counts': {speaker: words},
         }
     """
-    talk_times = {}
-    interruptions = {}
-    interruption_pairs = {}
-    speakers = set()
-
-    # Calculate talk times per speaker
-    diarization_sorted = sorted(diarization, key=lambda seg: seg["start"])
-    for seg in diarization_sorted:
-        spk = seg["speaker"]
-        dur = seg["end"] - seg["start"]
-        talk_times[spk] = talk_times.get(spk, 0) + dur
-        speakers.add(spk)
-
-    # Compute interruptions (change of speaker within small gap)
-    min_gap = 0.7  # seconds
-    for i in range(1, len(diarization_sorted)):
-        prev = diarization_sorted[i - 1]
-        curr = diarization_sorted[i]
-        gap = curr["start"] - prev["end"]
-        if 0 <= gap < min_gap and prev["speaker"] != curr["speaker"]:
-            # interruption detected
-            inter = curr["speaker"]
-            target = prev["speaker"]
-            interruptions[inter] = interruptions.get(inter, 0) + 1
-            key = (inter, target)
-            interruption_pairs[key] = interruption_pairs.get(key, 0) + 1
-
-    return {
-        "speakers": speakers,
-        "talk_times": talk_times,
-        "interruptions": interruptions,
-        "interruption_pairs": interruption_pairs,
-    }
-
+    table = as_table(diarization)
+    result = analyze_bias_arrays(table).to_dict()
+    segments = transcript.get("segments", [])
+    if segments and not all("speaker" in seg for seg in segments):
+        transcript = align_transcript(transcript, table)
+    result["word_counts"] = word_counts(transcript)
+    return result
@@ -0,0 +1,157 @@
+"""
+Accuracy-vs-speed comparison of two inference profiles on one recording:
+
+    python -m core.compare meeting.wav --a accurate --b fast
+"""
+
+import argparse
+import difflib
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.config import INFERENCE_PROFILES
+from utils.result_cache import ResultCache
+from core.pipeline import PipelineExecutor, analyze_meeting
+
+# Word-level changes listed in a comparison report
+MAX_LISTED_CHANGES = 50
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[\w']+", text.lower())
+
+
+def word_diff(reference: str, hypothesis: str, max_changes: int = MAX_LISTED_CHANGES) -> Dict[str, Any]:
+    """
+    Word-level diff of two transcripts (case and punctuation ignored).
+
+    Returns:
+        {
+            'reference_words', 'hypothesis_words',
+            'substitutions', 'deletions', 'insertions',
+            'wer': (S + D + I) / reference words,
+            'changes': [{'op', 'reference', 'hypothesis'}, ...],  # first max_changes
+        }
+    """
+    ref, hyp = _words(reference), _words(hypothesis)
+    subs = dels = ins = 0
+    changes = []
+    matcher = difflib.SequenceMatcher(None, ref, hyp, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            continue
+        if op == "replace":
+            common = min(i2 - i1, j2 - j1)
+            subs += common
+            dels += (i2 - i1) - common
+            ins += (j2 - j1) - common
+        elif op == "delete":
+            dels += i2 - i1
+        else:
+            ins += j2 - j1
+        if len(changes) < max_changes:
+            changes.append({"op": op, "reference": " ".join(ref[i1:i2]),
+                            "hypothesis": " ".join(hyp[j1:j2])})
+
+    return {
+        "reference_words": len(ref),
+        "hypothesis_words": len(hyp),
+        "substitutions": subs,
+        "deletions": dels,
+        "insertions": ins,
+        "wer": (subs + dels + ins) / len(ref) if ref else float(bool(hyp)),
+        "changes": changes,
+    }
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def metric_deltas(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    b − a for every numeric metric, and per speaker for the per-speaker
+    metrics (talk_times, speaking_rate_wpm, ...).
+    """
+    deltas: Dict[str, Any] = {}
+    for key, value in a.items():
+        other = b.get(key)
+        if _is_number(value) and _is_number(other):
+            deltas[key] = {"a": value, "b": other, "delta": other - value}
+        elif isinstance(value, dict) and isinstance(other, dict):
+            per_speaker = {
+                spk: {"a": value[spk], "b": other[spk], "delta": other[spk] - value[spk]}
+                for spk in value
+                if spk in other and _is_number(value[spk]) and _is_number(other[spk])
+            }
+            if per_speaker:
+                deltas[key] = per_speaker
+    return deltas
+
+
+def compare_profiles(
+    audio_path: str,
+    profile_a: str = "accurate",
+    profile_b: str = "fast",
+    executor: Optional[PipelineExecutor] = None,
+    cache: Optional[ResultCache] = None,
+) -> Dict[str, Any]:
+    """
+    Analyse ``audio_path`` under two inference profiles and compare them.
+    Each run is given its profile explicitly; the process profile is untouched.
+
+    Returns:
+        {
+            'profiles': [a, b],
+            'wall_s': {profile: seconds}, 'speedup': wall a / wall b,
+            'timings': {profile: {stage: seconds}},
+            'word_diff': word_diff(transcript a, transcript b),
+            'metric_deltas': metric_deltas(metrics a, metrics b),
+        }
+    """
+    runs: Dict[str, Dict[str, Any]] = {}
+    wall: Dict[str, float] = {}
+    for profile in (profile_a, profile_b):
+        started = time.perf_counter()
+        runs[profile] = analyze_meeting(audio_path, executor, cache=cache, profile=profile)
+        wall[profile] = time.perf_counter() - started
+
+    a, b = runs[profile_a], runs[profile_b]
+    return {
+        "profiles": [profile_a, profile_b],
+        "wall_s": wall,
+        "speedup": wall[profile_a] / wall[profile_b] if wall[profile_b] else float("inf"),
+        "timings": {profile_a: a["timings"], profile_b: b["timings"]},
+        "word_diff": word_diff(a["transcript"].get("text", ""), b["transcript"].get("text", "")),
+        "metric_deltas": metric_deltas(a["metrics"], b["metrics"]),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two inference profiles on one recording.")
+    parser.add_argument("audio", help="meeting recording")
+    parser.add_argument("--a", default="accurate", choices=sorted(INFERENCE_PROFILES))
+    parser.add_argument("--b", default="fast", choices=sorted(INFERENCE_PROFILES))
+    parser.add_argument("--output", help="write the comparison as JSON here")
+    args = parser.parse_args(argv)
+
+    report = compare_profiles(args.audio, args.a, args.b)
+    diff = report["word_diff"]
+    print(f"⏱️  {args.a}: {report['wall_s'][args.a]:.1f}s   {args.b}: {report['wall_s'][args.b]:.1f}s   "
+          f"speedup {report['speedup']:.2f}x")
+    print(f"📝 WER of {args.b} vs {args.a}: {diff['wer']:.1%} "
+          f"(S={diff['substitutions']} D={diff['deletions']} I={diff['insertions']})")
+    for key, delta in report["metric_deltas"].items():
+        if "delta" in delta:
+            print(f"📊 {key:<20} {delta['a']:.3f} → {delta['b']:.3f} ({delta['delta']:+.3f})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Comparison saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,3 +19,176 @@ THRESHOLDS = {
     "fairness_low": 0.5
 }
 
+
+# Model identifiers shared by the core modules and the dashboard
+WHISPER_MODEL_SIZE = "small"
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+DIARIZATION_MODEL = "pyannote/speaker-diarization-3.1"
+DIARIZATION_FALLBACK_MODEL = "pyannote/speaker-diarization"
+SPEAKER_EMBEDDING_MODEL = "pyannote/wespeaker-voxceleb-resnet34-LM"
+
+# Inference profiles: Whisper checkpoint, PyTorch dynamic int8 quantization of
+# the Linear layers (Whisper and sentiment), and torch intra-op threads per
+# analysis. Small models stop scaling past a few threads, so the faster
+# profiles use half the cores and leave the rest to concurrent jobs
+CPU_THREADS = int(os.getenv("ECHOETHICS_TORCH_THREADS", str(os.cpu_count() or 1)))
+INFERENCE_PROFILES = {
+    "accurate": {"whisper_size": WHISPER_MODEL_SIZE, "quantize": False, "torch_threads": CPU_THREADS},
+    "balanced": {"whisper_size": WHISPER_MODEL_SIZE, "quantize": True, "torch_threads": CPU_THREADS},
+    "fast": {"whisper_size": "base", "quantize": True, "torch_threads": max(1, CPU_THREADS // 2)},
+    "draft": {"whisper_size": "tiny", "quantize": True, "torch_threads": max(1, CPU_THREADS // 2)},
+}
+INFERENCE_PROFILE = os.getenv("ECHOETHICS_PROFILE", "accurate")
+
+# Model registry: memory budget (MB, None = unlimited), models to load at startup,
+# and whether the dashboard loads them on a background thread instead of blocking
+MODEL_MEMORY_BUDGET_MB = 4096
+WARM_UP_MODELS = [
+    name.strip()
+    for name in os.getenv("ECHOETHICS_WARM_UP", "").split(",")
+    if name.strip()
+]
+WARM_UP_BACKGROUND = os.getenv("ECHOETHICS_WARM_UP_BACKGROUND", "1") == "1"
+
+# Sentiment inference: segments per forward pass and token-level truncation limit
+SENTIMENT_BATCH_SIZE = 32
+SENTIMENT_MAX_TOKENS = 512
+# Sentiment text cache: LRU of classified utterances per sentiment model, the
+# longest text (characters) worth caching, whether entries persist on disk,
+# and how long new entries wait to be saved (batched on a background timer)
+SENTIMENT_CACHE_ENTRIES = 20000
+SENTIMENT_CACHE_MAX_CHARS = 200
+SENTIMENT_CACHE_PERSIST = os.getenv("ECHOETHICS_SENTIMENT_CACHE_PERSIST", "1") == "1"
+SENTIMENT_CACHE_SAVE_S = 30.0
+
+# Sentiment micro-batching across concurrent analyses: "" calls the model
+# directly, "local" shares an in-process batcher between threads, and
+# "host:port" uses a running `python -m core.inference_server`. A batch is
+# sent once it holds MAX_BATCH texts or its oldest request waited MAX_WAIT_S.
+# Connections carry pickles, so they need a shared key: SERVER_KEY if set,
+# else a random key the server writes to SERVER_KEY_FILE (owner-only) for
+# clients on the same machine to read
+SENTIMENT_SERVER = os.getenv("ECHOETHICS_SENTIMENT_SERVER", "")
+SENTIMENT_SERVER_MAX_BATCH = 64
+SENTIMENT_SERVER_MAX_WAIT_S = 0.02
+SENTIMENT_SERVER_KEY = os.getenv("ECHOETHICS_SENTIMENT_SERVER_KEY", "")
+SENTIMENT_SERVER_KEY_FILE = os.getenv(
+    "ECHOETHICS_SENTIMENT_SERVER_KEY_FILE", os.path.join(PROCESSED_DIR, "sentiment_server.key")
+)
+
+# Streaming pipeline: window length and overlap between consecutive windows (seconds)
+STREAM_WINDOW_S = 300.0
+STREAM_OVERLAP_S = 10.0
+
+# Live mode: 16-bit mono PCM feed, seconds per tick, model context, latency target
+LIVE_SAMPLE_RATE = 16000
+LIVE_TICK_S = 5.0
+LIVE_CONTEXT_S = 30.0
+LIVE_LATENCY_TARGET_S = 3.0
+
+# Pipeline executor: "thread", "process" or "serial", and torch intra-op threads
+# per stage in process and serial mode (stages not listed use the profile's
+# threads, split between process workers; thread mode shares one setting)
+PIPELINE_MODE = os.getenv("ECHOETHICS_PIPELINE_MODE", "thread")
+PIPELINE_STAGE_THREADS = {}
+
+# Content-addressed cache of stage outputs (transcript, diarization, sentiment)
+RESULT_CACHE_DIR = os.path.join(PROCESSED_DIR, "cache")
+RESULT_CACHE_MAX_MB = 512
+SENTIMENT_CACHE_DIR = os.path.join(RESULT_CACHE_DIR, "sentiment_texts")
+
+# Background analysis jobs: per-job working directories, jobs run at once,
+# how long finished jobs are kept (seconds) and the dashboard's poll interval
+JOBS_DIR = os.path.join(PROCESSED_DIR, "jobs")
+JOB_MAX_CONCURRENT = int(os.getenv("ECHOETHICS_JOB_WORKERS", "2"))
+JOB_RETENTION_S = 24 * 3600
+JOB_POLL_S = 1.0
+
+# Per-stage instrumentation: JSON-lines log and Prometheus textfile of stage
+# timings (written after each dashboard or batch analysis), and the profiler
+# used for stages picked for capture ("cprofile" or "pyinstrument")
+STAGE_METRICS_EXPORT = os.getenv("ECHOETHICS_STAGE_METRICS", "1") == "1"
+STAGE_METRICS_JSONL = os.path.join(PROCESSED_DIR, "metrics", "stages.jsonl")
+STAGE_METRICS_PROM = os.path.join(PROCESSED_DIR, "metrics", "echoethics_stages.prom")
+PROFILER = os.getenv("ECHOETHICS_PROFILER", "cprofile")
+PROFILES_DIR = os.path.join(PROCESSED_DIR, "profiles")
+
+# Cross-meeting analytics: SQLite store of per-meeting and per-speaker metrics,
+# appended after each dashboard or batch analysis
+ANALYTICS_ENABLED = os.getenv("ECHOETHICS_ANALYTICS", "1") == "1"
+ANALYTICS_DB = os.getenv("ECHOETHICS_ANALYTICS_DB", os.path.join(PROCESSED_DIR, "analytics.sqlite"))
+
+# Speaker re-identification: embed each diarized speaker from its longest turns
+# (at most EMBEDDING_MAX_S of speech, turns shorter than MIN_TURN_S skipped when
+# longer ones exist), and match enrolled voices at or above this cosine similarity
+SPEAKER_ID_ENABLED = os.getenv("ECHOETHICS_SPEAKER_ID", "1") == "1"
+SPEAKER_EMBEDDING_MAX_S = 30.0
+SPEAKER_EMBEDDING_MIN_TURN_S = 1.0
+SPEAKER_MATCH_THRESHOLD = 0.6
+SPEAKER_INDEX_DIR = os.getenv("ECHOETHICS_SPEAKER_INDEX", os.path.join(DATA_DIR, "speakers"))
+
+# Parallel transcription: worker processes (0 or 1 = one sequential Whisper pass),
+# shortest recording worth splitting, target and maximum chunk length, and the
+# overlap added around cuts that had to fall inside speech (seconds)
+TRANSCRIBE_WORKERS = int(os.getenv("ECHOETHICS_TRANSCRIBE_WORKERS", "0"))
+TRANSCRIBE_PARALLEL_MIN_S = 240.0
+TRANSCRIBE_CHUNK_S = 120.0
+TRANSCRIBE_MAX_CHUNK_S = 180.0
+TRANSCRIBE_CHUNK_OVERLAP_S = 2.0
+
+# Deadline scheduling: measured per-stage real-time factors (wall seconds per audio
+# second) on this host, the profiles tried from most to least accurate, optional
+# stage groups given up in order when no profile fits, sentiment batch sizes
+# worth trying, the most transcription workers tried (each loads its own Whisper),
+# and the margin added to predictions
+SCHEDULER_COSTS = os.getenv("ECHOETHICS_SCHEDULER_COSTS", os.path.join(PROCESSED_DIR, "metrics", "host_costs.json"))
+SCHEDULER_PROFILE_ORDER = ["accurate", "balanced", "fast", "draft"]
+SCHEDULER_OPTIONAL_STAGES = [["embed", "identify"], ["sentiment"]]
+SCHEDULER_SENTIMENT_BATCH_SIZES = [8, 16, 32, 64]
+SCHEDULER_MAX_TRANSCRIBE_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+SCHEDULER_SAFETY_FACTOR = 1.15
+# Learning rate of the measured RTFs, and the priors used until a stage has been
+# seen on this host (scaled by how much faster or slower measured stages ran);
+# int8 speedup, parallel efficiency per extra transcription worker, and
+# seconds per MB to load a Whisper checkpoint not yet in memory
+SCHEDULER_EMA_ALPHA = 0.3
+SCHEDULER_PRIOR_RTF = {
+    "preprocess": 0.01,
+    "transcribe:tiny": 0.05,
+    "transcribe:base": 0.1,
+    "transcribe:small": 0.3,
+    "transcribe:medium": 0.9,
+    "transcribe:large": 1.8,
+    "diarize": 0.1,
+    "sentiment": 0.01,
+    "embed": 0.01,
+}
+SCHEDULER_PRIOR_OTHER_RTF = 0.002
+SCHEDULER_INT8_SPEEDUP = 1.5
+SCHEDULER_PARALLEL_EFFICIENCY = 0.7
+SCHEDULER_LOAD_S_PER_MB = 0.01
+
+# Audio hand-off between preprocessing and the models: "memory" passes one
+# float32 array, "mmap" a memory-mapped .npy (always used with process pools)
+AUDIO_HANDOFF = os.getenv("ECHOETHICS_AUDIO_HANDOFF", "memory")
+
+# Benchmark suite baseline and the slowdown ratio flagged as a regression
+BENCHMARK_BASELINE = os.path.join(DATA_DIR, "benchmarks", "baseline.json")
+BENCHMARK_REGRESSION_RATIO = 1.25
+
+# Speaker count above which the interruption matrix is stored sparse (scipy CSR)
+DENSE_MATRIX_MAX_SPEAKERS = 256
+
+# Whisper word-level timestamps, so speaker attribution can split segments by word
+WORD_TIMESTAMPS = os.getenv("ECHOETHICS_WORD_TIMESTAMPS", "0") == "1"
+
+# Voice-activity gating before Whisper: regions quieter than VAD_TOP_DB below the
+# loudest frame are silence; shorter gaps are bridged, short blips dropped,
+# and each region is padded so word onsets are not clipped (seconds)
+VAD_ENABLED = os.getenv("ECHOETHICS_VAD", "1") == "1"
+VAD_TOP_DB = 35.0
+VAD_MIN_SPEECH_S = 0.25
+VAD_MIN_SILENCE_S = 0.5
+VAD_PAD_S = 0.2
+# Transcript segments with less speech than this fraction skip sentiment analysis
+VAD_MIN_SPEECH_RATIO = 0.5
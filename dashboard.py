@@ -3,115 +3,457 @@ EchoEthics-ML Streamlit Dashboard
 Refactored with model caching and robust file handling.
 """
 
+import datetime
+import functools
 import os
+import time
 import streamlit as st
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from utils.config import PROCESSED_DIR
-from utils.audio_utils import preprocess_audio
-from core.bias_detection import analyze_bias
-from core.metrics import compute_fairness_metrics
+from utils.analytics_store import PERIODS, get_analytics_store
+from utils.config import (
+    WARM_UP_MODELS, WARM_UP_BACKGROUND, INFERENCE_PROFILES, JOB_POLL_S, SENTIMENT_SERVER,
+    ANALYTICS_ENABLED, THRESHOLDS,
+)
+from core.model_registry import get_registry, get_profile
+from core.compare import compare_profiles
+from core.instrumentation import stage_timer
+from core.jobs import Job, get_job_manager, run_analysis
+from core.pipeline import meeting_stages
+from core.sentiment_analysis import get_sentiment_pipe
+from core.speaker_id import enroll_speakers
 from utils.plot_utils import (
-    plot_talk_times, plot_sentiment, plot_interruptions
+    plot_talk_times, plot_sentiment, plot_interruptions, plot_stage_timings, plot_fairness_trend
 )
-from utils.report_utils import generate_pdf_report, save_json_report
+from utils.report_utils import generate_pdf_report
+from utils.result_cache import get_result_cache, hash_bytes
 
 
 # =========================
-# Model Loaders (Cached)
+# Processing Functions
 # =========================
-
-@st.cache_resource
-def load_whisper_model():
-    try:
-        import whisper
-        return whisper.load_model("small", device="cpu")
-    except Exception as e:
-        st.error(f"Failed to load Whisper model: {e}")
-        raise
+# Models live in the process-wide registry (core.model_registry), so they
+# are shared with the core modules and survive Streamlit reruns. Analyses
+# run on the process-wide job manager (core.jobs), so concurrent sessions
+# queue behind JOB_MAX_CONCURRENT workers instead of competing for the CPU.
+
+STAGE_LABELS = {
+    "preprocess": "📝 Preprocessing audio",
+    "transcribe": "📝 Transcribing audio",
+    "diarize": "👥 Speaker diarization",
+    "sentiment": "💭 Sentiment analysis",
+    "align": "🔗 Speaker attribution",
+    "attribute": "🔗 Speaker sentiment",
+    "bias": "🔍 Bias analysis",
+    "metrics": "📊 Fairness metrics",
+    "embed": "🪪 Speaker embeddings",
+    "identify": "🪪 Recognising speakers",
+}
 
 
 @st.cache_resource
-def load_sentiment_pipeline():
-    try:
-        from transformers import pipeline
-        return pipeline(
-            "sentiment-analysis",
-            model="distilbert-base-uncased-finetuned-sst-2-english",
-            device=-1
-        )
-    except Exception as e:
-        st.error(f"Failed to load sentiment model: {e}")
-        raise
+def start_background_warm_up():
+    """Load WARM_UP_MODELS once per server process while the page renders."""
+    return get_registry().warm_up_async(WARM_UP_MODELS)
 
 
-@st.cache_resource
-def load_diarization_pipeline():
-    try:
-        from pyannote.audio import Pipeline
-        import torch
+def run_comparison(job: Job, profile_a: str, profile_b: str, use_cache: bool) -> Dict[str, Any]:
+    """Job task: compare two inference profiles on the job's audio."""
+    job.set_progress(0.0, f"Analysing with {profile_a} and {profile_b}")
+    return compare_profiles(
+        job.audio_path, profile_a, profile_b,
+        cache=get_result_cache() if use_cache else None,
+    )
 
-        token = os.getenv("HUGGINGFACE_HUB_TOKEN") or os.getenv("HF_TOKEN")
 
-        pipeline = Pipeline.from_pretrained(
-            "pyannote/speaker-diarization-3.1",
-            use_auth_token=token
-        )
-        pipeline.to(torch.device("cpu"))
-        return pipeline
-
-    except Exception as e:
+# Charts shown on the results page, in order; the PDF report embeds the same figures
+REPORT_FIGURES = ("talk_times", "sentiment", "interruptions")
+
+
+def upload_hash(uploaded_file) -> str:
+    """SHA-256 of an upload, hashed once per uploaded file rather than on every rerun."""
+    hashes = st.session_state.setdefault("upload_hashes", {})
+    file_id = getattr(uploaded_file, "file_id", None) or uploaded_file.name
+    if file_id not in hashes:
+        hashes[file_id] = hash_bytes(uploaded_file.getvalue())
+    return hashes[file_id]
+
+
+def analysis_key(audio_hash: str, profile: str, streaming: bool, deadline_s: Optional[float] = None) -> str:
+    """Session-state key of an analysis: the upload plus the settings that change its output."""
+    if streaming:
+        return f"{audio_hash}:streaming"
+    return f"{audio_hash}:{profile}" + (f":{deadline_s:.0f}s" if deadline_s else "")
+
+
+def finished_analysis(key: str) -> Optional[Dict[str, Any]]:
+    """
+    The session's memoized analysis for ``key`` once its job is done:
+    {'job_id', 'result', 'figures', 'exports'}. The result is copied out
+    of the job manager on first use, so it outlives job cleanup.
+    """
+    analysis = st.session_state.get("analyses", {}).get(key)
+    if analysis is None:
+        return None
+    if analysis["result"] is None:
+        result = get_job_manager().result(analysis["job_id"])
+        if result is None:
+            return None
+        analysis["result"] = result
+    return analysis
+
+
+def analysis_figures(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Plotly figures of an analysis, built on first use and reused by every rerun and the PDF."""
+    figures = analysis["figures"]
+    if not figures:
+        result = analysis["result"]
+        figures["talk_times"] = plot_talk_times(result["metrics"])
+        figures["sentiment"] = plot_sentiment(result["sentiments"])
+        figures["interruptions"] = plot_interruptions(result["interactions"])
+        figures["stages"] = plot_stage_timings(result["stages"])
+    return figures
+
+
+def show_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Render a job's progress. Returns its status once finished, state
+    'unknown' when the manager no longer knows the job (cleaned up, or
+    lost in a restart), else None while it is queued or running (the
+    caller reruns the script to poll again).
+    """
+    status = get_job_manager().status(job_id)
+    if status is None:
+        st.warning("⚠️ This job is no longer available.")
+        return {"id": job_id, "state": "unknown"}
+    if status["state"] == "queued":
+        st.info(f"⏳ Queued (position {status['queue_position']})")
+        return None
+    if status["state"] == "running":
+        running = [name for name, state in status["stages"].items() if state == "running"]
+        text = status["message"] or " · ".join(STAGE_LABELS.get(s, s) + "..." for s in running)
+        st.progress(status["progress"], text=text or "🔄 Processing audio...")
+        return None
+    return status
+
+
+def show_failure(what: str, status: Dict[str, Any]) -> None:
+    """Report a failed job, with the Hugging Face setup steps when diarization is what failed."""
+    st.error(f"❌ {what} failed: {status['error']}")
+    error = (status["error"] or "").lower()
+    if status.get("stages", {}).get("diarize") == "running" or "pyannote" in error or "diarization" in error:
         st.error(
             "⚠️ Speaker diarization requires HuggingFace authentication.\n\n"
             "1. Accept license: https://huggingface.co/pyannote/speaker-diarization-3.1\n"
             "2. Create token: https://huggingface.co/settings/tokens\n"
             "3. Set env variable: HUGGINGFACE_HUB_TOKEN"
         )
-        raise
 
 
-# =========================
-# Processing Functions
-# =========================
+def render_results(analysis: Dict[str, Any]) -> None:
+    """
+    Metrics, tables, charts and exports for a finished analysis (an entry
+    from ``finished_analysis``). Figures and export bytes come from the
+    entry, so reruns and exports never rebuild or recompute them.
+    """
+    result = analysis["result"]
+    transcript = result["transcript"]
+    diarization = result["diarization"]
+    sentiments = result["sentiments"]
+    metrics = result["metrics"]
+    stages = result["stages"]
+
+    if result["cached"]:
+        st.info(f"♻️ Reused cached results: {', '.join(result['cached'])}")
+    text_cache = sentiments.get("text_cache")
+    if text_cache and text_cache["hits"] + text_cache["repeats"]:
+        st.info(
+            f"💬 {text_cache['hits'] + text_cache['repeats']} repeated utterances skipped the "
+            f"sentiment model ({text_cache['misses']} classified)"
+        )
+    schedule = result.get("schedule")
+    if schedule and schedule["plan"]["deadline_s"]:
+        plan = schedule["plan"]
+        choice = (f"{plan['profile']} profile (Whisper {plan['whisper_size']}), "
+                  f"{plan['transcribe_workers']} transcription worker(s)"
+                  + (f", skipped {', '.join(plan['skip'])}" if plan["skip"] else ""))
+        timing = (f"predicted {schedule['predicted_s']:.0f}s, took {schedule['actual_s']:.0f}s"
+                  + (f" after {schedule['waited_s']:.0f}s queued" if schedule["waited_s"] >= 1 else ""))
+        if schedule["met"]:
+            st.info(f"⏱️ Deadline {plan['deadline_s']:.0f}s met with the {choice}: {timing}")
+        else:
+            st.warning(f"⏱️ Deadline {plan['deadline_s']:.0f}s missed with the {choice}: {timing}"
+                       + ("" if plan["feasible"] else " (no configuration was predicted to fit)"))
+    vad = result["vad"]
+    if vad:
+        st.info(
+            f"🔇 Skipped {vad['saved_s']:.0f}s of silence "
+            f"({vad['saved_ratio']:.0%} of the audio) before transcription"
+            + (f", {vad['sentiment_skipped']} silent segments before sentiment"
+               if vad["sentiment_skipped"] else "")
+        )
 
-def transcribe_with_cached_model(audio_path: str) -> Dict[str, Any]:
-    model = load_whisper_model()
-    result = model.transcribe(audio_path, fp16=False)
-    return {"text": result["text"], "segments": result["segments"]}
-
-
-def analyze_sentiment_with_cached_model(transcript: Dict[str, Any]) -> Dict:
-    pipe = load_sentiment_pipeline()
-    output = []
-
-    for seg in transcript.get("segments", []):
-        text = seg.get("text", "").strip()
-        if not text:
-            continue
-        res = pipe(text[:512])[0]
-        output.append({
-            "start": seg["start"],
-            "end": seg["end"],
-            "text": text,
-            "label": res["label"],
-            "score": res["score"]
+    if not transcript.get("segments"):
+        st.warning("⚠️ No speech detected.")
+        return
+    if not diarization:
+        st.warning("⚠️ No speakers detected.")
+        return
+
+    # -------- Results --------
+    st.header("📊 Meeting Fairness Analytics")
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Fairness Score", f"{metrics['fairness_score']:.2f}")
+    c2.metric("Dominance Ratio", f"{metrics['dominance_ratio']:.2f}")
+    c3.metric("Interruption Index", f"{metrics['interruption_index']:.2f}")
+    if metrics.get("sentiment_skipped"):
+        c4.metric("Sentiment Balance", "skipped", help="Sentiment was skipped to meet the deadline; "
+                  "the fairness score covers talk time and interruptions only")
+    else:
+        c4.metric("Sentiment Balance", f"{metrics['sentiment_balance']:.2f}")
+
+    render_stage_panel(stages, analysis, schedule)
+
+    speakers = list(metrics["talk_times"])
+    if speakers:
+        st.subheader("🗣️ Per-speaker")
+        matches = result.get("speaker_ids") or {}
+        st.table({
+            "Speaker": speakers,
+            "Person": [(matches.get(spk) or {}).get("name") or "–" for spk in speakers],
+            "Talk time (s)": [f"{metrics['talk_times'][spk]:.1f}" for spk in speakers],
+            "Words/min": [
+                f"{metrics['speaking_rate_wpm'][spk]:.0f}"
+                if spk in metrics["speaking_rate_wpm"] else "–"
+                for spk in speakers
+            ],
+            "Sentiment": [
+                f"{metrics['speaker_sentiment'][spk]:+.2f}"
+                if spk in metrics["speaker_sentiment"] else "–"
+                for spk in speakers
+            ],
         })
 
-    return {"per_segment": output}
+        render_speaker_ids(analysis)
+
+    figures = analysis_figures(analysis)
+    st.subheader("📈 Visualizations")
+    for name in REPORT_FIGURES:
+        st.plotly_chart(figures[name], use_container_width=True)
+
+    st.subheader("📄 Export")
+    exports = analysis["exports"]
+    if "json" not in exports:
+        with open(result["report_path"], "rb") as f:
+            exports["json"] = f.read()
+
+    if "pdf" not in exports and st.button("📄 Generate PDF"):
+        pdf_path = os.path.join(os.path.dirname(result["report_path"]), "fairness_report.pdf")
+        with stage_timer("pdf", stages, result["audio_s"]):
+            generate_pdf_report(metrics, [figures[name] for name in REPORT_FIGURES], pdf_path)
+        with open(pdf_path, "rb") as f:
+            exports["pdf"] = f.read()
+        st.success(f"✅ PDF generated in {stages['pdf']['wall_s']:.2f}s")
+
+    if "pdf" in exports:
+        st.download_button(
+            "📥 Download PDF",
+            exports["pdf"],
+            "fairness_report.pdf",
+            "application/pdf"
+        )
+    st.download_button(
+        "📥 Download JSON",
+        exports["json"],
+        "fairness_report.json",
+        "application/json"
+    )
 
+    st.success("✅ Analysis Complete!")
+
+
+def render_speaker_ids(analysis: Dict[str, Any]) -> None:
+    """Name the meeting's voices so later meetings recognise them (core.speaker_id)."""
+    result = analysis["result"]
+    embeddings = result.get("speaker_embeddings")
+    if not embeddings:
+        return
+    matches = result["speaker_ids"]
+    with st.expander("🪪 Recognise these speakers in later meetings"):
+        st.caption("Enter a name to enroll a voice. A name that is already enrolled "
+                   "gets this meeting's sample added to its voice print.")
+        names = {}
+        for label in sorted(embeddings):
+            match = matches.get(label) or {}
+            if match.get("name") and match.get("similarity") is not None:
+                hint = f" (recognised as {match['name']}, similarity {match['similarity']:.2f})"
+            elif match.get("name"):
+                hint = f" (enrolled as {match['name']})"
+            elif match.get("similarity") is not None:
+                hint = f" (closest enrolled voice: similarity {match['similarity']:.2f})"
+            else:
+                hint = ""
+            names[label] = st.text_input(
+                label + hint, value=match.get("name") or "", key=f"speaker-{analysis['job_id']}-{label}"
+            ).strip()
+
+        # Reruns and repeated clicks never fold the same sample in twice
+        saved = analysis.setdefault("enrolled", {})
+        pending = {label: name for label, name in names.items() if name and saved.get(label) != name}
+        if pending and st.button("💾 Save voices"):
+            recorded = {label: (matches.get(label) or {}).get("name") or label for label in pending}
+            for label, identity in enroll_speakers(embeddings, pending).items():
+                matches[label] = dict(matches.get(label) or {}, identity=identity, name=pending[label])
+                saved[label] = pending[label]
+            if ANALYTICS_ENABLED and result.get("meeting_id"):
+                get_analytics_store().rename_speakers(
+                    result["meeting_id"], {recorded[label]: name for label, name in pending.items()}
+                )
+            st.rerun()
+        if saved:
+            st.caption("✅ Saved voices: " + ", ".join(f"{label} → {name}" for label, name in sorted(saved.items())))
+
+
+def render_stage_panel(stages: Dict[str, Dict[str, Any]], analysis: Dict[str, Any],
+                       schedule: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Per-stage wall/CPU time, memory growth, input size and real-time factor,
+    next to the scheduler's prediction when the run had a plan.
+    """
+    with st.expander("⏱️ Stage timings"):
+        rows = list(stages.values())
+        predicted = schedule["stages"] if schedule else {}
+        st.table({
+            "Stage": [STAGE_LABELS.get(r["stage"], r["stage"]) for r in rows],
+            "Wall (s)": [f"{r['wall_s']:.2f}" for r in rows],
+            **({"Predicted (s)": [
+                f"{predicted[r['stage']]['predicted_s']:.2f}" if r["stage"] in predicted else "–" for r in rows
+            ]} if predicted else {}),
+            "CPU (s)": [f"{r['cpu_s']:.2f}" for r in rows],
+            "Peak RSS Δ (MB)": [
+                "–" if r["peak_rss_delta_mb"] is None else f"{r['peak_rss_delta_mb']:.0f}" for r in rows
+            ],
+            "Input": [
+                f"{r['input_size'] / 2 ** 20:.1f} MB" if r["input_unit"] == "bytes"
+                else f"{r['input_size']} segments" for r in rows
+            ],
+            "RTF": ["–" if r.get("rtf") is None else f"{r['rtf']:.3f}" for r in rows],
+        })
+        st.plotly_chart(analysis_figures(analysis)["stages"], use_container_width=True)
+        if SENTIMENT_SERVER:
+            try:
+                batching = get_sentiment_pipe(analysis["result"].get("profile")).stats()
+            except (OSError, EOFError, RuntimeError) as e:
+                st.caption(f"🧮 Sentiment server unavailable: {e}")
+            else:
+                latency = (f", p50 {batching['p50_ms']:.0f} ms, p99 {batching['p99_ms']:.0f} ms"
+                           if batching["p50_ms"] is not None else "")
+                st.caption(
+                    f"🧮 Sentiment batching: {batching['queue_depth']} texts queued, "
+                    f"{batching['mean_batch']:.1f} texts per batch over {batching['batches']} batches"
+                    + latency
+                )
+        for r in rows:
+            if r["profile_path"] and os.path.exists(r["profile_path"]):
+                with open(r["profile_path"], "rb") as f:
+                    st.download_button(
+                        f"🔬 {STAGE_LABELS.get(r['stage'], r['stage'])} profile",
+                        f.read(),
+                        os.path.basename(r["profile_path"]),
+                        key=f"profile-{r['stage']}",
+                    )
+
+
+def render_comparison(comparison: Dict[str, Any]) -> None:
+    profile, other = comparison["profiles"]
+    diff = comparison["word_diff"]
+    c1, c2 = st.columns(2)
+    c1.metric(f"Speedup ({other} vs {profile})", f"{comparison['speedup']:.2f}x")
+    c2.metric("Word error rate vs reference", f"{diff['wer']:.1%}")
+    scalar = {k: v for k, v in comparison["metric_deltas"].items() if "delta" in v}
+    st.table({
+        "Metric": list(scalar),
+        profile: [f"{v['a']:.3f}" for v in scalar.values()],
+        other: [f"{v['b']:.3f}" for v in scalar.values()],
+        "Δ": [f"{v['delta']:+.3f}" for v in scalar.values()],
+    })
+    if diff["changes"]:
+        st.caption("First transcript differences")
+        st.table({
+            profile: [c["reference"] for c in diff["changes"]],
+            other: [c["hypothesis"] for c in diff["changes"]],
+        })
 
-def diarize_with_cached_pipeline(audio_path: str) -> list:
-    pipeline = load_diarization_pipeline()
-    diarization = pipeline(audio_path)
 
-    segments = []
-    for turn, _, speaker in diarization.itertracks(yield_label=True):
-        segments.append({
-            "speaker": speaker,
-            "start": turn.start,
-            "end": turn.end
-        })
-    return segments
+def render_analytics_page() -> None:
+    """
+    Fairness across meetings, teams and speakers, aggregated in SQL by the
+    analytics store (no report files are read).
+    """
+    st.header("🏢 Team Analytics")
+    store = get_analytics_store()
+    if not store.count():
+        st.info("👆 No meetings recorded yet: analyse a meeting or run batch.py first.")
+        return
+
+    today = datetime.date.today()
+    c1, c2, c3 = st.columns(3)
+    dates = c1.date_input("📅 Meetings between", (today - datetime.timedelta(days=90), today))
+    teams = c2.multiselect("👥 Teams", store.teams(), format_func=lambda team: team or "(no team)")
+    period = c3.selectbox("📆 Trend by", list(PERIODS), index=list(PERIODS).index("week"))
+    threshold = st.slider("⚠️ Flag meetings with fairness below", 0.0, 1.0, THRESHOLDS["fairness_low"], 0.05)
+    start, end = (dates[0], dates[-1]) if dates else (None, None)
+
+    started = time.perf_counter()
+    summary = store.team_summary(start, end, teams, low_fairness=threshold)
+    trend = store.trend(period, start, end, teams, by_team=bool(teams))
+    flagged = store.meetings(start, end, teams, max_fairness=threshold, limit=50)
+    speakers = store.speaker_summary(start, end, teams, limit=50)
+    query_ms = (time.perf_counter() - started) * 1000.0
+
+    meetings = sum(row["meetings"] for row in summary)
+    if not meetings:
+        st.info("No meetings match these filters.")
+        return
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Meetings", f"{meetings:,}")
+    c2.metric("Mean Fairness", f"{sum(r['fairness_score'] * r['meetings'] for r in summary) / meetings:.2f}")
+    c3.metric("Below Threshold", f"{sum(r['low_fairness_meetings'] for r in summary):,}")
+    st.caption(f"⚡ Aggregated in {query_ms:.0f} ms")
+
+    st.plotly_chart(plot_fairness_trend(trend), use_container_width=True)
+
+    st.subheader("👥 Teams")
+    st.dataframe({
+        "Team": [r["team"] or "(no team)" for r in summary],
+        "Meetings": [r["meetings"] for r in summary],
+        "Fairness": [round(r["fairness_score"], 3) for r in summary],
+        "Worst": [round(r["min_fairness"], 3) for r in summary],
+        "Dominance": [round(r["dominance_ratio"], 2) for r in summary],
+        "Interruptions": [round(r["interruption_index"], 2) for r in summary],
+        "Below threshold": [r["low_fairness_meetings"] for r in summary],
+    }, use_container_width=True)
+
+    st.subheader("⚠️ Least fair meetings")
+    st.dataframe({
+        "Date": [r["date"] for r in flagged],
+        "Team": [r["team"] for r in flagged],
+        "Meeting": [r["title"] or r["source"] or r["meeting_id"] for r in flagged],
+        "Fairness": [round(r["fairness_score"], 3) for r in flagged],
+        "Dominance": [round(r["dominance_ratio"], 2) for r in flagged],
+        "Speakers": [r["n_speakers"] for r in flagged],
+    }, use_container_width=True)
+
+    st.subheader("🗣️ Speakers")
+    st.dataframe({
+        "Speaker": [r["speaker"] for r in speakers],
+        "Meetings": [r["meetings"] for r in speakers],
+        "Talk time (min)": [round(r["talk_time"] / 60, 1) for r in speakers],
+        "Mean share": [f"{r['talk_share']:.0%}" for r in speakers],
+        "Interruptions": [r["interruptions"] for r in speakers],
+        "Words/min": [None if r["wpm"] is None else round(r["wpm"]) for r in speakers],
+    }, use_container_width=True)
 
 
 # =========================
@@ -122,118 +464,138 @@ def run_dashboard():
     st.set_page_config(page_title="EchoEthics-ML", layout="wide")
     st.title("🗣️ EchoEthics-ML — Real-time Spoken Bias Detection")
 
+    if ANALYTICS_ENABLED:
+        page = st.sidebar.radio("Page", ["🔍 Analyze a meeting", "🏢 Team analytics"])
+        if page == "🏢 Team analytics":
+            render_analytics_page()
+            return
+
+    if WARM_UP_MODELS:
+        if WARM_UP_BACKGROUND:
+            start_background_warm_up()
+        else:
+            with st.spinner("⏳ Loading models..."):
+                get_registry().warm_up(WARM_UP_MODELS)
+
     uploaded_file = st.file_uploader(
         "🎵 Upload Meeting Audio (.wav, .mp3, ≤ 5 min)",
         type=["wav", "mp3"]
     )
 
-    audio_path = None
-
     if uploaded_file:
-        try:
-            os.makedirs(PROCESSED_DIR, exist_ok=True)
-
-            safe_name = uploaded_file.name.replace(" ", "_")
-            audio_path = os.path.join(PROCESSED_DIR, safe_name)
-
-            with open(audio_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-
-            st.audio(audio_path)
-            st.success(f"✅ Audio saved: {audio_path}")
-
-        except Exception as e:
-            st.error(f"❌ Failed to save audio: {e}")
-            return
-
-    if audio_path and st.button("🔍 Analyze Audio", type="primary"):
-
-        if not os.path.exists(audio_path):
-            st.error("❌ Uploaded audio file not found on disk.")
-            return
-
-        with st.spinner("🔄 Processing audio..."):
-
-            # -------- Step 1: Preprocessing --------
-            st.info("📝 Step 1/5: Preprocessing audio...")
-            processed_audio = preprocess_audio(audio_path)
-
-            if not processed_audio or not os.path.exists(processed_audio):
-                st.error(f"❌ Processed audio file not found: {processed_audio}")
-                return
-
-            # -------- Step 2: Transcription --------
-            st.info("📝 Step 2/5: Transcribing audio...")
-            transcript = transcribe_with_cached_model(processed_audio)
-
-            if not transcript.get("segments"):
-                st.warning("⚠️ No speech detected.")
-                return
-
-            # -------- Step 3: Diarization --------
-            st.info("👥 Step 3/5: Speaker diarization...")
-            diarization = diarize_with_cached_pipeline(processed_audio)
-
-            if not diarization:
-                st.warning("⚠️ No speakers detected.")
-                return
-
-            # -------- Step 4: Bias Analysis --------
-            st.info("🔍 Step 4/5: Bias analysis...")
-            interactions = analyze_bias(transcript, diarization)
-
-            # -------- Step 5: Sentiment --------
-            st.info("💭 Step 5/5: Sentiment analysis...")
-            sentiments = analyze_sentiment_with_cached_model(transcript)
-
-            metrics = compute_fairness_metrics(interactions, sentiments)
-
-            # Save reports
-            json_path = os.path.join(PROCESSED_DIR, "fairness_report.json")
-            save_json_report(metrics, json_path)
+        st.audio(uploaded_file)
 
-            # -------- Results --------
-            st.header("📊 Meeting Fairness Analytics")
-
-            c1, c2, c3, c4 = st.columns(4)
-            c1.metric("Fairness Score", f"{metrics['fairness_score']:.2f}")
-            c2.metric("Dominance Ratio", f"{metrics['dominance_ratio']:.2f}")
-            c3.metric("Interruption Index", f"{metrics['interruption_index']:.2f}")
-            c4.metric("Sentiment Balance", f"{metrics['sentiment_balance']:.2f}")
-
-            st.subheader("📈 Visualizations")
-            st.plotly_chart(plot_talk_times(metrics), use_container_width=True)
-            st.plotly_chart(plot_sentiment(sentiments), use_container_width=True)
-            st.plotly_chart(plot_interruptions(interactions), use_container_width=True)
-
-            st.subheader("📄 Export")
-            pdf_path = os.path.join(PROCESSED_DIR, "fairness_report.pdf")
-
-            if st.button("📄 Generate PDF"):
-                generate_pdf_report(
-                    metrics,
-                    [
-                        plot_talk_times(metrics),
-                        plot_sentiment(sentiments),
-                        plot_interruptions(interactions)
-                    ],
-                    pdf_path
-                )
-                st.success("✅ PDF generated")
-
-            with open(json_path, "r") as f:
-                st.download_button(
-                    "📥 Download JSON",
-                    f.read(),
-                    "fairness_report.json",
-                    "application/json"
-                )
-
-            st.success("✅ Analysis Complete!")
+    streaming = st.checkbox(
+        "🌊 Streaming mode (long recordings, windowed processing)",
+        value=False
+    )
+    use_cache = st.checkbox(
+        "♻️ Reuse cached transcript / diarization / sentiment for this audio",
+        value=True
+    )
+    profiles = list(INFERENCE_PROFILES)
+    profile = st.selectbox(
+        "⚙️ Inference profile (Whisper size, int8 quantization, threads)",
+        profiles,
+        index=profiles.index(get_profile()),
+    )
+    # The profile travels with each job; the process-wide profile is never switched
+    # here, since every session's rerun would switch it under other users' jobs
+    deadline_min = st.number_input(
+        "⏱️ Finish within (minutes, 0 = no deadline); picks the profile, parallelism and stages to fit",
+        min_value=0.0, value=0.0, step=1.0, disabled=streaming,
+    )
+    deadline_s = None if streaming or not deadline_min else deadline_min * 60
+    profile_stages = st.multiselect(
+        "🔬 Capture a profile of these stages (cProfile, or pyinstrument via ECHOETHICS_PROFILER)",
+        [stage.name for stage in meeting_stages()],
+        format_func=lambda name: STAGE_LABELS.get(name, name),
+    )
 
-    if not uploaded_file:
+    with st.expander("🗂️ Meeting details (for team analytics)"):
+        c1, c2, c3 = st.columns(3)
+        meeting_info = {
+            "team": c1.text_input("Team").strip(),
+            "date": c2.date_input("Meeting date", datetime.date.today()),
+            "title": c3.text_input("Title").strip() or (uploaded_file.name if uploaded_file else None),
+        }
+
+    # Analyses run as background jobs on the process-wide manager
+    manager = get_job_manager()
+    polling = False
+
+    with st.expander("⚖️ Compare inference profiles"):
+        other = st.selectbox("Compare against", [p for p in profiles if p != profile])
+        if uploaded_file and st.button("⚖️ Run comparison"):
+            st.session_state["compare_job"] = manager.submit(
+                functools.partial(run_comparison, profile_a=profile, profile_b=other,
+                                  use_cache=use_cache),
+                uploaded_file.getvalue(), uploaded_file.name, label="comparison",
+            )
+        if "compare_job" in st.session_state:
+            status = show_job(st.session_state["compare_job"])
+            if status is None:
+                polling = True
+            elif status["state"] == "unknown":
+                del st.session_state["compare_job"]
+            elif status["state"] == "done":
+                render_comparison(manager.result(status["id"]))
+            else:
+                show_failure("Comparison", status)
+
+    # Results are memoized per upload hash and settings, so reruns, exports and
+    # re-clicking Analyze on the same audio never re-invoke the models
+    analyses = st.session_state.setdefault("analyses", {})
+    if uploaded_file:
+        key = analysis_key(upload_hash(uploaded_file), profile, streaming, deadline_s)
+        st.session_state["analysis_key"] = key
+        if st.button("🔍 Analyze Audio", type="primary"):
+            previous = analyses.get(key)
+            reusable = previous is not None and (
+                previous["result"] is not None
+                or (manager.status(previous["job_id"]) or {}).get("state") not in (None, "failed", "cancelled")
+            )
+            if reusable:
+                st.info("♻️ This audio was already analysed with these settings; showing those results.")
+            else:
+                # One analytics row per recording: re-analysing the same upload replaces it
+                meeting_info.update(meeting_id=f"upload:{upload_hash(uploaded_file)}",
+                                    audio_hash=upload_hash(uploaded_file))
+                analyses[key] = {
+                    "job_id": manager.submit(
+                        functools.partial(run_analysis, streaming=streaming, use_cache=use_cache,
+                                          profile_stages=profile_stages, meeting_info=meeting_info,
+                                          deadline_s=deadline_s, profile=profile),
+                        uploaded_file.getvalue(), uploaded_file.name,
+                    ),
+                    "result": None,
+                    "figures": {},
+                    "exports": {},
+                }
+
+    key = st.session_state.get("analysis_key")
+    if key in analyses:
+        analysis = finished_analysis(key)
+        if analysis is not None:
+            render_results(analysis)
+        else:
+            status = show_job(analyses[key]["job_id"])
+            if status is None:
+                polling = True
+            elif status["state"] == "unknown":
+                # Forget it, so Analyze submits the audio again
+                del analyses[key]
+            elif status["state"] == "done":
+                st.error("❌ The results of this analysis are no longer available.")
+            else:
+                show_failure("Analysis", status)
+    elif not uploaded_file:
         st.info("👆 Upload an audio file to begin.")
 
+    if polling:
+        time.sleep(JOB_POLL_S)
+        st.rerun()
+
 
 if __name__ == "__main__":
     run_dashboard()
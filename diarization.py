@@ -2,28 +2,36 @@
 Speaker diarization using pyannote.audio.
 """
 
-from typing import List, Dict
-import torch
+import importlib.util
+from typing import List, Dict, Union
+import numpy as np
+from core.model_registry import get_model
+from core.segments import SegmentTable
+from utils.audio_utils import load_audio, resolve_audio
+from utils.config import SPEAKER_EMBEDDING_MAX_S, SPEAKER_EMBEDDING_MIN_TURN_S
 
-try:
-    from pyannote.audio import Pipeline as PyannotePipeline
-    PYANNOTE_AVAILABLE = True
-except ImportError:
-    PYANNOTE_AVAILABLE = False
-    print("⚠️  Warning: pyannote.audio not installed. Please run: pip install pyannote.audio")
+# Checked without importing: pyannote (and torch) load with the model on first use
+PYANNOTE_AVAILABLE = importlib.util.find_spec("pyannote") is not None
 
 
-def diarize_speakers(audio_path: str) -> List[Dict]:
+def diarize_speakers(audio_path: Union[str, np.ndarray], sample_rate: int = 16000) -> List[Dict]:
     """
     Perform speaker diarization on audio file.
     
     Args:
-        audio_path: Path to audio file
+        audio_path: Path to audio file, mono samples as a NumPy array,
+            or a .npy buffer from load_audio_to_mmap
+        sample_rate: Sample rate of ``audio_path`` when it is an array
         
     Returns:
         List of segment dicts:
         [{'speaker': 'SPEAKER_00', 'start': float, 'end': float}, ...]
     """
+    return diarize_table(audio_path, sample_rate).to_dicts()
+
+
+def diarize_table(audio_path: Union[str, np.ndarray], sample_rate: int = 16000) -> SegmentTable:
+    """diarize_speakers returning a columnar SegmentTable of turns."""
     if not PYANNOTE_AVAILABLE:
         raise ImportError(
             "pyannote.audio is not installed. Please install it with:\n"
@@ -32,43 +40,69 @@ def diarize_speakers(audio_path: str) -> List[Dict]:
             "  https://huggingface.co/pyannote/speaker-diarization-3.1"
         )
     
-    # Get Hugging Face token from environment variable
-    import os
-    hf_token = os.getenv("HUGGINGFACE_HUB_TOKEN") or os.getenv("HF_TOKEN")
-    
-    try:
-        pipeline = PyannotePipeline.from_pretrained(
-            "pyannote/speaker-diarization-3.1",
-            use_auth_token=hf_token
-        )
-    except Exception as e:
-        # Fallback to older model if 3.1 not available
-        try:
-            pipeline = PyannotePipeline.from_pretrained(
-                "pyannote/speaker-diarization",
-                use_auth_token=hf_token
-            )
-        except Exception as e2:
-            raise ImportError(
-                f"Failed to load pyannote.audio pipeline. "
-                f"Error: {str(e2)}\n\n"
-                f"Please ensure:\n"
-                f"1. You have accepted the model license at:\n"
-                f"   https://huggingface.co/pyannote/speaker-diarization-3.1\n"
-                f"2. Set your Hugging Face token:\n"
-                f"   set HUGGINGFACE_HUB_TOKEN=your_token_here"
-            )
+    # Loaded once per process (CPU-only, token from HUGGINGFACE_HUB_TOKEN / HF_TOKEN)
+    pipeline = get_model("diarization")
+    audio_path = resolve_audio(audio_path)
+    if isinstance(audio_path, np.ndarray):
+        import torch
+        waveform = torch.from_numpy(np.ascontiguousarray(audio_path, dtype=np.float32))
+        diarization = pipeline({"waveform": waveform.unsqueeze(0), "sample_rate": sample_rate})
+    else:
+        diarization = pipeline(audio_path)
     
-    # Ensure CPU-only
-    pipeline.to(torch.device("cpu"))
-    diarization = pipeline(audio_path)
-    
-    segments = []
+    starts, ends, codes, labels = [], [], [], {}
     for turn, _, speaker in diarization.itertracks(yield_label=True):
-        segments.append({
-            "speaker": speaker,
-            "start": turn.start,
-            "end": turn.end
-        })
-    return segments
+        starts.append(turn.start)
+        ends.append(turn.end)
+        codes.append(labels.setdefault(speaker, len(labels)))
+    return SegmentTable(starts, ends, np.asarray(codes, dtype=np.int32), list(labels))
+
+
+def speaker_embeddings(
+    audio_path: Union[str, np.ndarray],
+    diarization: List[Dict],
+    sample_rate: int = 16000,
+    max_s: float = SPEAKER_EMBEDDING_MAX_S,
+    min_turn_s: float = SPEAKER_EMBEDDING_MIN_TURN_S,
+) -> Dict[str, List[float]]:
+    """
+    One voice embedding per diarized speaker, for re-identification
+    across meetings (core.speaker_id).
+
+    Each speaker's longest turns, up to ``max_s`` seconds in total, are
+    embedded separately and averaged weighted by length. Turns shorter than
+    ``min_turn_s`` are used only when the speaker has nothing longer.
+
+    Returns:
+        {'SPEAKER_00': [unit-length float, ...], ...}
+    """
+    audio = resolve_audio(audio_path)
+    if isinstance(audio, str):
+        audio = load_audio(audio)
+    embed = get_model("speaker_embedding")
+
+    turns: Dict[str, List[Dict]] = {}
+    for turn in diarization:
+        turns.setdefault(turn["speaker"], []).append(turn)
 
+    embeddings = {}
+    for speaker, speaker_turns in turns.items():
+        speaker_turns = sorted(speaker_turns, key=lambda t: t["end"] - t["start"], reverse=True)
+        long_turns = [t for t in speaker_turns if t["end"] - t["start"] >= min_turn_s]
+        total, weighted = 0.0, None
+        for turn in long_turns or speaker_turns[:1]:
+            # A single long turn is cut to the remaining budget
+            end = min(turn["end"], turn["start"] + max_s - total)
+            samples = audio[int(turn["start"] * sample_rate):int(end * sample_rate)]
+            if len(samples) == 0:
+                continue
+            length = len(samples) / sample_rate
+            vector = np.asarray(embed(samples, sample_rate), dtype=np.float32) * length
+            weighted = vector if weighted is None else weighted + vector
+            total += length
+            if total >= max_s:
+                break
+        if weighted is not None:
+            norm = float(np.linalg.norm(weighted))
+            embeddings[speaker] = (weighted / norm if norm else weighted).tolist()
+    return embeddings
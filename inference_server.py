@@ -0,0 +1,396 @@
+"""
+Cross-request micro-batching for sentiment inference.
+
+Concurrent analyses (dashboard jobs, streaming windows, live ticks) each
+send a few texts at a time. A MicroBatcher queues those requests and runs
+them through the model together, once ``max_batch`` texts are waiting or
+the oldest request has waited ``max_wait_s``. It runs in-process, shared by
+all threads, or as a local socket service shared by several processes:
+
+    python -m core.inference_server --address 127.0.0.1:8765
+
+Clients look like a transformers pipeline (``pipe(texts, **kwargs)``), so
+classify_texts and analyze_sentiment use them unchanged.
+"""
+
+import argparse
+import collections
+import os
+import queue
+import secrets
+import stat
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.config import (
+    SENTIMENT_BATCH_SIZE,
+    SENTIMENT_MAX_TOKENS,
+    SENTIMENT_SERVER_MAX_BATCH,
+    SENTIMENT_SERVER_MAX_WAIT_S,
+    SENTIMENT_SERVER_KEY,
+    SENTIMENT_SERVER_KEY_FILE,
+)
+from core.model_registry import get_model, get_profile, profile_params
+
+# Latencies kept for the percentiles
+LATENCY_WINDOW = 2000
+
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Runs ``fn(texts) -> results`` (one result per text) on batches merged
+    from concurrent ``submit`` calls by a single dispatcher thread.
+
+    A batch is dispatched when it holds ``max_batch`` texts or its first
+    request has waited ``max_wait_s``; a request larger than ``max_batch``
+    goes out on its own. ``stats()`` reports queue depth, the batch-size
+    histogram and request latency percentiles.
+    """
+
+    def __init__(self, fn: Callable[[List[str]], List[Any]],
+                 max_batch: int = SENTIMENT_SERVER_MAX_BATCH,
+                 max_wait_s: float = SENTIMENT_SERVER_MAX_WAIT_S):
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max_wait_s
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending_texts = 0
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._histogram: Dict[int, int] = collections.Counter()
+        self._latencies: Deque[float] = collections.deque(maxlen=LATENCY_WINDOW)
+        self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue ``texts``; the future resolves to their results in order."""
+        request = _Request(list(texts))
+        if not request.texts:
+            request.future.set_result([])
+            return request.future
+        with self._lock:
+            self._pending_texts += len(request.texts)
+        self._queue.put(request)
+        return request.future
+
+    def __call__(self, texts: List[str]) -> List[Any]:
+        return self.submit(texts).result()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    # ---- dispatcher ----
+
+    def _collect(self, first: _Request) -> Tuple[List[_Request], bool]:
+        batch, size = [first], len(first.texts)
+        deadline = first.enqueued + self.max_wait_s
+        while size < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+            size += len(request.texts)
+        return batch, False
+
+    def _loop(self) -> None:
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+            texts = [text for request in batch for text in request.texts]
+            with self._lock:
+                self._pending_texts -= len(texts)
+            try:
+                results = self.fn(texts)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            pos = 0
+            for request in batch:
+                request.future.set_result(results[pos:pos + len(request.texts)])
+                pos += len(request.texts)
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._texts += len(texts)
+                self._histogram[_bucket(len(texts))] += 1
+                self._latencies.extend(done - request.enqueued for request in batch)
+
+    # ---- metrics ----
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        {
+            'queue_depth': texts waiting, 'batches', 'requests', 'texts',
+            'mean_batch': texts per batch,
+            'batch_histogram': {'≤1': n, '≤2': n, '≤4': n, ...},
+            'p50_ms', 'p99_ms': request latency (queueing + inference),
+        }
+        """
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000.0
+            return {
+                "queue_depth": self._pending_texts,
+                "batches": self._batches,
+                "requests": self._requests,
+                "texts": self._texts,
+                "mean_batch": self._texts / self._batches if self._batches else 0.0,
+                "batch_histogram": {f"≤{size}": n for size, n in sorted(self._histogram.items())},
+                "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+            }
+
+
+def _bucket(size: int) -> int:
+    """Smallest power of two ≥ size."""
+    return 1 << max(0, size - 1).bit_length()
+
+
+# =========================
+# Sentiment service
+# =========================
+
+class BatchedSentimentPipe:
+    """
+    Pipeline-compatible front for a MicroBatcher. Per-call keyword
+    arguments (batch_size, truncation, ...) are ignored: the batcher sorts
+    and sub-batches the merged texts itself, so callers need no tokenizer.
+    """
+
+    tokenizer = None
+
+    def __init__(self, batcher: MicroBatcher):
+        self.batcher = batcher
+
+    def __call__(self, texts: List[str], **kwargs: Any) -> List[Dict[str, Any]]:
+        return self.batcher(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.batcher.stats()
+
+
+def _classify_with_profile(profile: str) -> Callable[[List[str]], List[Dict[str, Any]]]:
+    # Imported here: core.sentiment_analysis picks the server up lazily
+    from core.sentiment_analysis import classify_texts
+
+    params = profile_params(profile)["sentiment"]
+
+    def classify(texts: List[str]) -> List[Dict[str, Any]]:
+        return classify_texts(get_model("sentiment", **params), texts,
+                              SENTIMENT_BATCH_SIZE, SENTIMENT_MAX_TOKENS)
+    return classify
+
+
+_local: Dict[str, BatchedSentimentPipe] = {}
+_local_lock = threading.Lock()
+
+
+def get_local_sentiment_pipe(profile: Optional[str] = None) -> BatchedSentimentPipe:
+    """In-process batched sentiment for the profile's model, shared by all threads."""
+    profile = profile or get_profile()
+    with _local_lock:
+        if profile not in _local:
+            _local[profile] = BatchedSentimentPipe(MicroBatcher(_classify_with_profile(profile)))
+        return _local[profile]
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _read_key_file(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            mode = os.fstat(f.fileno()).st_mode
+            key = f.read().strip()
+    except FileNotFoundError:
+        return None
+    if os.name == "posix" and mode & (stat.S_IRWXG | stat.S_IRWXO):
+        raise RuntimeError(f"Sentiment server key file {path} must be readable by its owner only (chmod 600)")
+    return key or None
+
+
+def server_authkey(create: bool = False, path: str = SENTIMENT_SERVER_KEY_FILE) -> bytes:
+    """
+    The sentiment server's shared key: ECHOETHICS_SENTIMENT_SERVER_KEY, else
+    the contents of ``path``. With ``create`` (the server), a missing file
+    is filled with a random key, readable by the owner only.
+    """
+    if SENTIMENT_SERVER_KEY:
+        return SENTIMENT_SERVER_KEY.encode()
+    key = _read_key_file(path)
+    if key is not None:
+        return key
+    if not create:
+        raise RuntimeError(
+            f"No sentiment server key: set ECHOETHICS_SENTIMENT_SERVER_KEY, or start the server "
+            f"on this machine so it writes one to {path}"
+        )
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    key = secrets.token_hex(32).encode()
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:  # another server got there first
+        return server_authkey(path=path)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+class SentimentClient:
+    """
+    Pipeline-compatible client of ``serve``. Each thread keeps its own
+    connection, so concurrent callers are batched together by the server.
+    Requests carry ``profile``; the server refuses them unless it serves
+    that profile, since callers key their caches by it.
+    """
+
+    tokenizer = None  # the server sorts by tokens
+
+    def __init__(self, address: str, profile: str, authkey: Optional[bytes] = None):
+        self.address = parse_address(address)
+        self.profile = profile
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def _request(self, message: Tuple) -> Any:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Read the key on first use, so clients may start before the server writes it
+            if self.authkey is None:
+                self.authkey = server_authkey()
+            conn = self._local.conn = Client(self.address, authkey=self.authkey)
+        try:
+            conn.send(message)
+            status, payload = conn.recv()
+        except (EOFError, OSError):
+            self._local.conn = None
+            raise
+        if status == "error":
+            raise RuntimeError(f"Sentiment server error: {payload}")
+        return payload
+
+    def __call__(self, texts: List[str], **kwargs: Any) -> List[Dict[str, Any]]:
+        return self._request(("classify", list(texts), self.profile))
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request(("stats",))
+
+
+_clients: Dict[Tuple[str, str], SentimentClient] = {}
+
+
+def get_sentiment_pipe(server: str, profile: Optional[str] = None) -> Any:
+    """
+    The sentiment callable for a SENTIMENT_SERVER setting: "local" for the
+    in-process batcher of ``profile``'s model, "host:port" for a client of
+    a running server, which rejects ``profile`` (default: the process
+    profile) unless it was started with it.
+    """
+    if server == "local":
+        return get_local_sentiment_pipe(profile)
+    key = (server, profile or get_profile())
+    with _local_lock:
+        if key not in _clients:
+            _clients[key] = SentimentClient(server, key[1])
+        return _clients[key]
+
+
+def serve(address: str, authkey: Optional[bytes] = None,
+          report_every_s: float = 0.0) -> None:
+    """
+    Serve batched sentiment on ``address`` (host:port) for the current
+    profile until interrupted. One thread per connection; all of them
+    feed the same batcher. Clients must present ``authkey`` (default:
+    server_authkey, creating the key file if needed), and classify
+    requests for another profile are refused.
+    """
+    authkey = authkey or server_authkey(create=True)
+    profile = get_profile()
+    pipe = get_local_sentiment_pipe(profile)
+    listener = Listener(parse_address(address), backlog=64, authkey=authkey)
+
+    def handle(conn) -> None:
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if message[0] == "classify" and message[2] != profile:
+                        conn.send(("error", f"this server serves profile {profile!r}, "
+                                            f"not {message[2]!r}"))
+                    elif message[0] == "classify":
+                        conn.send(("ok", pipe(message[1])))
+                    elif message[0] == "stats":
+                        conn.send(("ok", pipe.stats()))
+                    else:
+                        conn.send(("error", f"unknown request {message[0]!r}"))
+                except Exception as e:
+                    conn.send(("error", str(e)))
+
+    if report_every_s > 0:
+        def report() -> None:
+            while True:
+                time.sleep(report_every_s)
+                print(f"📊 {pipe.stats()}")
+        threading.Thread(target=report, daemon=True).start()
+
+    print(f"🧮 Sentiment server on {address} (profile {profile}; key "
+          f"{'from ECHOETHICS_SENTIMENT_SERVER_KEY' if SENTIMENT_SERVER_KEY else 'in ' + SENTIMENT_SERVER_KEY_FILE})")
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError) as e:
+                print(f"⚠️  Rejected a connection: {e}")
+                continue
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve micro-batched sentiment inference locally.")
+    parser.add_argument("--address", default="127.0.0.1:8765", help="host:port to listen on")
+    parser.add_argument("--report-every", type=float, default=30.0,
+                        help="print queue and latency stats every N seconds (0 = never)")
+    args = parser.parse_args(argv)
+    serve(args.address, report_every_s=args.report_every)
+
+
+if __name__ == "__main__":
+    main()
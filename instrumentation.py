@@ -0,0 +1,220 @@
+"""
+Per-stage instrumentation: wall and CPU time, peak RSS growth, input size
+and real-time factor for each pipeline stage, optional cProfile /
+pyinstrument captures, and export as JSON lines or Prometheus text format.
+"""
+
+import contextlib
+import cProfile
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from utils.config import PROFILER, PROFILES_DIR, STAGE_METRICS_JSONL, STAGE_METRICS_PROM
+
+PYINSTRUMENT_AVAILABLE = importlib.util.find_spec("pyinstrument") is not None
+
+StageStats = Dict[str, Dict[str, Any]]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Process high-water RSS in MB (None where getrusage is unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux and the BSDs KiB
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def input_size(args: Tuple) -> Tuple[int, str]:
+    """
+    Size of a stage's inputs: bytes of audio (arrays or files), else the
+    number of segments / turns in its transcript-like inputs.
+    """
+    nbytes = segments = 0
+    for arg in args:
+        if isinstance(arg, np.ndarray):
+            nbytes += arg.nbytes
+        elif isinstance(arg, str) and os.path.isfile(arg):
+            nbytes += os.path.getsize(arg)
+        elif isinstance(arg, dict):
+            items = arg.get("segments", arg.get("per_segment"))
+            segments += len(items) if isinstance(items, list) else 0
+        elif not isinstance(arg, str) and hasattr(arg, "__len__"):
+            segments += len(arg)
+    return (nbytes, "bytes") if nbytes else (segments, "segments")
+
+
+def _profile_path(stage: str, suffix: str) -> str:
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(PROFILES_DIR, f"{stage}-{stamp}-{uuid.uuid4().hex[:6]}{suffix}")
+
+
+def profiled_call(stage: str, fn: Callable[..., Any], args: Tuple,
+                  profiler: str = PROFILER) -> Tuple[Any, str]:
+    """
+    Run ``fn(*args)`` under a profiler and save the capture under
+    PROFILES_DIR: a pstats dump (``.prof``, open with snakeviz or pstats)
+    or, with ``profiler="pyinstrument"`` and pyinstrument installed, an
+    HTML flame view. Returns (result, capture path).
+    """
+    if profiler == "pyinstrument" and PYINSTRUMENT_AVAILABLE:
+        from pyinstrument import Profiler
+
+        sampler = Profiler()
+        sampler.start()
+        try:
+            result = fn(*args)
+        finally:
+            sampler.stop()
+        path = _profile_path(stage, ".html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(sampler.output_html())
+        return result, path
+
+    profile = cProfile.Profile()
+    try:
+        result = profile.runcall(fn, *args)
+    finally:
+        path = _profile_path(stage, ".prof")
+        profile.dump_stats(path)
+    return result, path
+
+
+def measure(stage: str, fn: Callable[..., Any], args: Tuple,
+            profile: bool = False) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Run one stage and describe it.
+
+    CPU time is the process's (all threads), so in thread mode it includes
+    whatever ran concurrently; in serial and process mode it is the
+    stage's own. The RSS figure is how far the stage raised the process's
+    peak, which is the number that decides whether a run fits in memory.
+
+    Returns:
+        (result, {'stage', 'wall_s', 'cpu_s', 'peak_rss_delta_mb',
+                  'input_size', 'input_unit', 'profile_path'})
+    """
+    size, unit = input_size(args)
+    rss_before = peak_rss_mb()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    profile_path = None
+    if profile:
+        result, profile_path = profiled_call(stage, fn, args)
+    else:
+        result = fn(*args)
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    rss_after = peak_rss_mb()
+
+    return result, {
+        "stage": stage,
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "peak_rss_delta_mb": None if rss_before is None else rss_after - rss_before,
+        "input_size": size,
+        "input_unit": unit,
+        "profile_path": profile_path,
+    }
+
+
+@contextlib.contextmanager
+def stage_timer(stage: str, stats: StageStats, audio_s: Optional[float] = None) -> Iterator[None]:
+    """Record a step outside the pipeline DAG (reporting, plotting) into ``stats``."""
+    rss_before = peak_rss_mb()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start
+        stats[stage] = {
+            "stage": stage,
+            "wall_s": wall,
+            "cpu_s": time.process_time() - cpu_start,
+            "peak_rss_delta_mb": None if rss_before is None else peak_rss_mb() - rss_before,
+            "input_size": 0,
+            "input_unit": "segments",
+            "profile_path": None,
+            "rtf": wall / audio_s if audio_s else None,
+        }
+
+
+def add_rtf(stats: StageStats, audio_s: Optional[float]) -> StageStats:
+    """Set each record's real-time factor (wall seconds per audio second)."""
+    for record in stats.values():
+        record["rtf"] = record["wall_s"] / audio_s if audio_s else None
+    return stats
+
+
+# =========================
+# Export
+# =========================
+
+def write_jsonl(stats: StageStats, path: str = STAGE_METRICS_JSONL,
+                **run_info: Any) -> str:
+    """Append one JSON line per stage, tagged with a run id, time and ``run_info``."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    run = {"run_id": uuid.uuid4().hex[:12], "timestamp": time.time(), **run_info}
+    lines = "".join(json.dumps(dict(run, **record)) + "\n" for record in stats.values())
+    # One write per run, so concurrent workers appending never interleave lines
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(lines)
+    return path
+
+
+# (metric name, record key, help text)
+PROMETHEUS_METRICS = [
+    ("echoethics_stage_wall_seconds", "wall_s", "Wall-clock time of the last run of each stage."),
+    ("echoethics_stage_cpu_seconds", "cpu_s", "Process CPU time during the last run of each stage."),
+    ("echoethics_stage_peak_rss_delta_megabytes", "peak_rss_delta_mb",
+     "Growth of the process peak RSS during the last run of each stage."),
+    ("echoethics_stage_input_size", "input_size", "Input size of the last run (see the unit label)."),
+    ("echoethics_stage_real_time_factor", "rtf", "Stage wall time per second of audio."),
+]
+
+
+def prometheus_text(stats: StageStats) -> str:
+    """Gauges in the Prometheus text exposition format, one series per stage."""
+    lines: List[str] = []
+    for name, key, help_text in PROMETHEUS_METRICS:
+        samples = [(stage, record) for stage, record in stats.items() if record.get(key) is not None]
+        if not samples:
+            continue
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for stage, record in samples:
+            labels = f'stage="{stage}"'
+            if key == "input_size":
+                labels += f',unit="{record["input_unit"]}"'
+            lines.append(f"{name}{{{labels}}} {float(record[key]):.6g}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(stats: StageStats, path: str = STAGE_METRICS_PROM) -> str:
+    """
+    Write the latest run for node_exporter's textfile collector. The file
+    is replaced atomically so a scrape never sees a partial write.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(stats))
+    os.replace(tmp_path, path)
+    return path
+
+
+def export_stats(stats: StageStats, **run_info: Any) -> None:
+    """Append to the JSON-lines log and refresh the Prometheus file."""
+    write_jsonl(stats, **run_info)
+    write_prometheus(stats)
@@ -0,0 +1,378 @@
+"""
+Background analysis jobs: a bounded local worker pool with per-job working
+directories, pollable per-stage progress, and results retrievable by job id.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from utils.analytics_store import get_analytics_store
+from utils.audio_utils import get_audio_duration
+from utils.config import (
+    ANALYTICS_ENABLED, JOBS_DIR, JOB_MAX_CONCURRENT, JOB_RETENTION_S, STAGE_METRICS_EXPORT
+)
+from utils.report_utils import save_json_report
+from utils.result_cache import get_result_cache, json_default
+from core.bias_detection import analyze_bias
+from core.instrumentation import StageStats, export_stats, stage_timer
+from core.metrics import compute_fairness_metrics
+from core.model_registry import get_profile
+from core.pipeline import PipelineExecutor, meeting_stages
+from core.scheduler import run_plan, schedule
+from core.streaming import stream_analysis, merge_stream_chunks
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+RESULT_FILE = "result.json"
+REPORT_FILE = "fairness_report.json"
+
+
+def _dump_result(result: Any, path: str) -> None:
+    """Write a task result as JSON (tuple-keyed interruption_pairs become a list)."""
+    if isinstance(result, dict) and isinstance(result.get("interactions"), dict):
+        interactions = result["interactions"]
+        pairs = interactions.get("interruption_pairs", {})
+        result = dict(result, interactions=dict(interactions, interruption_pairs=[
+            {"interrupter": a, "interrupted": b, "count": count} for (a, b), count in pairs.items()
+        ]))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, default=json_default)
+
+
+def _load_result(path: str) -> Any:
+    """Inverse of _dump_result (sets come back as lists)."""
+    with open(path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    if isinstance(result, dict) and isinstance(result.get("interactions"), dict):
+        interactions = result["interactions"]
+        interactions["interruption_pairs"] = {
+            (pair["interrupter"], pair["interrupted"]): pair["count"]
+            for pair in interactions.get("interruption_pairs", [])
+        }
+    return result
+
+
+class Job:
+    """
+    One submitted task. Tasks receive the Job and report progress through
+    ``stage`` (a pipeline ProgressCallback) or ``set_progress``.
+    """
+
+    def __init__(self, job_id: str, label: str, workdir: str, audio_path: str):
+        self.id = job_id
+        self.label = label
+        self.workdir = workdir
+        self.audio_path = audio_path
+        self.state = QUEUED
+        self.stages: Dict[str, str] = {}
+        self.expected_stages = 0
+        self.progress: Optional[float] = None
+        self.message = ""
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, state: str) -> None:
+        """progress(stage, "started" | "done"), as passed to analyze_meeting."""
+        with self._lock:
+            self.stages[name] = "running" if state == "started" else state
+
+    def set_progress(self, fraction: float, message: str = "") -> None:
+        with self._lock:
+            self.progress = max(0.0, min(1.0, fraction))
+            self.message = message
+
+    def fraction(self) -> float:
+        """Explicit progress if set, else the share of expected stages done."""
+        if self.state == DONE:
+            return 1.0
+        if self.progress is not None:
+            return self.progress
+        done = sum(1 for state in self.stages.values() if state == "done")
+        return min(1.0, done / self.expected_stages) if self.expected_stages else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "id": self.id,
+                "label": self.label,
+                "state": self.state,
+                "stages": dict(self.stages),
+                "progress": self.fraction(),
+                "message": self.message,
+                "error": self.error,
+                "workdir": self.workdir,
+                "audio_path": self.audio_path,
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+            }
+
+
+class JobManager:
+    """
+    Runs submitted tasks on at most ``max_concurrent`` worker threads.
+
+    Each job gets ``root/<job id>/`` holding its input audio, reports and
+    ``result.json``, so concurrent users never share output files. Models
+    come from the process-wide registry and are shared between jobs.
+    Finished jobs are kept for ``retention_s`` seconds; their results can
+    be read back from disk after the in-memory copy is dropped.
+    """
+
+    def __init__(self, root: str = JOBS_DIR, max_concurrent: int = JOB_MAX_CONCURRENT,
+                 retention_s: float = JOB_RETENTION_S):
+        self.root = root
+        self.max_concurrent = max(1, max_concurrent)
+        self.retention_s = retention_s
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._futures: Dict[str, Future] = {}
+        self._results: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    # ---- submission ----
+
+    def submit(self, task: Callable[[Job], Any], audio: Union[bytes, str],
+               filename: str = "audio.wav", label: str = "analysis") -> str:
+        """
+        Queue ``task(job)`` on a copy of ``audio`` (bytes or a file path)
+        placed in the job's working directory. Returns the job id.
+        """
+        self.cleanup()
+        job_id = uuid.uuid4().hex[:12]
+        workdir = os.path.join(self.root, job_id)
+        os.makedirs(workdir, exist_ok=True)
+
+        ext = os.path.splitext(filename)[1].lower() or ".wav"
+        audio_path = os.path.join(workdir, f"input{ext}")
+        if isinstance(audio, (bytes, bytearray, memoryview)):
+            with open(audio_path, "wb") as f:
+                f.write(audio)
+        else:
+            shutil.copyfile(audio, audio_path)
+
+        job = Job(job_id, label, workdir, audio_path)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._futures[job_id] = self._pool.submit(self._run, job, task)
+        return job_id
+
+    def _run(self, job: Job, task: Callable[[Job], Any]) -> None:
+        with job._lock:
+            if job.state == CANCELLED:
+                return
+            job.state, job.started = RUNNING, time.time()
+        try:
+            result = task(job)
+            _dump_result(result, os.path.join(job.workdir, RESULT_FILE))
+            with self._lock:
+                self._results[job.id] = result
+            state, error = DONE, None
+        except Exception as e:
+            traceback.print_exc()
+            state, error = FAILED, str(e) or type(e).__name__
+        with job._lock:
+            job.state, job.error, job.finished = state, error, time.time()
+
+    # ---- queries ----
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Snapshot of a job, with 'queue_position' while it waits (None if unknown)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = job.snapshot()
+            if snapshot["state"] == QUEUED:
+                snapshot["queue_position"] = sum(
+                    1 for other in self._jobs.values()
+                    if other.state == QUEUED and other.created < job.created
+                ) + 1
+        return snapshot
+
+    def result(self, job_id: str) -> Optional[Any]:
+        """Result of a finished job, from memory or its working directory."""
+        with self._lock:
+            if job_id in self._results:
+                return self._results[job_id]
+        try:
+            return _load_result(os.path.join(self.root, job_id, RESULT_FILE))
+        except (OSError, ValueError):
+            return None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Block until the job finishes (or ``timeout``); returns its status."""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass
+        return self.status(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = list(self._jobs)
+        return [status for status in map(self.status, ids) if status is not None]
+
+    # ---- housekeeping ----
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            future = self._futures.get(job_id)
+        if job is None:
+            return False
+        with job._lock:
+            if job.state != QUEUED:
+                return False
+            job.state, job.finished = CANCELLED, time.time()
+        if future is not None:
+            future.cancel()
+        return True
+
+    def cleanup(self) -> int:
+        """Remove finished jobs older than ``retention_s``. Returns the count removed."""
+        cutoff = time.time() - self.retention_s
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.state in FINISHED and (job.finished or 0) < cutoff
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+                self._futures.pop(job.id, None)
+                self._results.pop(job.id, None)
+        for job in expired:
+            shutil.rmtree(job.workdir, ignore_errors=True)
+        return len(expired)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+# =========================
+# Standard Tasks
+# =========================
+
+def run_analysis(job: Job, streaming: bool = False, use_cache: bool = True,
+                 profile_stages: Sequence[str] = (),
+                 meeting_info: Optional[Dict[str, Any]] = None,
+                 deadline_s: Optional[float] = None,
+                 profile: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Full meeting analysis of ``job.audio_path``, whole-file or windowed.
+    Writes the JSON report to the job's working directory and returns the
+    analyze_meeting result (plus 'report_path'). ``profile_stages`` are
+    captured with the profiler (whole-file mode only). ``profile`` is the
+    inference profile chosen when the job was submitted (default: the
+    process profile when it starts); the run uses it throughout, whatever
+    other sessions select meanwhile. The metrics are
+    appended to the analytics store, tagged with ``meeting_info`` (team,
+    date, title, meeting_id; see analytics_store.meeting_rows).
+
+    With ``deadline_s`` (seconds from submission), the whole-file run uses
+    the configuration core.scheduler predicts will finish in time; the
+    plan and its predicted vs actual time are in the result and report
+    under 'schedule'.
+    """
+    profile = profile or get_profile()
+    if streaming:
+        total = get_audio_duration(job.audio_path) or 1.0
+        stats: StageStats = {}
+        chunks = []
+        with stage_timer("streaming", stats, total):
+            for chunk in stream_analysis(job.audio_path, profile=profile):
+                chunks.append(chunk)
+                job.set_progress(chunk["end"] / total, f"Analyzed up to {chunk['end'] / 60:.1f} min")
+            transcript, diarization, sentiments = merge_stream_chunks(chunks)
+        with stage_timer("bias", stats, total):
+            interactions = analyze_bias(transcript, diarization)
+        with stage_timer("metrics", stats, total):
+            metrics = compute_fairness_metrics(interactions, sentiments)
+        result = {
+            "transcript": transcript,
+            "diarization": diarization,
+            "interactions": interactions,
+            "sentiments": sentiments,
+            "metrics": metrics,
+            "timings": {name: record["wall_s"] for name, record in stats.items()},
+            "stages": stats,
+            "audio_s": total,
+            "cached": [],
+            "vad": None,
+            "speaker_embeddings": None,
+            "speaker_ids": {},
+            "skipped": [],
+            "schedule": None,
+            "profile": profile,
+        }
+    else:
+        try:
+            audio_s = get_audio_duration(job.audio_path)
+        except Exception:
+            audio_s = None
+        executor = PipelineExecutor()
+        waited_s = (job.started or job.created) - job.created
+        plan = schedule(audio_s, deadline_s, waited_s, executor.mode, profile=profile)
+        job.expected_stages = len(meeting_stages(skip=plan["skip"] if plan else ()))
+        try:
+            result = run_plan(
+                job.audio_path, plan, waited_s, executor=executor, progress=job.stage,
+                cache=get_result_cache() if use_cache else None, profile_stages=profile_stages,
+                profile=profile,
+            )
+        finally:
+            executor.close()
+
+    # Reports carry the meeting_id and interruptions so analytics_store can import them faithfully
+    meeting_id = (meeting_info or {}).get("meeting_id") or f"job:{job.id}"
+    report_path = os.path.join(job.workdir, REPORT_FILE)
+    with stage_timer("report", result["stages"], result["audio_s"]):
+        save_json_report(dict(result["metrics"], meeting_id=meeting_id,
+                              interruptions=result["interactions"].get("interruptions", {}),
+                              word_counts=result["interactions"].get("word_counts"),
+                              stage_timings=result["timings"], schedule=result["schedule"]), report_path)
+    result["timings"]["report"] = result["stages"]["report"]["wall_s"]
+    result["report_path"] = report_path
+    if ANALYTICS_ENABLED:
+        info = dict(meeting_info or {}, meeting_id=meeting_id)
+        info.setdefault("speaker_names", {
+            label: match["name"] for label, match in result.get("speaker_ids", {}).items() if match["name"]
+        })
+        result["meeting_id"] = get_analytics_store().record_meeting(
+            result["metrics"], result["interactions"], source=job.label,
+            duration_s=result["audio_s"], profile=result["profile"],
+            mode="streaming" if streaming else "pipeline", **info,
+        )
+    if STAGE_METRICS_EXPORT:
+        export_stats(result["stages"], source=job.audio_path, job_id=job.id,
+                     mode="streaming" if streaming else "pipeline", profile=result["profile"])
+    return result
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Process-wide job manager under JOBS_DIR."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager()
+    return _manager
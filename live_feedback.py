@@ -1,15 +1,35 @@
 """
-Optional: Real-time fairness feedback module (console-based).
+Real-time fairness feedback: a live engine over a PCM audio feed
+(file, FIFO or local socket as a microphone stand-in) plus console cues.
 """
 
+import argparse
+import socket
+import sys
 import time
-from typing import Dict
+from collections import deque
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+import numpy as np
+
+from utils.config import (
+    LIVE_SAMPLE_RATE,
+    LIVE_TICK_S,
+    LIVE_CONTEXT_S,
+    LIVE_LATENCY_TARGET_S,
+)
+from core.accumulator import MeetingAccumulator
+from core.diarization import diarize_speakers
+from core.sentiment_analysis import analyze_sentiment
+from core.alignment import align_transcript
+from core.speech_to_text import transcribe_audio
+from core.streaming import SpeakerStitcher, shifted_speech_regions
 
 
 def live_fairness_feedback(metrics: Dict) -> None:
     """
     Prints gentle real-time fairness cues to console.
-    
+
     Args:
         metrics: Computed fairness metrics
     """
@@ -22,9 +42,209 @@ def live_fairness_feedback(metrics: Dict) -> None:
         print("✅ Meeting participation is balanced.")
 
 
-# Example usage:
-# while meeting_on:
-#     metrics = compute_fairness_metrics(...)
-#     live_fairness_feedback(metrics)
-#     time.sleep(5)
+# =========================
+# PCM Sources
+# =========================
+
+def open_pcm_source(source: str) -> BinaryIO:
+    """
+    Open a raw PCM feed (16-bit little-endian mono).
+
+    Args:
+        source: '-' for stdin, 'tcp://host:port', 'unix:///path/to.sock',
+            or a path to a regular file or FIFO
+
+    Returns:
+        Binary file-like object
+    """
+    if source == "-":
+        return sys.stdin.buffer
+    if source.startswith("tcp://"):
+        host, port = source[len("tcp://"):].rsplit(":", 1)
+        sock = socket.create_connection((host, int(port)))
+    elif source.startswith("unix://"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(source[len("unix://"):])
+    else:
+        return open(source, "rb")
+    stream = sock.makefile("rb")
+    sock.close()  # the socket stays open until the stream is closed
+    return stream
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    """Read ``size`` bytes, or fewer only at end of stream."""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        data = stream.read(remaining)
+        if not data:
+            break
+        chunks.append(data)
+        remaining -= len(data)
+    return b"".join(chunks)
+
+
+# =========================
+# Live Engine
+# =========================
+
+class LiveFeedbackEngine:
+    """
+    Consumes a PCM feed tick by tick and keeps fairness metrics current.
+
+    Every tick the models see the last ``context_s`` seconds of audio, but
+    only segments in the newly arrived span are committed to a
+    MeetingAccumulator, so metric updates cost O(new segments). Latency is
+    measured from the moment a tick's last sample is read to the moment its
+    metrics are published.
+    """
+
+    def __init__(
+        self,
+        tick_s: float = LIVE_TICK_S,
+        context_s: float = LIVE_CONTEXT_S,
+        latency_target_s: float = LIVE_LATENCY_TARGET_S,
+        sample_rate: int = LIVE_SAMPLE_RATE,
+        window_s: Optional[float] = None,
+        on_update: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+    ):
+        self.tick_s = tick_s
+        self.context_s = max(context_s, tick_s)
+        self.latency_target_s = latency_target_s
+        self.sample_rate = sample_rate
+        self.on_update = on_update or (lambda metrics, tick: live_fairness_feedback(metrics))
+
+        self.state = MeetingAccumulator(window_s=window_s)
+        self._stitcher = SpeakerStitcher()
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._context_len = int(self.context_s * sample_rate)
+        self._total_samples = 0
+        self._committed_until = 0.0
+        self._latencies: deque = deque(maxlen=1000)
+        self.ticks = 0
+        self.missed_deadlines = 0
+
+    def process_chunk(self, pcm: bytes, arrived_at: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Ingest one tick of 16-bit PCM and return the updated metrics.
+
+        Args:
+            pcm: Raw little-endian int16 mono samples
+            arrived_at: time.perf_counter() when the chunk finished arriving
+        """
+        arrived_at = time.perf_counter() if arrived_at is None else arrived_at
+        samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+        self._buffer = np.concatenate([self._buffer, samples])[-self._context_len:]
+        self._total_samples += len(samples)
+
+        buf_end = self._total_samples / self.sample_rate
+        buf_start = buf_end - len(self._buffer) / self.sample_rate
+        commit_from = self._committed_until
+
+        transcript = transcribe_audio(self._buffer)
+        new_segments = []
+        for seg in transcript["segments"]:
+            start, end = seg["start"] + buf_start, seg["end"] + buf_start
+            if commit_from <= (start + end) / 2 < buf_end:
+                new_segments.append(dict(seg, start=start, end=end))
+
+        turns = [
+            dict(turn, start=turn["start"] + buf_start, end=turn["end"] + buf_start)
+            for turn in diarize_speakers(self._buffer, self.sample_rate)
+        ]
+        turns = self._stitcher.stitch(turns, buf_start, commit_from)
+        new_turns = []
+        for turn in turns:
+            start, end = max(turn["start"], commit_from), min(turn["end"], buf_end)
+            if end > start:
+                new_turns.append(dict(turn, start=start, end=end))
+
+        new_segments = align_transcript({"segments": new_segments}, turns)["segments"]
+        self.state.add_turns(new_turns)
+        self.state.add_segments(new_segments)
+        self.state.add_sentiments(analyze_sentiment({
+            "segments": new_segments, **shifted_speech_regions(transcript, buf_start)
+        })["per_segment"])
+        self._committed_until = buf_end
+
+        metrics = self.state.metrics()
+        latency = time.perf_counter() - arrived_at
+        self._latencies.append(latency)
+        self.ticks += 1
+        if latency > self.latency_target_s:
+            self.missed_deadlines += 1
+
+        self.on_update(metrics, {
+            "tick": self.ticks,
+            "audio_time": buf_end,
+            "new_segments": len(new_segments),
+            "new_turns": len(new_turns),
+            "latency_s": latency,
+        })
+        return metrics
+
+    def run(self, source: str, max_ticks: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Process a PCM feed until it ends (or ``max_ticks``).
+        Returns the final metrics.
+        """
+        tick_bytes = int(self.tick_s * self.sample_rate) * 2
+        metrics = self.state.metrics()
+        stream = open_pcm_source(source)
+        try:
+            while max_ticks is None or self.ticks < max_ticks:
+                pcm = _read_exact(stream, tick_bytes)
+                if len(pcm) < 2:
+                    break
+                metrics = self.process_chunk(pcm[:len(pcm) - len(pcm) % 2], time.perf_counter())
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+        return metrics
+
+    def latency_stats(self) -> Dict[str, float]:
+        """p50 / p95 / max processing latency (seconds) over recent ticks."""
+        if not self._latencies:
+            return {"p50": 0.0, "p95": 0.0, "max": 0.0, "target": self.latency_target_s,
+                    "missed": self.missed_deadlines, "ticks": self.ticks}
+        values = sorted(self._latencies)
+        return {
+            "p50": values[len(values) // 2],
+            "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+            "max": values[-1],
+            "target": self.latency_target_s,
+            "missed": self.missed_deadlines,
+            "ticks": self.ticks,
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Live fairness feedback over a PCM feed.")
+    parser.add_argument("source", help="'-', file/FIFO path, tcp://host:port or unix:///path")
+    parser.add_argument("--tick", type=float, default=LIVE_TICK_S, help="seconds per update")
+    parser.add_argument("--context", type=float, default=LIVE_CONTEXT_S, help="seconds of audio per model call")
+    parser.add_argument("--latency-target", type=float, default=LIVE_LATENCY_TARGET_S)
+    parser.add_argument("--window", type=float, default=None,
+                        help="only score the last N seconds (default: whole meeting)")
+    args = parser.parse_args(argv)
+
+    def report(metrics: Dict[str, Any], tick: Dict[str, Any]) -> None:
+        print(f"[{tick['audio_time']:7.1f}s] fairness={metrics['fairness_score']:.2f} "
+              f"dominance={metrics['dominance_ratio']:.2f} "
+              f"interruptions={metrics['interruption_index']:.2f} "
+              f"latency={tick['latency_s']:.2f}s")
+        live_fairness_feedback(metrics)
+
+    engine = LiveFeedbackEngine(
+        args.tick, args.context, args.latency_target,
+        window_s=args.window, on_update=report
+    )
+    engine.run(args.source)
+    stats = engine.latency_stats()
+    print(f"Latency p50={stats['p50']:.2f}s p95={stats['p95']:.2f}s max={stats['max']:.2f}s "
+          f"(target {stats['target']:.2f}s, missed {stats['missed']}/{stats['ticks']})")
+
 
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,17 @@
 Compute fairness/relevant meeting metrics and score.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Optional, Tuple
+import numpy as np
+
+from core.segments import as_table
+
+
+def _label_mask(segs, label: str) -> np.ndarray:
+    """Boolean mask of segments with sentiment ``label``."""
+    if segs.sentiment_codes is None or label not in segs.sentiment_labels:
+        return np.zeros(len(segs), dtype=bool)
+    return segs.sentiment_codes == segs.sentiment_labels.index(label)
 
 
 def compute_fairness_metrics(interactions: Dict, sentiments: Dict) -> Dict[str, Any]:
@@ -11,14 +21,75 @@ def compute_fairness_metrics(interactions: Dict, sentiments: Dict) -> Dict[str,
     
     Args:
         interactions: Bias analysis results
-        sentiments: Sentiment analysis results
+        sentiments: Sentiment analysis results (per_segment as dicts or a SegmentTable;
+            'skipped' when the sentiment stage was left out)
         
     Returns:
         Metrics dict with fairness score and all computed metrics
     """
-    speakers = list(interactions.get("speakers", []))
-    talk_times = interactions.get("talk_times", {})
-    interruptions = interactions.get("interruptions", {})
+    segs = as_table(sentiments.get("per_segment", []))
+    pos, neg = _label_mask(segs, "POSITIVE"), _label_mask(segs, "NEGATIVE")
+    pos_count, neg_count = int(pos.sum()), int(neg.sum())
+
+    # (positive, negative, total) per speaker, for speaker-attributed segments
+    attributed = segs.codes >= 0
+    n_speakers = len(segs.labels)
+    per_speaker = [
+        np.bincount(segs.codes[attributed & mask], minlength=n_speakers).tolist()
+        for mask in (pos, neg, attributed)
+    ]
+    speaker_counts = {
+        spk: (per_speaker[0][c], per_speaker[1][c], per_speaker[2][c])
+        for c, spk in enumerate(segs.labels)
+    }
+
+    return fairness_from_aggregates(
+        interactions.get("speakers", []),
+        interactions.get("talk_times", {}),
+        interactions.get("interruptions", {}),
+        pos_count,
+        neg_count,
+        len(segs),
+        speaker_counts,
+        interactions.get("word_counts"),
+        sentiment_skipped=bool(sentiments.get("skipped")),
+    )
+
+
+def fairness_from_aggregates(
+    speakers: Iterable[str],
+    talk_times: Dict[str, float],
+    interruptions: Dict[str, int],
+    pos_count: int,
+    neg_count: int,
+    segment_count: int,
+    speaker_sentiment_counts: Optional[Dict[str, Tuple[int, int, int]]] = None,
+    word_counts: Optional[Dict[str, int]] = None,
+    sentiment_skipped: bool = False,
+) -> Dict[str, Any]:
+    """
+    Fairness metrics from pre-aggregated counts.
+
+    Shared by compute_fairness_metrics and the incremental (live) paths,
+    so every caller produces identical numbers for identical counts.
+    Cost is O(speakers), independent of meeting length.
+
+    Args:
+        speakers: Speaker labels
+        talk_times: {speaker: seconds}
+        interruptions: {speaker: count}
+        pos_count, neg_count: POSITIVE / NEGATIVE sentiment segment counts
+        segment_count: Total sentiment segments
+        speaker_sentiment_counts: {speaker: (positive, negative, total)}
+        word_counts: {speaker: words spoken}
+        sentiment_skipped: Sentiment was not analysed; sentiment_balance is
+            then None and the fairness score rests on talk time and
+            interruptions alone
+
+    Returns:
+        Metrics dict with fairness score and all computed metrics
+    """
+    speakers = list(speakers)
     total_talk = sum(talk_times.values()) or 1
 
     # Dominance: max talktime ratio over mean
@@ -40,31 +111,50 @@ def compute_fairness_metrics(interactions: Dict, sentiments: Dict) -> Dict[str,
         interruption_index = 0.0
 
     # Sentiment: ratio of positive to negative
-    segs = sentiments.get("per_segment", [])
-    if len(segs) > 0:
-        pos_count = sum(1 for s in segs if s.get("label") == "POSITIVE")
-        neg_count = sum(1 for s in segs if s.get("label") == "NEGATIVE")
-        sentiment_balance = (pos_count - neg_count) / len(segs)
+    if sentiment_skipped:
+        sentiment_balance = None
+    elif segment_count > 0:
+        sentiment_balance = (pos_count - neg_count) / segment_count
     else:
         sentiment_balance = 0.0
 
     # Fairness score: aggregate normalized
     # Lower dominance/interruption, higher sentiment → higher fairness
+    # (without the sentiment term when sentiment was skipped)
     fairness_score = max(
         0.0,
         1.0
         - 0.4 * (dominance_ratio - 1)
         - 0.4 * interruption_index
-        + 0.2 * sentiment_balance,
+        + 0.2 * (sentiment_balance or 0.0),
     )
     fairness_score = min(1.0, max(0.0, fairness_score))
 
+    # Per-speaker sentiment balance, same formula as the meeting-wide one
+    speaker_sentiment = {
+        spk: (pos - neg) / total
+        for spk, (pos, neg, total) in (speaker_sentiment_counts or {}).items()
+        if total > 0
+    }
+
+    # Speaking rate: words per minute of that speaker's talk time
+    speaking_rate_wpm = {}
+    if word_counts:
+        speaking_rate_wpm = {
+            spk: word_counts.get(spk, 0) / (talk_times[spk] / 60)
+            for spk in talk_times
+            if talk_times[spk] > 0
+        }
+
     return {
         "speakers": speakers,
         "talk_times": talk_times,
         "dominance_ratio": dominance_ratio,
         "interruption_index": interruption_index,
         "sentiment_balance": sentiment_balance,
+        "sentiment_skipped": sentiment_skipped,
         "fairness_score": fairness_score,
+        "speaker_sentiment": speaker_sentiment,
+        "speaking_rate_wpm": speaking_rate_wpm,
     }
 
@@ -0,0 +1,437 @@
+"""
+Process-wide registry of lazily loaded ML models (Whisper, sentiment,
+diarization, speaker embeddings).
+"""
+
+import gc
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from utils.config import (
+    WHISPER_MODEL_SIZE,
+    SENTIMENT_MODEL,
+    DIARIZATION_MODEL,
+    DIARIZATION_FALLBACK_MODEL,
+    SPEAKER_EMBEDDING_MODEL,
+    MODEL_MEMORY_BUDGET_MB,
+    INFERENCE_PROFILES,
+    INFERENCE_PROFILE,
+)
+
+Loader = Callable[..., Any]
+SizeEstimate = Union[float, Callable[..., float]]
+
+# Approximate fp32 footprint of the Whisper checkpoints (MB)
+WHISPER_SIZES_MB = {
+    "tiny": 150,
+    "base": 300,
+    "small": 970,
+    "medium": 3100,
+    "large": 6200,
+}
+# Share of that footprint left after int8 quantization of the Linear layers
+QUANTIZED_SIZE_RATIO = 0.4
+
+
+# =========================
+# Default Loaders
+# =========================
+
+def _plain_linears(model: Any) -> Any:
+    """
+    Replace Linear subclasses (whisper.model.Linear, which only casts the
+    weight to the input dtype) with plain nn.Linear sharing their
+    parameters. quantize_dynamic matches module types exactly, and the
+    quantized Linear's from_float accepts only nn.Linear, so subclasses
+    would otherwise stay fp32.
+    """
+    import torch
+    swaps = [
+        (parent, name, child)
+        for parent in model.modules()
+        for name, child in parent.named_children()
+        if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear
+    ]
+    for parent, name, child in swaps:
+        linear = torch.nn.Linear(child.in_features, child.out_features,
+                                 bias=child.bias is not None, device="meta")
+        linear.weight = child.weight
+        linear.bias = child.bias
+        setattr(parent, name, linear)
+    return model
+
+
+def quantize_linear(model: Any) -> Any:
+    """Dynamic int8 quantization of a torch module's Linear layers, subclasses included (CPU inference)."""
+    import torch
+    return torch.quantization.quantize_dynamic(_plain_linears(model), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_whisper(size: str = WHISPER_MODEL_SIZE, device: str = "cpu", quantize: bool = False) -> Any:
+    import whisper
+    model = whisper.load_model(size, device=device)
+    return quantize_linear(model) if quantize else model
+
+
+def load_sentiment(model: str = SENTIMENT_MODEL, quantize: bool = False) -> Any:
+    from transformers import pipeline as transformers_pipeline
+    pipe = transformers_pipeline(
+        "sentiment-analysis",
+        model=model,
+        device=-1  # CPU
+    )
+    if quantize:
+        pipe.model = quantize_linear(pipe.model)
+    return pipe
+
+
+def load_diarization(model: str = DIARIZATION_MODEL) -> Any:
+    try:
+        from pyannote.audio import Pipeline as PyannotePipeline
+        import torch
+    except ImportError:
+        raise ImportError(
+            "pyannote.audio is not installed. Please install it with:\n"
+            "  pip install pyannote.audio\n\n"
+            "Note: You may also need to accept the model license at:\n"
+            "  https://huggingface.co/pyannote/speaker-diarization-3.1"
+        )
+
+    hf_token = os.getenv("HUGGINGFACE_HUB_TOKEN") or os.getenv("HF_TOKEN")
+
+    try:
+        pipeline = PyannotePipeline.from_pretrained(model, use_auth_token=hf_token)
+    except Exception:
+        # Fallback to older model if 3.1 not available
+        try:
+            pipeline = PyannotePipeline.from_pretrained(
+                DIARIZATION_FALLBACK_MODEL,
+                use_auth_token=hf_token
+            )
+        except Exception as e2:
+            raise ImportError(
+                f"Failed to load pyannote.audio pipeline. "
+                f"Error: {str(e2)}\n\n"
+                f"Please ensure:\n"
+                f"1. You have accepted the model license at:\n"
+                f"   https://huggingface.co/pyannote/speaker-diarization-3.1\n"
+                f"2. Set your Hugging Face token:\n"
+                f"   set HUGGINGFACE_HUB_TOKEN=your_token_here"
+            )
+
+    # Ensure CPU-only
+    pipeline.to(torch.device("cpu"))
+    return pipeline
+
+
+def load_speaker_embedding(model: str = SPEAKER_EMBEDDING_MODEL) -> Callable[..., Any]:
+    """
+    Whole-window speaker embedding model. Returns ``embed(samples,
+    sample_rate=16000)`` mapping mono float32 samples to one vector.
+    """
+    try:
+        from pyannote.audio import Inference, Model
+        import numpy as np
+        import torch
+    except ImportError:
+        raise ImportError(
+            "pyannote.audio is not installed. Please install it with:\n"
+            "  pip install pyannote.audio"
+        )
+
+    hf_token = os.getenv("HUGGINGFACE_HUB_TOKEN") or os.getenv("HF_TOKEN")
+    inference = Inference(
+        Model.from_pretrained(model, use_auth_token=hf_token),
+        window="whole",
+        device=torch.device("cpu"),
+    )
+
+    def embed(samples: Any, sample_rate: int = 16000) -> Any:
+        waveform = torch.from_numpy(np.ascontiguousarray(samples, dtype=np.float32)).unsqueeze(0)
+        vector = inference({"waveform": waveform, "sample_rate": sample_rate})
+        return np.asarray(vector, dtype=np.float32).reshape(-1)
+    return embed
+
+
+def _whisper_size_mb(size: str = WHISPER_MODEL_SIZE, quantize: bool = False, **_: Any) -> float:
+    size_mb = WHISPER_SIZES_MB.get(size, WHISPER_SIZES_MB["small"])
+    return size_mb * QUANTIZED_SIZE_RATIO if quantize else size_mb
+
+
+def _sentiment_size_mb(quantize: bool = False, **_: Any) -> float:
+    return 260 * QUANTIZED_SIZE_RATIO if quantize else 260
+
+
+DEFAULT_BACKENDS: Dict[str, Tuple[Loader, SizeEstimate]] = {
+    "whisper": (load_whisper, _whisper_size_mb),
+    "sentiment": (load_sentiment, _sentiment_size_mb),
+    "diarization": (load_diarization, 100),
+    "speaker_embedding": (load_speaker_embedding, 30),
+}
+
+
+# =========================
+# Registry
+# =========================
+
+class ModelRegistry:
+    """
+    Thread-safe, lazily initialised cache of loaded models.
+
+    Models are keyed by backend name plus loader parameters, so
+    ``get("whisper", size="base")`` and ``get("whisper")`` are separate
+    entries. Per-backend default parameters (set from the inference
+    profile) are merged under the caller's before keying. When the
+    estimated total size exceeds ``memory_budget_mb``, the least recently
+    used models are evicted.
+    """
+
+    def __init__(self, memory_budget_mb: Optional[float] = MODEL_MEMORY_BUDGET_MB):
+        self.memory_budget_mb = memory_budget_mb
+        self._backends: Dict[str, Tuple[Loader, SizeEstimate]] = {}
+        self._models: "OrderedDict[Tuple, Tuple[Any, float]]" = OrderedDict()
+        self._load_locks: Dict[Tuple, threading.Lock] = {}
+        self._defaults: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    # ---- backends ----
+
+    def register_backend(
+        self, name: str, loader: Loader, size_mb: SizeEstimate = 0.0
+    ) -> Optional[Tuple[Loader, SizeEstimate]]:
+        """
+        Register (or replace) the loader for a backend name.
+        Already-loaded models of that backend are evicted.
+        Returns the previous (loader, size_mb) pair, if any.
+        """
+        with self._lock:
+            previous = self._backends.get(name)
+            self._backends[name] = (loader, size_mb)
+            self._evict_matching(name, None)
+        return previous
+
+    @contextmanager
+    def override(self, name: str, loader: Loader, size_mb: SizeEstimate = 0.0):
+        """Temporarily swap a backend, e.g. for a lightweight test stand-in."""
+        previous = self.register_backend(name, loader, size_mb)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                if previous is None:
+                    self._backends.pop(name, None)
+                else:
+                    self._backends[name] = previous
+                self._evict_matching(name, None)
+
+    def set_defaults(self, name: str, **params: Any) -> None:
+        """Default loader parameters for ``name`` (replaces earlier defaults)."""
+        with self._lock:
+            self._defaults[name] = dict(params)
+
+    # ---- access ----
+
+    def get(self, name: str, **params: Any) -> Any:
+        """Return the model for ``name``/``params``, loading it on first use."""
+        with self._lock:
+            params = {**self._defaults.get(name, {}), **params}
+        key = self._key(name, params)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+            if name not in self._backends:
+                raise KeyError(f"Unknown model backend: {name}")
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so different models load concurrently
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key][0]
+                loader, size_mb = self._backends[name]
+
+            model = loader(**params)
+            size = size_mb(**params) if callable(size_mb) else float(size_mb)
+
+            with self._lock:
+                self._models[key] = (model, size)
+                self._enforce_budget(keep=key)
+        return model
+
+    def warm_up(self, names: Optional[Iterable[Union[str, Tuple[str, Dict]]]] = None) -> None:
+        """
+        Load models ahead of first use.
+        Entries are backend names or (name, params) pairs; default is every backend.
+        """
+        if names is None:
+            with self._lock:
+                names = list(self._backends)
+        for entry in names:
+            if isinstance(entry, str):
+                self.get(entry)
+            else:
+                name, params = entry
+                self.get(name, **params)
+
+    def warm_up_async(
+        self, names: Optional[Iterable[Union[str, Tuple[str, Dict]]]] = None
+    ) -> threading.Thread:
+        """
+        warm_up on a daemon thread, so startup is not blocked. A request
+        for a model that is still loading waits on the same load lock
+        instead of loading it twice. Load errors are left for first use.
+        """
+        def run() -> None:
+            try:
+                self.warm_up(names)
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def evict(self, name: Optional[str] = None, **params: Any) -> int:
+        """
+        Drop loaded models. With no name every model is evicted; with a name
+        and no params every variant of that backend is evicted.
+        Returns the number of models dropped.
+        """
+        with self._lock:
+            if name is None:
+                count = len(self._models)
+                self._models.clear()
+            else:
+                if params:
+                    params = {**self._defaults.get(name, {}), **params}
+                count = self._evict_matching(name, params or None)
+        if count:
+            gc.collect()
+        return count
+
+    def loaded(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """List loaded models as (name, params) in least- to most-recently used order."""
+        with self._lock:
+            return [(key[0], dict(key[1])) for key in self._models]
+
+    def memory_usage_mb(self) -> float:
+        with self._lock:
+            return sum(size for _, size in self._models.values())
+
+    # ---- internals ----
+
+    @staticmethod
+    def _key(name: str, params: Dict[str, Any]) -> Tuple:
+        return (name, tuple(sorted(params.items())))
+
+    def _evict_matching(self, name: str, params: Optional[Dict[str, Any]]) -> int:
+        if params is None:
+            keys = [key for key in self._models if key[0] == name]
+        else:
+            keys = [self._key(name, params)]
+        count = 0
+        for key in keys:
+            if self._models.pop(key, None) is not None:
+                count += 1
+        return count
+
+    def _enforce_budget(self, keep: Tuple) -> None:
+        if self.memory_budget_mb is None:
+            return
+        total = sum(size for _, size in self._models.values())
+        for key in list(self._models):
+            if total <= self.memory_budget_mb:
+                break
+            if key == keep:
+                continue
+            total -= self._models.pop(key)[1]
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+_profile = INFERENCE_PROFILE
+
+
+def get_registry() -> ModelRegistry:
+    """Return the process-wide registry, creating it with the default backends."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = ModelRegistry()
+                for name, (loader, size_mb) in DEFAULT_BACKENDS.items():
+                    registry.register_backend(name, loader, size_mb)
+                _apply_profile(registry, _profile)
+                _registry = registry
+    return _registry
+
+
+# =========================
+# Inference Profiles
+# =========================
+
+def profile_params(profile: str) -> Dict[str, Dict[str, Any]]:
+    """Registry loader parameters per backend for an INFERENCE_PROFILES entry."""
+    if profile not in INFERENCE_PROFILES:
+        raise ValueError(f"Unknown inference profile: {profile}")
+    settings = INFERENCE_PROFILES[profile]
+    return {
+        "whisper": {"size": settings["whisper_size"], "quantize": settings["quantize"]},
+        "sentiment": {"quantize": settings["quantize"]},
+    }
+
+
+def get_profile() -> str:
+    return _profile
+
+
+def profile_torch_threads(profile: Optional[str] = None) -> int:
+    """Torch intra-op threads the profile allows this process."""
+    threads = INFERENCE_PROFILES[profile or _profile]["torch_threads"]
+    return threads or os.cpu_count() or 1
+
+
+def set_profile(profile: str) -> None:
+    """
+    Switch the process to an inference profile. Later ``get_model`` calls
+    load (or reuse) the profile's model variants; models of the previous
+    profile stay cached until the memory budget evicts them.
+    """
+    global _profile
+    params = profile_params(profile)
+    _profile = profile
+    if _registry is not None:
+        _apply_profile(_registry, profile, params)
+
+
+def _apply_profile(registry: ModelRegistry, profile: str,
+                   params: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+    for name, defaults in (params or profile_params(profile)).items():
+        registry.set_defaults(name, **defaults)
+    if INFERENCE_PROFILES[profile]["torch_threads"]:
+        try:
+            import torch
+            torch.set_num_threads(INFERENCE_PROFILES[profile]["torch_threads"])
+        except ImportError:
+            pass
+
+
+def get_model(name: str, **params: Any) -> Any:
+    """Shortcut for ``get_registry().get(name, **params)``."""
+    return get_registry().get(name, **params)
+
+
+def get_profile_model(name: str, profile: Optional[str] = None) -> Any:
+    """
+    The model for ``name`` under an explicit inference profile (the
+    process profile if None). Concurrent analyses pass their own profile
+    so a switch made elsewhere never changes the model under them.
+    """
+    if profile is None:
+        return get_model(name)
+    return get_model(name, **profile_params(profile).get(name, {}))
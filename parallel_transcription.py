@@ -0,0 +1,386 @@
+"""
+Parallel transcription: split a recording at silences into chunks and
+transcribe them in a pool of worker processes, each with its own Whisper.
+
+    python -m core.parallel_transcription meeting.wav --workers 8
+"""
+
+import argparse
+import bisect
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from utils.config import (
+    PROCESSED_DIR,
+    TRANSCRIBE_WORKERS,
+    TRANSCRIBE_CHUNK_S,
+    TRANSCRIBE_MAX_CHUNK_S,
+    TRANSCRIBE_CHUNK_OVERLAP_S,
+    VAD_ENABLED,
+)
+from utils.audio_utils import SpeechMap, TARGET_SR, detect_speech, load_audio, resolve_audio
+from core.model_registry import get_model, get_profile, get_profile_model, profile_torch_threads
+from core.speech_to_text import transcribe_samples
+
+
+class Chunk:
+    """
+    The span ``[start, end)`` whose segments a chunk owns, and the span of
+    audio Whisper hears (wider by the overlap where a cut fell in speech).
+    """
+
+    __slots__ = ("start", "end", "audio_start", "audio_end")
+
+    def __init__(self, start: float, end: float, audio_start: float, audio_end: float):
+        self.start = start
+        self.end = end
+        self.audio_start = audio_start
+        self.audio_end = audio_end
+
+    @property
+    def hard_start(self) -> bool:
+        """True when the cut before this chunk fell inside speech."""
+        return self.audio_start < self.start
+
+    def __repr__(self) -> str:
+        return f"Chunk({self.start:.2f}-{self.end:.2f}, audio {self.audio_start:.2f}-{self.audio_end:.2f})"
+
+
+def plan_chunks(
+    regions: Sequence[Tuple[float, float]],
+    duration_s: float,
+    target_s: float = TRANSCRIBE_CHUNK_S,
+    max_s: float = TRANSCRIBE_MAX_CHUNK_S,
+    overlap_s: float = TRANSCRIBE_CHUNK_OVERLAP_S,
+) -> List[Chunk]:
+    """
+    Cut the timeline into chunks of about ``target_s``.
+
+    Each cut goes in the middle of the silence (gap between speech
+    ``regions``) closest to the target length, anywhere from half the
+    target to ``max_s``. Where speech runs on without such a gap the cut
+    is made at the target length, and both neighbours get ``overlap_s``
+    of extra audio so no word is lost at the seam.
+    """
+    gaps = [(prev_end + next_start) / 2 for (_, prev_end), (next_start, _) in zip(regions, regions[1:])]
+    cuts: List[Tuple[float, bool]] = [(0.0, False)]
+    pos = 0.0
+    while duration_s - pos > max_s:
+        lo = bisect.bisect_left(gaps, pos + target_s / 2)
+        hi = bisect.bisect_right(gaps, pos + max_s)
+        if lo < hi:
+            cut, hard = min(gaps[lo:hi], key=lambda gap: abs(gap - pos - target_s)), False
+        else:
+            cut, hard = pos + target_s, True
+        cuts.append((cut, hard))
+        pos = cut
+    cuts.append((duration_s, False))
+
+    return [
+        Chunk(
+            start, end,
+            max(0.0, start - overlap_s) if hard_start else start,
+            min(duration_s, end + overlap_s) if hard_end else end,
+        )
+        for (start, hard_start), (end, hard_end) in zip(cuts, cuts[1:])
+    ]
+
+
+# =========================
+# Workers
+# =========================
+
+def _init_worker(profile: str, torch_threads: int) -> None:
+    """Split the cores between workers and load the profile's Whisper once per process."""
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    get_profile_model("whisper", profile)
+
+
+def _transcribe_chunk(
+    audio_path: str, chunk: Chunk, regions: Sequence[Tuple[float, float]], vad: bool, profile: str
+) -> List[Dict[str, Any]]:
+    """Transcribe one chunk of a .npy recording; segments come back on the recording's timeline."""
+    audio = np.load(audio_path, mmap_mode="r")
+    samples = np.array(audio[int(chunk.audio_start * TARGET_SR):int(chunk.audio_end * TARGET_SR)])
+
+    speech_map = None
+    if vad:
+        local = [
+            (max(start, chunk.audio_start) - chunk.audio_start, min(end, chunk.audio_end) - chunk.audio_start)
+            for start, end in regions
+            if end > chunk.audio_start and start < chunk.audio_end
+        ]
+        speech_map = SpeechMap(local, len(samples) / TARGET_SR)
+
+    _, table = transcribe_samples(get_profile_model("whisper", profile), samples, speech_map)
+    table.starts = table.starts + chunk.audio_start
+    table.ends = table.ends + chunk.audio_start
+    segments = table.to_dicts()
+    for seg in segments:
+        if seg.get("words"):
+            seg["words"] = [
+                dict(w, start=w["start"] + chunk.audio_start, end=w["end"] + chunk.audio_start)
+                for w in seg["words"]
+            ]
+    return segments
+
+
+# One pool per process, for the worker count and profile it was started with
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_key: Optional[Tuple[int, str]] = None
+_pool_busy = 0
+_pool_lock = threading.Lock()
+
+
+def _pool_context() -> Any:
+    # Forking a parent that runs threads (the dashboard, thread pipelines) can
+    # copy locks held mid-operation; forkserver and spawn workers start clean
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _replace_pool(key: Optional[Tuple[int, str]]) -> None:
+    """Shut the pool down (chunks already submitted still finish) and start one for ``key``."""
+    global _pool, _pool_key
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+    _pool, _pool_key = None, key
+    if key is not None:
+        workers, profile = key
+        threads = max(1, profile_torch_threads(profile) // workers)
+        _pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=_pool_context(),
+            initializer=_init_worker, initargs=(profile, threads),
+        )
+
+
+def get_transcription_pool(workers: int = TRANSCRIBE_WORKERS, profile: Optional[str] = None) -> ProcessPoolExecutor:
+    """
+    Process pool of ``workers`` transcribers for ``profile`` (default: the
+    process profile), kept alive between calls so each worker loads
+    Whisper once. Workers share the profile's torch threads. Asking for
+    another worker count or profile replaces the pool.
+    """
+    key = (workers, profile or get_profile())
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            _replace_pool(key)
+        return _pool
+
+
+def live_transcription_pool() -> Optional[Tuple[int, str, bool]]:
+    """(workers, profile, busy) of the running pool, or None."""
+    with _pool_lock:
+        if _pool is None:
+            return None
+        return _pool_key[0], _pool_key[1], _pool_busy > 0
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool (a worker died or failed to load) so the next call starts afresh."""
+    with _pool_lock:
+        if _pool is pool:
+            _replace_pool(None)
+
+
+def _submit_chunks(workers: int, profile: str, calls: Sequence[Tuple[Any, ...]]) -> Tuple[ProcessPoolExecutor, List[Future]]:
+    """Submit ``calls`` to _transcribe_chunk under the lock, so the pool cannot be replaced midway."""
+    global _pool_busy
+
+    def done(_: Future) -> None:
+        global _pool_busy
+        with _pool_lock:
+            _pool_busy -= 1
+
+    with _pool_lock:
+        if _pool is None or _pool_key != (workers, profile):
+            _replace_pool((workers, profile))
+        pool = _pool
+        futures = [pool.submit(_transcribe_chunk, *call) for call in calls]
+        _pool_busy += len(futures)
+    for future in futures:
+        future.add_done_callback(done)
+    return pool, futures
+
+
+def _ready() -> bool:
+    return True
+
+
+def warm_up_pool(workers: int = TRANSCRIBE_WORKERS, profile: Optional[str] = None) -> None:
+    """Start every worker (and so load its model) before the first real chunk arrives."""
+    pool = get_transcription_pool(workers, profile)
+    for future in [pool.submit(_ready) for _ in range(workers)]:
+        future.result()
+
+
+def shutdown_pools() -> None:
+    with _pool_lock:
+        _replace_pool(None)
+
+
+# =========================
+# Merging
+# =========================
+
+def _norm_words(text: str) -> List[str]:
+    return re.findall(r"[\w']+", text.lower())
+
+
+def _dedupe_boundary(prev: Dict[str, Any], seg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Drop the start of ``seg`` that repeats the end of ``prev`` (both
+    chunks heard the overlap). Uses word timestamps when present, else the
+    longest run of two or more words ending ``prev`` and starting ``seg``.
+    Returns None when nothing of ``seg`` is left.
+    """
+    words = seg.get("words")
+    if words:
+        kept = [w for w in words if (w["start"] + w["end"]) / 2 >= prev["end"]]
+        if not kept:
+            return None
+        if len(kept) == len(words):
+            return seg
+        return dict(seg, start=kept[0]["start"], words=kept, text="".join(w["word"] for w in kept))
+
+    prev_words, seg_words = _norm_words(prev.get("text", "")), _norm_words(seg.get("text", ""))
+    for k in range(min(len(prev_words), len(seg_words)), 1, -1):
+        if prev_words[-k:] == seg_words[:k]:
+            tokens = seg.get("text", "").split()
+            # Drop tokens until k words are gone (tokens may hold punctuation only)
+            dropped = i = 0
+            while i < len(tokens) and dropped < k:
+                dropped += len(_norm_words(tokens[i]))
+                i += 1
+            rest = tokens[i:]
+            return dict(seg, text=" " + " ".join(rest)) if rest else None
+    return seg
+
+
+def merge_chunks(chunks: Sequence[Chunk], chunk_segments: Sequence[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Concatenate per-chunk segments. Each segment belongs to the chunk that
+    owns its midpoint, so overlapping audio is transcribed twice but kept
+    once; across cuts made inside speech, repeated boundary words are
+    removed as well.
+    """
+    merged: List[Dict[str, Any]] = []
+    for n, (chunk, segments) in enumerate(zip(chunks, chunk_segments)):
+        last = n == len(chunks) - 1
+        owned = [
+            seg for seg in segments
+            if chunk.start <= (seg["start"] + seg["end"]) / 2 and
+            ((seg["start"] + seg["end"]) / 2 < chunk.end or last)
+        ]
+        if chunk.hard_start and merged and owned:
+            first = _dedupe_boundary(merged[-1], owned[0])
+            owned = ([first] if first is not None else []) + owned[1:]
+        merged.extend(owned)
+    return merged
+
+
+def transcribe_parallel(
+    audio: Union[str, np.ndarray],
+    workers: int = TRANSCRIBE_WORKERS,
+    vad: Optional[bool] = None,
+    profile: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    transcribe_audio's output for ``audio``, computed chunk by chunk in
+    ``workers`` processes with the ``profile``'s Whisper (default: the
+    process profile). Speech is detected once over the whole recording,
+    both to place the cuts and (with ``vad``) to gate each chunk.
+
+    Returns:
+        transcribe_audio's transcript, plus 'parallel': {'workers', 'chunks'}
+    """
+    vad = VAD_ENABLED if vad is None else vad
+    profile = profile or get_profile()
+    audio = resolve_audio(audio)
+    if isinstance(audio, str):
+        audio = load_audio(audio)
+    duration = len(audio) / TARGET_SR
+    regions = detect_speech(audio)
+    speech_map = SpeechMap(regions, duration)
+    chunks = plan_chunks(regions, duration)
+
+    segments: List[Dict[str, Any]] = []
+    if regions or not vad:
+        # Workers read their slices from a memory-mapped copy, not pickled arrays
+        os.makedirs(PROCESSED_DIR, exist_ok=True)
+        fd, npy_path = tempfile.mkstemp(prefix="chunks_", suffix=".npy", dir=PROCESSED_DIR)
+        os.close(fd)
+        try:
+            np.save(npy_path, audio)
+            pool, futures = _submit_chunks(
+                workers, profile, [(npy_path, chunk, regions, vad, profile) for chunk in chunks]
+            )
+            try:
+                segments = merge_chunks(chunks, [future.result() for future in futures])
+            except BrokenProcessPool:
+                _discard_pool(pool)
+                raise
+        finally:
+            try:
+                os.remove(npy_path)
+            except OSError:
+                pass
+
+    transcript = {
+        "text": "".join(seg.get("text", "") for seg in segments),
+        "segments": segments,
+        "parallel": {"workers": workers, "chunks": len(chunks)},
+    }
+    if vad:
+        transcript["speech_regions"] = [list(region) for region in speech_map.regions]
+        transcript["vad"] = speech_map.stats()
+    return transcript
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare sequential and parallel chunked transcription on one recording."
+    )
+    parser.add_argument("audio", help="meeting recording")
+    parser.add_argument("--workers", type=int, default=max(2, TRANSCRIBE_WORKERS))
+    args = parser.parse_args(argv)
+
+    from core.compare import word_diff
+    from core.speech_to_text import transcribe_audio
+
+    audio = load_audio(args.audio)
+    get_model("whisper")  # load before timing either path
+
+    started = time.perf_counter()
+    sequential = transcribe_audio(audio, workers=1)
+    sequential_s = time.perf_counter() - started
+
+    warm_up_pool(args.workers)
+    started = time.perf_counter()
+    parallel = transcribe_parallel(audio, args.workers)
+    parallel_s = time.perf_counter() - started
+    shutdown_pools()
+
+    diff = word_diff(sequential["text"], parallel["text"])
+    print(f"⏱️  sequential: {sequential_s:.1f}s   parallel ({args.workers} workers, "
+          f"{parallel['parallel']['chunks']} chunks): {parallel_s:.1f}s   "
+          f"speedup {sequential_s / parallel_s:.2f}x")
+    print(f"📝 WER of parallel vs sequential: {diff['wer']:.1%} "
+          f"(S={diff['substitutions']} D={diff['deletions']} I={diff['insertions']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+"""
+Pipeline executor: runs independent analysis stages concurrently and
+reports per-stage timings (see core.instrumentation).
+"""
+
+import functools
+import os
+import tempfile
+from concurrent.futures import (
+    FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
+from typing import Any, Callable, Collection, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.config import (
+    PIPELINE_MODE,
+    PIPELINE_STAGE_THREADS,
+    WORD_TIMESTAMPS,
+    TRANSCRIBE_WORKERS,
+    TRANSCRIBE_CHUNK_S,
+    TRANSCRIBE_MAX_CHUNK_S,
+    TRANSCRIBE_CHUNK_OVERLAP_S,
+    VAD_ENABLED,
+    VAD_TOP_DB,
+    VAD_MIN_SPEECH_S,
+    VAD_MIN_SILENCE_S,
+    VAD_PAD_S,
+    VAD_MIN_SPEECH_RATIO,
+    SENTIMENT_MODEL,
+    SENTIMENT_MAX_TOKENS,
+    DIARIZATION_MODEL,
+    SPEAKER_ID_ENABLED,
+    SPEAKER_EMBEDDING_MODEL,
+    SPEAKER_EMBEDDING_MAX_S,
+    SPEAKER_EMBEDDING_MIN_TURN_S,
+    AUDIO_HANDOFF,
+    PROCESSED_DIR,
+)
+from utils.audio_utils import TARGET_SR, get_audio_duration, load_audio, load_audio_to_mmap
+from utils.result_cache import ResultCache, hash_file
+from core.instrumentation import StageStats, add_rtf, measure
+from core.model_registry import get_profile, profile_params, profile_torch_threads
+from core.speech_to_text import transcribe_audio
+from core.diarization import diarize_speakers, speaker_embeddings
+from core.alignment import align_transcript, align_sentiments
+from core.bias_detection import analyze_bias
+from core.sentiment_analysis import analyze_sentiment
+from core.metrics import compute_fairness_metrics
+from core.speaker_id import identify_speakers
+
+ProgressCallback = Callable[[str, str], None]
+
+
+class Stage:
+    """A named step whose function receives the outputs of ``deps`` positionally."""
+
+    __slots__ = ("name", "fn", "deps")
+
+    def __init__(self, name: str, fn: Callable[..., Any], deps: Sequence[str] = ()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+
+def _timed_call(name: str, fn: Callable[..., Any], args: Tuple, torch_threads: Optional[int],
+                capture: bool = False) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Run one stage in a worker, limiting torch intra-op threads first.
+    ``capture`` runs the stage under the profiler (core.instrumentation).
+    """
+    _set_torch_threads(torch_threads)
+    return measure(name, fn, args, capture)
+
+
+def _set_torch_threads(threads: Optional[int]) -> None:
+    # torch.set_num_threads is process-wide, not per calling thread
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+
+class PipelineExecutor:
+    """
+    Runs a DAG of stages, starting each one as soon as its dependencies
+    finish, in a thread pool, a process pool, or serially.
+
+    In process and serial mode each stage sets torch's intra-op threads
+    before it runs: ``stage_threads`` maps stage names to thread counts,
+    and other stages get the inference profile's allowance, split between
+    process workers. ``max_threads`` caps them, e.g. at a batch worker's
+    share of the cores. torch's thread count is process-wide, so in thread
+    mode it is set once per run to the (capped) profile allowance, which
+    the concurrent stages share; ``stage_threads`` does not apply there,
+    and runs started concurrently in one process share the latest setting.
+    In process mode each worker keeps its own model registry, so the pool
+    is reused across runs to keep models warm; call ``close()`` when done.
+    """
+
+    def __init__(
+        self,
+        mode: str = PIPELINE_MODE,
+        max_workers: int = 2,
+        stage_threads: Optional[Dict[str, int]] = None,
+        max_threads: Optional[int] = None,
+    ):
+        if mode not in ("thread", "process", "serial"):
+            raise ValueError(f"Unknown pipeline mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.stage_threads = dict(PIPELINE_STAGE_THREADS if stage_threads is None else stage_threads)
+        self.max_threads = max_threads
+        self._pool: Optional[Executor] = None
+
+    def _get_pool(self) -> Optional[Executor]:
+        if self.mode == "serial":
+            return None
+        if self._pool is None:
+            pool_cls = ProcessPoolExecutor if self.mode == "process" else ThreadPoolExecutor
+            self._pool = pool_cls(max_workers=self.max_workers)
+        return self._pool
+
+    def _threads_for(self, name: str, profile: Optional[str] = None) -> Optional[int]:
+        """Threads a stage sets before it runs (None in thread mode, see run)."""
+        if self.mode == "thread":
+            return None
+        if name in self.stage_threads:
+            return self.stage_threads[name]
+        threads = profile_torch_threads(profile)
+        if self.mode == "process":
+            threads //= self.max_workers
+        if self.max_threads:
+            threads = min(threads, self.max_threads)
+        return max(1, threads)
+
+    def run(
+        self,
+        stages: List[Stage],
+        inputs: Dict[str, Any],
+        progress: Optional[ProgressCallback] = None,
+        profile_stages: Collection[str] = (),
+        profile: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], StageStats]:
+        """
+        Execute ``stages`` given initial ``inputs`` (name → value).
+
+        Args:
+            stages: Stages in any order; deps may name stages or inputs
+            inputs: Values available before any stage runs
+            progress: Called as progress(stage, "started" | "done") from
+                the calling thread
+            profile_stages: Stage names to run under the profiler
+            profile: Inference profile whose thread allowance the stages
+                use (default: the process profile)
+
+        Returns:
+            (results by name, instrumentation record per stage)
+        """
+        results = dict(inputs)
+        stats: StageStats = {}
+        pending = {stage.name: stage for stage in stages}
+        running: Dict[Any, str] = {}
+        pool = self._get_pool()
+        if self.mode == "thread":
+            threads = profile_torch_threads(profile)
+            _set_torch_threads(min(threads, self.max_threads) if self.max_threads else threads)
+
+        while pending or running:
+            ready = [s for s in pending.values() if all(d in results for d in s.deps)]
+            if not ready and not running:
+                raise ValueError(f"Unsatisfiable stage dependencies: {sorted(pending)}")
+
+            for stage in ready:
+                del pending[stage.name]
+                if progress:
+                    progress(stage.name, "started")
+                args = tuple(results[d] for d in stage.deps)
+                threads = self._threads_for(stage.name, profile)
+                capture = stage.name in profile_stages
+                if pool is None:
+                    results[stage.name], stats[stage.name] = _timed_call(
+                        stage.name, stage.fn, args, threads, capture=capture
+                    )
+                    if progress:
+                        progress(stage.name, "done")
+                else:
+                    future = pool.submit(
+                        _timed_call, stage.name, stage.fn, args, threads, capture
+                    )
+                    running[future] = stage.name
+
+            if running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name], stats[name] = future.result()
+                    if progress:
+                        progress(name, "done")
+
+        return results, stats
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+# Stages a run may leave out (see meeting_stages); skipping embed also skips identify
+OPTIONAL_STAGES = ("sentiment", "embed", "identify")
+
+
+def _no_sentiment(transcript: Dict[str, Any]) -> Dict[str, Any]:
+    """Stand-in for a skipped sentiment stage: no segments, and no sentiment balance in the metrics."""
+    return {"per_segment": [], "skipped": True}
+
+
+def meeting_stages(
+    preprocess: Callable[[str], Any] = load_audio,
+    options: Optional[Dict[str, Dict[str, Any]]] = None,
+    skip: Collection[str] = (),
+    profile: Optional[str] = None,
+) -> List[Stage]:
+    """
+    The standard analysis DAG; transcription and diarization run side by side.
+    ``preprocess`` turns the input path into the audio handle both consume.
+    Sentiment starts on the raw transcript without waiting for diarization;
+    its segments are attributed to speakers afterwards. With
+    SPEAKER_ID_ENABLED, each diarized speaker is also embedded and matched
+    against the enrolled voices.
+
+    ``options`` maps stage names to extra keyword arguments for their
+    function (e.g. {"transcribe": {"workers": 4}}). Stages in ``skip``
+    (from OPTIONAL_STAGES) are left out, along with stages that depend on
+    them; a skipped sentiment stage yields no segments. ``profile`` is
+    bound into the model stages, so they use its models whatever the
+    process profile is when they run.
+    """
+    unknown = set(skip) - set(OPTIONAL_STAGES)
+    if unknown:
+        raise ValueError(f"Stages cannot be skipped: {sorted(unknown)}")
+    stages = [
+        Stage("preprocess", preprocess, ["audio"]),
+        Stage("transcribe", transcribe_audio, ["preprocess"]),
+        Stage("diarize", diarize_speakers, ["preprocess"]),
+        Stage("sentiment", _no_sentiment if "sentiment" in skip else analyze_sentiment, ["transcribe"]),
+        Stage("align", align_transcript, ["transcribe", "diarize"]),
+        Stage("attribute", align_sentiments, ["sentiment", "diarize"]),
+        Stage("bias", analyze_bias, ["align", "diarize"]),
+        Stage("metrics", compute_fairness_metrics, ["bias", "attribute"]),
+    ]
+    if SPEAKER_ID_ENABLED:
+        stages += [
+            Stage("embed", speaker_embeddings, ["preprocess", "diarize"]),
+            Stage("identify", identify_speakers, ["embed"]),
+        ]
+    dropped = set(skip) - {"sentiment"}
+    stages = [stage for stage in stages if stage.name not in dropped and not dropped & set(stage.deps)]
+    for stage in stages:
+        kwargs = dict((options or {}).get(stage.name, {}))
+        if profile is not None and stage.name in ("transcribe", "sentiment"):
+            kwargs["profile"] = profile
+        if kwargs and stage.fn is not _no_sentiment:
+            stage.fn = functools.partial(stage.fn, **kwargs)
+    return stages
+
+
+def cached_stage_params(transcribe_workers: Optional[int] = None,
+                        profile: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Parameters that determine each cacheable stage's output under an
+    inference profile (default: the process profile). Sentiment depends
+    on the transcript, so it includes the Whisper params.
+    ``transcribe_workers`` overrides TRANSCRIBE_WORKERS.
+    """
+    workers = TRANSCRIBE_WORKERS if transcribe_workers is None else transcribe_workers
+    models = profile_params(profile or get_profile())
+    transcribe = {
+        "model": "whisper",
+        **models["whisper"],
+        "word_timestamps": WORD_TIMESTAMPS,
+        "vad": [VAD_TOP_DB, VAD_MIN_SPEECH_S, VAD_MIN_SILENCE_S, VAD_PAD_S] if VAD_ENABLED else None,
+        # Chunked transcripts can differ slightly at the cuts
+        "chunks": [TRANSCRIBE_CHUNK_S, TRANSCRIBE_MAX_CHUNK_S, TRANSCRIBE_CHUNK_OVERLAP_S]
+        if workers > 1 else None,
+    }
+    params = {
+        "transcribe": transcribe,
+        "diarize": {"model": DIARIZATION_MODEL},
+        "sentiment": {
+            "model": SENTIMENT_MODEL,
+            **models["sentiment"],
+            "max_tokens": SENTIMENT_MAX_TOKENS,
+            "min_speech_ratio": VAD_MIN_SPEECH_RATIO,
+            "transcribe": transcribe,
+        },
+    }
+    if SPEAKER_ID_ENABLED:
+        # Matching is not cached: it depends on the index, which changes between runs
+        params["embed"] = {
+            "model": SPEAKER_EMBEDDING_MODEL,
+            "max_s": SPEAKER_EMBEDDING_MAX_S,
+            "min_turn_s": SPEAKER_EMBEDDING_MIN_TURN_S,
+            "diarize": params["diarize"],
+        }
+    return params
+
+
+def analyze_meeting(
+    audio_path: str,
+    executor: Optional[PipelineExecutor] = None,
+    progress: Optional[ProgressCallback] = None,
+    cache: Optional[ResultCache] = None,
+    profile_stages: Collection[str] = (),
+    stage_options: Optional[Dict[str, Dict[str, Any]]] = None,
+    skip: Collection[str] = (),
+    profile: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run the full analysis for one recording.
+
+    Args:
+        audio_path: Path to audio file
+        executor: Reused executor (a temporary one is created if omitted)
+        progress: Optional progress(stage, status) callback
+        cache: Stage-output cache; hits skip the model stages and only
+            alignment, bias and metrics are recomputed
+        profile_stages: Stages to capture with the profiler
+        stage_options: Extra keyword arguments per stage, e.g. the
+            transcription workers or sentiment batch size (core.scheduler)
+        skip: Optional stages to leave out (see meeting_stages)
+        profile: Inference profile for the whole run, fixed at the start
+            (default: the process profile at call time); cache keys and
+            models both come from it
+
+    Returns:
+        {
+            'transcript', 'diarization', 'interactions', 'sentiments', 'metrics',
+            'timings': {stage: seconds},
+            'stages': {stage: instrumentation record, with 'rtf'},
+            'audio_s': recording length in seconds (None if unknown),
+            'cached': [stage names served from the cache],
+            'vad': compute saved by voice-activity gating (None if disabled),
+            'speaker_embeddings': {label: voice embedding} (None without SPEAKER_ID_ENABLED),
+            'speaker_ids': {label: enrolled identity match} (see core.speaker_id),
+            'skipped': [optional stages left out (and not served from the cache)],
+            'profile': the inference profile used,
+        }
+        Transcript segments and sentiment entries carry 'speaker'.
+    """
+    profile = profile or get_profile()
+    inputs: Dict[str, Any] = {"audio": audio_path}
+    keys: Dict[str, str] = {}
+    if cache is not None:
+        audio_hash = hash_file(audio_path)
+        workers = (stage_options or {}).get("transcribe", {}).get("workers")
+        for name, params in cached_stage_params(workers, profile).items():
+            keys[name] = cache.key(name, audio_hash, params)
+            value = cache.get(name, keys[name])
+            if value is not None:
+                inputs[name] = value
+
+    owned = executor is None
+    executor = executor or PipelineExecutor()
+
+    # Decode once; process workers get a memory-mapped file instead of pickled copies
+    mmap_path = None
+    preprocess = load_audio
+    if executor.mode == "process" or AUDIO_HANDOFF == "mmap":
+        os.makedirs(PROCESSED_DIR, exist_ok=True)
+        fd, mmap_path = tempfile.mkstemp(prefix="audio_", suffix=".npy", dir=PROCESSED_DIR)
+        os.close(fd)
+        preprocess = functools.partial(load_audio_to_mmap, mmap_path=mmap_path)
+
+    planned = meeting_stages(preprocess, stage_options, skip, profile)
+    stages = [stage for stage in planned if stage.name not in inputs]
+    if all(stage.name in inputs for stage in planned if "preprocess" in stage.deps):
+        stages = [stage for stage in stages if stage.name != "preprocess"]
+
+    try:
+        results, stats = executor.run(stages, inputs, progress, profile_stages, profile)
+        audio_s = _audio_seconds(results.get("preprocess"), audio_path)
+    finally:
+        if owned:
+            executor.close()
+        if mmap_path is not None:
+            try:
+                os.remove(mmap_path)
+            except OSError:
+                pass
+
+    for name, key in keys.items():
+        if name not in inputs and name in results and name not in skip:
+            cache.put(name, key, results[name])
+
+    return {
+        "transcript": results["align"],
+        "diarization": results["diarize"],
+        "interactions": results["bias"],
+        "sentiments": results["attribute"],
+        "metrics": results["metrics"],
+        "timings": {name: record["wall_s"] for name, record in stats.items()},
+        "stages": add_rtf(stats, audio_s),
+        "audio_s": audio_s,
+        "cached": [name for name in keys if name in inputs],
+        "vad": _vad_summary(results["transcribe"], results["sentiment"]),
+        "speaker_embeddings": results.get("embed"),
+        "speaker_ids": results.get("identify", {}),
+        "skipped": sorted(name for name in set(skip) if name not in inputs),
+        "profile": profile,
+    }
+
+
+def _audio_seconds(preprocessed: Any, audio_path: str) -> Optional[float]:
+    """Recording length from the decoded audio (array or .npy path), else the file header."""
+    try:
+        if isinstance(preprocessed, str):
+            preprocessed = np.load(preprocessed, mmap_mode="r")
+        if isinstance(preprocessed, np.ndarray):
+            return len(preprocessed) / TARGET_SR
+        return get_audio_duration(audio_path)
+    except Exception:
+        return None
+
+
+def _vad_summary(transcript: Dict[str, Any], sentiments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Silence skipped before Whisper, plus segments skipped before sentiment."""
+    if "vad" not in transcript:
+        return None
+    return dict(transcript["vad"], sentiment_skipped=sentiments.get("skipped_silent", 0))
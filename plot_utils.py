@@ -2,12 +2,16 @@
 Plotting helpers using Plotly or Matplotlib.
 """
 
-import plotly.graph_objs as go
-from typing import Dict, List, Any
+from typing import TYPE_CHECKING, Dict, List, Any
 
+# plotly is imported on first use, so importing this module stays cheap
+if TYPE_CHECKING:
+    import plotly.graph_objs as go
 
-def plot_talk_times(metrics: Dict[str, Any]) -> go.Figure:
+
+def plot_talk_times(metrics: Dict[str, Any]) -> "go.Figure":
     """Plot talk time per speaker as a bar chart."""
+    import plotly.graph_objs as go
     talk_times = metrics["talk_times"]
     speakers = list(talk_times.keys())
     values = [talk_times[spk] for spk in speakers]
@@ -21,8 +25,9 @@ def plot_talk_times(metrics: Dict[str, Any]) -> go.Figure:
     return fig
 
 
-def plot_sentiment(sentiments: Dict[str, Any]) -> go.Figure:
+def plot_sentiment(sentiments: Dict[str, Any]) -> "go.Figure":
     """Plot sentiment distribution as a pie chart."""
+    import plotly.graph_objs as go
     per_segment = sentiments.get("per_segment", [])
     pos = sum(1 for s in per_segment if s.get("label") == "POSITIVE")
     neg = sum(1 for s in per_segment if s.get("label") == "NEGATIVE")
@@ -35,8 +40,9 @@ def plot_sentiment(sentiments: Dict[str, Any]) -> go.Figure:
     return fig
 
 
-def plot_interruptions(interactions: Dict[str, Any]) -> go.Figure:
+def plot_interruptions(interactions: Dict[str, Any]) -> "go.Figure":
     """Plot interruptions between speakers."""
+    import plotly.graph_objs as go
     pairs = interactions.get("interruption_pairs", {})
     if not pairs:
         fig = go.Figure()
@@ -58,7 +64,38 @@ def plot_interruptions(interactions: Dict[str, Any]) -> go.Figure:
     return fig
 
 
-def plot_all(metrics: Dict[str, Any], interactions: Dict[str, Any], sentiments: Dict[str, Any]) -> List[go.Figure]:
+def plot_stage_timings(stages: Dict[str, Dict[str, Any]]) -> "go.Figure":
+    """Plot wall vs CPU seconds per pipeline stage (core.instrumentation records)."""
+    import plotly.graph_objs as go
+    names = list(stages.keys())
+    fig = go.Figure([
+        go.Bar(name="Wall", x=names, y=[stages[n]["wall_s"] for n in names]),
+        go.Bar(name="CPU", x=names, y=[stages[n]["cpu_s"] for n in names]),
+    ])
+    fig.update_layout(title="Time per Stage", yaxis_title="Seconds", barmode="group")
+    return fig
+
+
+def plot_fairness_trend(trend: List[Dict[str, Any]]) -> "go.Figure":
+    """Plot mean fairness per period, one line per team when rows carry a 'team' (analytics_store.trend)."""
+    import plotly.graph_objs as go
+    series: Dict[str, List[Dict[str, Any]]] = {}
+    for row in trend:
+        series.setdefault(row.get("team", "All meetings") or "(no team)", []).append(row)
+    fig = go.Figure([
+        go.Scatter(
+            name=name, x=[r["period"] for r in rows], y=[r["fairness_score"] for r in rows],
+            mode="lines+markers", customdata=[r["meetings"] for r in rows],
+            hovertemplate="%{x}: %{y:.2f} (%{customdata} meetings)",
+        )
+        for name, rows in series.items()
+    ])
+    fig.update_layout(title="Fairness Score over Time", yaxis_title="Mean fairness score",
+                      yaxis_range=[0, 1])
+    return fig
+
+
+def plot_all(metrics: Dict[str, Any], interactions: Dict[str, Any], sentiments: Dict[str, Any]) -> List["go.Figure"]:
     """Generate all plots for the report."""
     return [
         plot_talk_times(metrics),
@@ -5,7 +5,6 @@ Helpers for PDF and JSON report export.
 import json
 import os
 from typing import Dict, List, Any
-from fpdf import FPDF
 
 
 def save_json_report(metrics: Dict[str, Any], json_path: str) -> None:
@@ -17,6 +16,8 @@ def save_json_report(metrics: Dict[str, Any], json_path: str) -> None:
 
 def generate_pdf_report(metrics: Dict[str, Any], figures: List[Any], pdf_path: str) -> None:
     """Generate a PDF report with metrics and charts."""
+    from fpdf import FPDF  # deferred: only needed when a PDF is requested
+
     os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
     pdf = FPDF()
     pdf.add_page()
@@ -28,7 +29,10 @@ def generate_pdf_report(metrics: Dict[str, Any], figures: List[Any], pdf_path: s
     pdf.cell(0, 10, f"Fairness Score: {metrics['fairness_score']:.2f}", ln=True)
     pdf.cell(0, 10, f"Dominance Ratio: {metrics['dominance_ratio']:.2f}", ln=True)
     pdf.cell(0, 10, f"Interruption Index: {metrics['interruption_index']:.2f}", ln=True)
-    pdf.cell(0, 10, f"Sentiment Balance: {metrics['sentiment_balance']:.2f}", ln=True)
+    if metrics.get("sentiment_skipped"):
+        pdf.cell(0, 10, "Sentiment Balance: skipped (not in the fairness score)", ln=True)
+    else:
+        pdf.cell(0, 10, f"Sentiment Balance: {metrics['sentiment_balance']:.2f}", ln=True)
     
     pdf.ln(5)
     pdf.cell(0, 10, "Talk Times:", ln=True)
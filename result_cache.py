@@ -0,0 +1,145 @@
+"""
+Content-addressed disk cache for pipeline stage outputs.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from utils.config import RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_bytes(data: bytes) -> str:
+    """SHA-256 of in-memory bytes (same digest as hash_file of a file holding them)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def json_default(obj: Any) -> Any:
+    # NumPy scalars and arrays from model outputs
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ResultCache:
+    """
+    Stage outputs stored as JSON files under ``root/<stage>/<key>.json``.
+
+    Keys hash the audio content, the stage name and the stage parameters
+    (model identifiers and settings), so changing any of them misses the
+    cache while downstream steps such as compute_fairness_metrics can be
+    replayed from cached outputs. Reads refresh a file's mtime; when the
+    cache grows past ``max_bytes`` the least recently used files go first.
+    """
+
+    def __init__(self, root: str = RESULT_CACHE_DIR, max_bytes: int = RESULT_CACHE_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(stage: str, audio_hash: str, params: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"stage": stage, "audio": audio_hash, "params": params},
+            sort_keys=True, default=json_default,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.root, stage, f"{key}.json")
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        """Cached value, or None on a miss (or an unreadable entry)."""
+        path = self._path(stage, key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        path = self._path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, default=json_default)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def get_or_compute(self, stage: str, audio_hash: str, params: Dict[str, Any], fn: Callable[[], Any]) -> Any:
+        key = self.key(stage, audio_hash, params)
+        value = self.get(stage, key)
+        if value is None:
+            value = fn()
+            self.put(stage, key, value)
+        return value
+
+    def size_bytes(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def evict(self) -> int:
+        """Remove least recently used entries until under ``max_bytes``. Returns count removed."""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[1])
+            total = sum(size for _, _, size in entries)
+            removed = 0
+            for path, _, size in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            return removed
+
+    def clear(self) -> None:
+        for path, _, _ in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _entries(self):
+        if not os.path.isdir(self.root):
+            return
+        for stage in os.listdir(self.root):
+            stage_dir = os.path.join(self.root, stage)
+            if not os.path.isdir(stage_dir):
+                continue
+            for name in os.listdir(stage_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(stage_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_mtime, st.st_size
+
+
+_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Process-wide cache under PROCESSED_DIR."""
+    global _cache
+    if _cache is None:
+        _cache = ResultCache()
+    return _cache
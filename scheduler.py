@@ -0,0 +1,498 @@
+"""
+Deadline-aware scheduling: pick the analysis configuration (Whisper size
+via the inference profile, transcription workers, sentiment batch size and
+optional stages) predicted to finish a recording within a deadline.
+
+Predictions come from per-stage real-time factors (wall seconds per audio
+second) measured on this host. Every finished analysis updates them; stages
+not seen yet use SCHEDULER_PRIOR_RTF, scaled by how this host compared with
+the priors on the stages it has run. To measure every profile up front:
+
+    python -m core.scheduler calibrate meeting.wav
+    python -m core.scheduler plan --audio-s 3600 --deadline 600
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.config import (
+    INFERENCE_PROFILES,
+    MODEL_MEMORY_BUDGET_MB,
+    PIPELINE_MODE,
+    SENTIMENT_BATCH_SIZE,
+    SCHEDULER_COSTS,
+    SCHEDULER_PROFILE_ORDER,
+    SCHEDULER_OPTIONAL_STAGES,
+    SCHEDULER_SENTIMENT_BATCH_SIZES,
+    SCHEDULER_MAX_TRANSCRIBE_WORKERS,
+    SCHEDULER_SAFETY_FACTOR,
+    SCHEDULER_EMA_ALPHA,
+    SCHEDULER_PRIOR_RTF,
+    SCHEDULER_PRIOR_OTHER_RTF,
+    SCHEDULER_INT8_SPEEDUP,
+    SCHEDULER_PARALLEL_EFFICIENCY,
+    SCHEDULER_LOAD_S_PER_MB,
+    TRANSCRIBE_PARALLEL_MIN_S,
+    TRANSCRIBE_WORKERS,
+)
+from core.model_registry import (
+    QUANTIZED_SIZE_RATIO, WHISPER_SIZES_MB, get_profile, get_registry
+)
+from core.parallel_transcription import live_transcription_pool
+from core.pipeline import Stage, analyze_meeting, meeting_stages
+
+Plan = Dict[str, Any]
+
+
+# =========================
+# Host costs
+# =========================
+
+def stage_key(stage: str, plan: Plan) -> str:
+    """
+    Cost key of a stage under a plan: transcription is keyed by Whisper
+    size, quantization and workers, sentiment by quantization and batch size.
+    """
+    precision = "int8" if plan["quantize"] else "fp32"
+    if stage == "transcribe":
+        return f"transcribe:{plan['whisper_size']}:{precision}:w{max(1, plan['transcribe_workers'])}"
+    if stage == "sentiment":
+        return f"sentiment:{precision}:b{plan['sentiment_batch_size']}"
+    return stage
+
+
+def _parallel_speedup(workers: int) -> float:
+    return 1.0 + (max(1, workers) - 1) * SCHEDULER_PARALLEL_EFFICIENCY
+
+
+def prior_rtf(key: str) -> float:
+    """SCHEDULER_PRIOR_RTF for a cost key, adjusted for int8 and parallel workers."""
+    parts = key.split(":")
+    if parts[0] == "transcribe":
+        _, size, precision, workers = parts
+        rtf = SCHEDULER_PRIOR_RTF.get(f"transcribe:{size}", SCHEDULER_PRIOR_RTF["transcribe:small"])
+        rtf /= _parallel_speedup(int(workers[1:]))
+    else:
+        precision = parts[1] if len(parts) > 1 else "fp32"
+        rtf = SCHEDULER_PRIOR_RTF.get(parts[0], SCHEDULER_PRIOR_OTHER_RTF)
+    return rtf / SCHEDULER_INT8_SPEEDUP if precision == "int8" else rtf
+
+
+class HostCosts:
+    """
+    Measured real-time factor per stage key on this host, as an
+    exponential moving average, persisted as JSON shared by every process
+    (entries of other hosts in the same file are kept untouched).
+    """
+
+    def __init__(self, path: str = SCHEDULER_COSTS, host: Optional[str] = None):
+        self.path = path
+        self.host = host or platform.node() or "localhost"
+        self._lock = threading.Lock()
+        self._costs: Dict[str, Dict[str, float]] = self._read().get(self.host, {})
+
+    def _read(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, hosts: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".host_costs_", dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(hosts, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def costs(self) -> Dict[str, Dict[str, float]]:
+        """{key: {'rtf', 'runs'}} measured so far."""
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._costs.items()}
+
+    def record(self, samples: Dict[str, float]) -> None:
+        """Fold measured RTFs ({key: rtf}) into the averages and save them."""
+        if not samples:
+            return
+        with self._lock:
+            # Start from the file so updates from other processes are not lost
+            hosts = self._read()
+            costs = hosts.setdefault(self.host, {})
+            for key, rtf in samples.items():
+                entry = costs.get(key)
+                if entry is None:
+                    costs[key] = {"rtf": rtf, "runs": 1}
+                else:
+                    entry["rtf"] += SCHEDULER_EMA_ALPHA * (rtf - entry["rtf"])
+                    entry["runs"] += 1
+            self._write(hosts)
+            self._costs = costs
+
+    def _host_factor(self, family: str) -> float:
+        """Median measured/prior ratio over the family's keys (all keys if none; 1 without data)."""
+        ratios = {key: entry["rtf"] / prior_rtf(key) for key, entry in self._costs.items()}
+        same = [ratio for key, ratio in ratios.items() if key.split(":")[0] == family]
+        return statistics.median(same or list(ratios.values()) or [1.0])
+
+    def rtf(self, key: str) -> float:
+        """Measured RTF for ``key``, else its prior scaled to this host."""
+        with self._lock:
+            if key in self._costs:
+                return self._costs[key]["rtf"]
+            return prior_rtf(key) * self._host_factor(key.split(":")[0])
+
+    def observe(self, plan: Plan, result: Dict[str, Any]) -> None:
+        """
+        Record the stage timings of an analyze_meeting ``result`` run under
+        ``plan``. Cached stages did not run and are ignored, as is Whisper's
+        load time when the plan started without it in memory.
+        """
+        audio_s = result.get("audio_s")
+        if not audio_s:
+            return
+        # Short recordings are transcribed in one pass whatever the plan asked for
+        workers = result["transcript"].get("parallel", {}).get("workers", 1)
+        plan = dict(plan, transcribe_workers=workers)
+        samples = {}
+        for name, record in result["stages"].items():
+            wall = record["wall_s"]
+            if name == "transcribe" and plan.get("whisper_cold"):
+                wall = max(0.0, wall - whisper_load_s(plan))
+            if name == "sentiment" and "sentiment" in result.get("skipped", ()):
+                continue
+            samples[stage_key(name, plan)] = wall / audio_s
+        self.record(samples)
+
+
+_costs: Optional[HostCosts] = None
+_costs_lock = threading.Lock()
+
+
+def get_host_costs() -> HostCosts:
+    """Process-wide measured costs at SCHEDULER_COSTS."""
+    global _costs
+    if _costs is None:
+        with _costs_lock:
+            if _costs is None:
+                _costs = HostCosts()
+    return _costs
+
+
+# =========================
+# Planning
+# =========================
+
+def whisper_load_s(plan: Plan) -> float:
+    """Estimated time to load the plan's Whisper checkpoint."""
+    size_mb = WHISPER_SIZES_MB.get(plan["whisper_size"], WHISPER_SIZES_MB["small"])
+    if plan["quantize"]:
+        size_mb *= QUANTIZED_SIZE_RATIO
+    return size_mb * SCHEDULER_LOAD_S_PER_MB
+
+
+def _whisper_loaded(size: str, quantize: bool) -> bool:
+    return ("whisper", {"size": size, "quantize": quantize}) in get_registry().loaded()
+
+
+def predict(plan: Plan, audio_s: float, costs: Optional[HostCosts] = None,
+            mode: str = PIPELINE_MODE) -> Tuple[float, Dict[str, float]]:
+    """
+    Predicted wall time of ``plan`` on a recording of ``audio_s`` seconds,
+    with the SCHEDULER_SAFETY_FACTOR margin, and the predicted seconds per
+    stage. Stages overlap along the DAG except in serial mode. Skipped
+    stages cost nothing and are left out of the per-stage seconds.
+    """
+    costs = costs or get_host_costs()
+    stages: List[Stage] = meeting_stages(skip=plan["skip"])
+    skipped = set(plan["skip"])
+    per_stage = {}
+    for stage in stages:
+        if stage.name in skipped:
+            # A skipped sentiment stage stays in the DAG as an instant stand-in
+            per_stage[stage.name] = 0.0
+            continue
+        seconds = costs.rtf(stage_key(stage.name, plan)) * audio_s
+        if stage.name == "transcribe" and plan.get("whisper_cold"):
+            seconds += whisper_load_s(plan)
+        per_stage[stage.name] = seconds
+
+    if mode == "serial":
+        total = sum(per_stage.values())
+    else:
+        finish: Dict[str, float] = {}
+        while len(finish) < len(stages):
+            for stage in stages:
+                if stage.name not in finish and all(d in finish or d == "audio" for d in stage.deps):
+                    finish[stage.name] = per_stage[stage.name] + max(
+                        (finish[d] for d in stage.deps if d in finish), default=0.0
+                    )
+        total = max(finish.values())
+    return total * SCHEDULER_SAFETY_FACTOR, {
+        name: seconds for name, seconds in per_stage.items() if name not in skipped
+    }
+
+
+def _profile_whisper_mb(profile: str) -> float:
+    settings = INFERENCE_PROFILES[profile]
+    size_mb = WHISPER_SIZES_MB.get(settings["whisper_size"], WHISPER_SIZES_MB["small"])
+    return size_mb * QUANTIZED_SIZE_RATIO if settings["quantize"] else size_mb
+
+
+def _worker_options(audio_s: float, profile: str, mode: str) -> List[int]:
+    """
+    Transcription worker counts worth trying, fewest first. Their Whisper
+    copies must fit MODEL_MEMORY_BUDGET_MB next to the models this process
+    holds and, while it still has chunks to finish, a live pool the plan
+    would replace.
+    """
+    # Daemon processes (process pipelines, batch workers) cannot start a transcription pool
+    if audio_s < TRANSCRIBE_PARALLEL_MIN_S or mode == "process" or multiprocessing.current_process().daemon:
+        return [1]
+    size_mb = _profile_whisper_mb(profile)
+    budget = MODEL_MEMORY_BUDGET_MB
+    live = live_transcription_pool()
+    if budget is not None:
+        budget -= get_registry().memory_usage_mb()
+    options, workers = [1], 2
+    while workers <= SCHEDULER_MAX_TRANSCRIBE_WORKERS:
+        if budget is not None:
+            needed = workers * size_mb
+            if live is not None and live[2] and live[:2] != (workers, profile):
+                needed += live[0] * _profile_whisper_mb(live[1])
+            if needed > budget:
+                break
+        options.append(workers)
+        workers *= 2
+    return options
+
+
+def _sentiment_batch_size(costs: HostCosts, quantize: bool) -> int:
+    """Fastest measured batch size for the precision (SENTIMENT_BATCH_SIZE until measured)."""
+    precision = "int8" if quantize else "fp32"
+    measured = costs.costs()
+    timed = [
+        (measured[f"sentiment:{precision}:b{size}"]["rtf"], size)
+        for size in SCHEDULER_SENTIMENT_BATCH_SIZES
+        if f"sentiment:{precision}:b{size}" in measured
+    ]
+    return min(timed)[1] if timed else SENTIMENT_BATCH_SIZE
+
+
+def _make_plan(profile: str, workers: int, skip: Sequence[str], costs: HostCosts) -> Plan:
+    settings = INFERENCE_PROFILES[profile]
+    return {
+        "profile": profile,
+        "whisper_size": settings["whisper_size"],
+        "quantize": settings["quantize"],
+        "transcribe_workers": workers,
+        "sentiment_batch_size": _sentiment_batch_size(costs, settings["quantize"]),
+        "skip": list(skip),
+        "whisper_cold": not _whisper_loaded(settings["whisper_size"], settings["quantize"]),
+    }
+
+
+def default_plan(audio_s: float, costs: Optional[HostCosts] = None, mode: str = PIPELINE_MODE,
+                 profile: Optional[str] = None) -> Plan:
+    """
+    The configured settings (``profile``, default the process profile;
+    TRANSCRIBE_WORKERS; all stages), with their prediction.
+    """
+    costs = costs or get_host_costs()
+    plan = _make_plan(profile or get_profile(), max(1, TRANSCRIBE_WORKERS), [], costs)
+    plan["sentiment_batch_size"] = SENTIMENT_BATCH_SIZE
+    plan["predicted_s"], plan["predicted_stages"] = predict(plan, audio_s, costs, mode)
+    plan.update(deadline_s=None, feasible=True, audio_s=audio_s, mode=mode)
+    return plan
+
+
+def plan_analysis(audio_s: float, deadline_s: float, costs: Optional[HostCosts] = None,
+                  mode: str = PIPELINE_MODE) -> Plan:
+    """
+    The most accurate configuration predicted to analyse ``audio_s``
+    seconds of audio within ``deadline_s`` seconds.
+
+    Profiles are tried in SCHEDULER_PROFILE_ORDER with as few transcription
+    workers as will do; only when no profile fits are the
+    SCHEDULER_OPTIONAL_STAGES groups given up, one group at a time. If
+    nothing fits, the fastest configuration is returned with 'feasible'
+    False. Cache hits are not anticipated, so a plan errs on the slow side.
+
+    Returns:
+        {
+            'profile', 'whisper_size', 'quantize', 'transcribe_workers',
+            'sentiment_batch_size', 'skip': [stage names], 'whisper_cold',
+            'predicted_s', 'predicted_stages': {stage: seconds},
+            'deadline_s', 'feasible', 'audio_s', 'mode',
+        }
+    """
+    costs = costs or get_host_costs()
+    present = {stage.name for stage in meeting_stages()}
+    skip: List[str] = []
+    fastest: Optional[Plan] = None
+    for level in [[]] + SCHEDULER_OPTIONAL_STAGES:
+        skip = skip + [name for name in level if name in present]
+        for profile in SCHEDULER_PROFILE_ORDER:
+            for workers in _worker_options(audio_s, profile, mode):
+                plan = _make_plan(profile, workers, skip, costs)
+                plan["predicted_s"], plan["predicted_stages"] = predict(plan, audio_s, costs, mode)
+                plan.update(deadline_s=deadline_s, audio_s=audio_s, mode=mode)
+                if plan["predicted_s"] <= deadline_s:
+                    return dict(plan, feasible=True)
+                if fastest is None or plan["predicted_s"] < fastest["predicted_s"]:
+                    fastest = plan
+    return dict(fastest, feasible=False)
+
+
+def plan_options(plan: Plan) -> Dict[str, Any]:
+    """analyze_meeting keyword arguments carrying out ``plan``, its profile included."""
+    return {
+        "profile": plan["profile"],
+        "stage_options": {
+            "transcribe": {"workers": plan["transcribe_workers"]},
+            "sentiment": {"batch_size": plan["sentiment_batch_size"]},
+        },
+        "skip": plan["skip"],
+    }
+
+
+def schedule_summary(plan: Plan, result: Dict[str, Any], actual_s: float,
+                     waited_s: float = 0.0) -> Dict[str, Any]:
+    """
+    The plan with predicted vs actual seconds (total and per stage), for
+    the report. ``waited_s`` is time spent queued before the run started;
+    'met' compares queueing plus the run against the deadline.
+    """
+    return {
+        "plan": {key: value for key, value in plan.items() if key != "predicted_stages"},
+        "predicted_s": round(plan["predicted_s"], 2),
+        "actual_s": round(actual_s, 2),
+        "waited_s": round(waited_s, 2),
+        "met": None if plan["deadline_s"] is None else waited_s + actual_s <= plan["deadline_s"],
+        "stages": {
+            name: {
+                "predicted_s": round(plan["predicted_stages"].get(name, 0.0), 2),
+                "actual_s": round(result["stages"][name]["wall_s"], 2) if name in result["stages"] else None,
+            }
+            for name in plan["predicted_stages"]
+        },
+    }
+
+
+def schedule(audio_s: Optional[float], deadline_s: Optional[float] = None, waited_s: float = 0.0,
+             mode: str = PIPELINE_MODE, profile: Optional[str] = None) -> Optional[Plan]:
+    """
+    The plan for a run: plan_analysis for what is left of ``deadline_s``
+    after ``waited_s`` in a queue, or the configured settings under
+    ``profile`` without a deadline. None when the recording length is unknown.
+    """
+    if not audio_s:
+        return None
+    if not deadline_s:
+        return default_plan(audio_s, mode=mode, profile=profile)
+    return dict(plan_analysis(audio_s, deadline_s - waited_s, mode=mode), deadline_s=deadline_s)
+
+
+def run_plan(audio_path: str, plan: Optional[Plan], waited_s: float = 0.0, **kwargs: Any) -> Dict[str, Any]:
+    """
+    analyze_meeting under ``plan``, recording the measured stage costs
+    afterwards. The result gains 'schedule' (see schedule_summary; None
+    without a plan). ``kwargs`` go to analyze_meeting (executor, progress,
+    cache, profile_stages, profile); the plan's profile takes precedence.
+    """
+    if plan is None:
+        return dict(analyze_meeting(audio_path, **kwargs), schedule=None)
+    started = time.perf_counter()
+    result = analyze_meeting(audio_path, **dict(kwargs, **plan_options(plan)))
+    actual_s = time.perf_counter() - started
+
+    get_host_costs().observe(plan, result)
+    result["schedule"] = schedule_summary(plan, result, actual_s, waited_s)
+    return result
+
+
+# =========================
+# CLI
+# =========================
+
+def _print_costs(costs: HostCosts) -> None:
+    measured = costs.costs()
+    if not measured:
+        print(f"No stages measured on {costs.host} yet (priors in use).")
+        return
+    print(f"{'stage':<32} {'RTF':>8} {'runs':>6}")
+    for key, entry in sorted(measured.items()):
+        print(f"{key:<32} {entry['rtf']:>8.4f} {entry['runs']:>6}")
+
+
+def _print_plan(plan: Plan) -> None:
+    mark = "✅" if plan["feasible"] else "⚠️ "
+    print(f"{mark} profile {plan['profile']} (Whisper {plan['whisper_size']}"
+          f"{', int8' if plan['quantize'] else ''}), {plan['transcribe_workers']} transcription "
+          f"worker(s), sentiment batch {plan['sentiment_batch_size']}"
+          f"{', skipping ' + ', '.join(plan['skip']) if plan['skip'] else ''}")
+    print(f"⏱️  predicted {plan['predicted_s']:.1f}s"
+          + (f" for a {plan['deadline_s']:.0f}s deadline" if plan["deadline_s"] else ""))
+    for name, seconds in plan["predicted_stages"].items():
+        print(f"   {name:<12} {seconds:>8.2f}s")
+
+
+def calibrate(audio_path: str, profiles: Sequence[str], workers: Sequence[int]) -> None:
+    """Analyse ``audio_path`` under each profile and worker count (no cache), recording the costs."""
+    from core.sentiment_analysis import analyze_sentiment
+
+    costs = get_host_costs()
+    for profile in profiles:
+        for count in workers:
+            plan = dict(_make_plan(profile, count, [], costs), deadline_s=None)
+            started = time.perf_counter()
+            result = analyze_meeting(audio_path, **plan_options(plan))
+            wall = time.perf_counter() - started
+            costs.observe(plan, result)
+            # Batch sizes only change sentiment's speed, so time them on the same transcript
+            samples = {}
+            for size in SCHEDULER_SENTIMENT_BATCH_SIZES:
+                began = time.perf_counter()
+                analyze_sentiment(result["transcript"], batch_size=size, use_text_cache=False,
+                                  profile=profile)
+                samples[stage_key("sentiment", dict(plan, sentiment_batch_size=size))] = (
+                    (time.perf_counter() - began) / result["audio_s"]
+                )
+            costs.record(samples)
+            print(f"📏 {profile}, {count} worker(s): {wall:.1f}s for {result['audio_s']:.0f}s of audio")
+    _print_costs(costs)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure stage costs and plan analyses against a deadline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("show", help="list the stage costs measured on this host")
+    plan_cmd = commands.add_parser("plan", help="show the plan for a recording length and deadline")
+    plan_cmd.add_argument("--audio-s", type=float, required=True, help="recording length (seconds)")
+    plan_cmd.add_argument("--deadline", type=float, required=True, help="time allowed (seconds)")
+    calibrate_cmd = commands.add_parser("calibrate", help="time every profile on a recording")
+    calibrate_cmd.add_argument("audio", help="meeting recording")
+    calibrate_cmd.add_argument("--profiles", nargs="+", default=SCHEDULER_PROFILE_ORDER,
+                               choices=list(INFERENCE_PROFILES))
+    calibrate_cmd.add_argument("--workers", nargs="+", type=int, default=[1],
+                               help="transcription worker counts to time")
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        _print_costs(get_host_costs())
+    elif args.command == "plan":
+        _print_plan(plan_analysis(args.audio_s, args.deadline))
+    else:
+        calibrate(args.audio, args.profiles, args.workers)
+
+
+if __name__ == "__main__":
+    main()
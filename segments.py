@@ -0,0 +1,239 @@
+"""
+Compact segment containers shared by the core modules: a ``__slots__``
+record for single segments and a columnar table for whole meetings.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+# Column order of the dict form; absent (None) fields are left out
+FIELDS = ("speaker", "start", "end", "text", "label", "score", "words")
+
+
+class Segment:
+    """One time span with optional text, speaker and sentiment."""
+
+    __slots__ = FIELDS
+
+    def __init__(
+        self,
+        start: float,
+        end: float,
+        text: Optional[str] = None,
+        speaker: Optional[str] = None,
+        label: Optional[str] = None,
+        score: Optional[float] = None,
+        words: Optional[List[Dict]] = None,
+    ):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.speaker = speaker
+        self.label = label
+        self.score = score
+        self.words = words
+
+    @classmethod
+    def from_dict(cls, seg: Dict[str, Any]) -> "Segment":
+        """Keep only the fields the pipeline uses (drops Whisper's tokens, logprobs, ...)."""
+        return cls(
+            seg["start"], seg["end"], seg.get("text"), seg.get("speaker"),
+            seg.get("label"), seg.get("score"), seg.get("words"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in FIELDS if getattr(self, name) is not None}
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in FIELDS
+                           if getattr(self, name) is not None)
+        return f"Segment({fields})"
+
+
+class _Categories:
+    """String column stored as integer codes (-1 = missing) plus the distinct values."""
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self, codes: np.ndarray, values: Sequence[str]):
+        self.codes = codes
+        self.values = list(values)
+
+    @classmethod
+    def encode(cls, items: Iterable[Optional[str]], n: int, dtype=np.int32) -> "_Categories":
+        index: Dict[str, int] = {}
+        codes = np.fromiter(
+            (-1 if item is None else index.setdefault(item, len(index)) for item in items),
+            dtype, n,
+        )
+        return cls(codes, list(index))
+
+    def get(self, i: int) -> Optional[str]:
+        code = self.codes[i]
+        return None if code < 0 else self.values[code]
+
+    def decode(self) -> List[Optional[str]]:
+        lookup = self.values + [None]  # code -1 picks the trailing None
+        return [lookup[code] for code in self.codes.tolist()]
+
+
+class SegmentTable:
+    """
+    Columnar segments: float64 ``starts``/``ends`` arrays, speaker and
+    sentiment labels as integer codes into small label lists, and
+    optional text, score and word columns (None when no segment has them).
+
+    ``labels[codes[i]]`` is segment i's speaker (code -1 = unattributed),
+    so a table of diarization turns can be passed straight to the
+    vectorized bias analysis. ``from_dicts``/``to_dicts`` convert from and
+    to the list-of-dicts format used at module boundaries.
+    """
+
+    __slots__ = ("starts", "ends", "_speakers", "texts", "_sentiments", "scores", "words")
+
+    def __init__(
+        self,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        codes: Optional[np.ndarray] = None,
+        labels: Sequence[str] = (),
+        texts: Optional[List[str]] = None,
+        sentiment_codes: Optional[np.ndarray] = None,
+        sentiment_labels: Sequence[str] = (),
+        scores: Optional[np.ndarray] = None,
+        words: Optional[List[Optional[List[Dict]]]] = None,
+    ):
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        n = len(self.starts)
+        if codes is None:
+            codes = np.full(n, -1, dtype=np.int32)
+        self._speakers = _Categories(np.asarray(codes), labels)
+        self.texts = texts
+        self._sentiments = None
+        if sentiment_codes is not None:
+            self._sentiments = _Categories(np.asarray(sentiment_codes), sentiment_labels)
+        self.scores = None if scores is None else np.asarray(scores, dtype=np.float64)
+        self.words = words
+
+    # ---- speaker / sentiment columns ----
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Speaker code per segment (-1 = no speaker)."""
+        return self._speakers.codes
+
+    @property
+    def labels(self) -> List[str]:
+        """Speaker label per code, in order of first appearance."""
+        return self._speakers.values
+
+    @property
+    def sentiment_codes(self) -> Optional[np.ndarray]:
+        return None if self._sentiments is None else self._sentiments.codes
+
+    @property
+    def sentiment_labels(self) -> List[str]:
+        return [] if self._sentiments is None else self._sentiments.values
+
+    def with_sentiment(self, labels: Sequence[str], scores: Sequence[float]) -> "SegmentTable":
+        """Copy sharing the other columns, with sentiment labels and scores set."""
+        sentiments = _Categories.encode(labels, len(self), np.int8)
+        return SegmentTable(
+            self.starts, self.ends, self.codes, self.labels, self.texts,
+            sentiments.codes, sentiments.values,
+            np.fromiter(scores, np.float64, len(self)), self.words,
+        )
+
+    def take(self, index: Union[Sequence[int], np.ndarray]) -> "SegmentTable":
+        """Rows at ``index`` (label lists are shared, not re-coded)."""
+        index = np.asarray(index, dtype=np.intp)
+        pick = lambda column: None if column is None else [column[i] for i in index]
+        return SegmentTable(
+            self.starts[index], self.ends[index], self.codes[index], self.labels,
+            pick(self.texts),
+            None if self._sentiments is None else self._sentiments.codes[index],
+            self.sentiment_labels,
+            None if self.scores is None else self.scores[index],
+            pick(self.words),
+        )
+
+    # ---- conversion ----
+
+    @classmethod
+    def from_dicts(cls, segments: Sequence[Dict[str, Any]]) -> "SegmentTable":
+        """
+        Build from a list of segment dicts, keeping only start, end, text,
+        speaker, label, score and words. Speaker codes follow first appearance.
+        """
+        n = len(segments)
+        speakers = _Categories.encode((seg.get("speaker") for seg in segments), n)
+        sentiments = _Categories.encode((seg.get("label") for seg in segments), n, np.int8)
+        has = lambda key: any(key in seg for seg in segments)
+
+        return cls(
+            np.fromiter((seg["start"] for seg in segments), np.float64, n),
+            np.fromiter((seg["end"] for seg in segments), np.float64, n),
+            speakers.codes,
+            speakers.values,
+            [seg.get("text", "") for seg in segments] if has("text") else None,
+            sentiments.codes if sentiments.values else None,
+            sentiments.values,
+            np.fromiter((seg.get("score", np.nan) for seg in segments), np.float64, n)
+            if has("score") else None,
+            [seg.get("words") for seg in segments] if has("words") else None,
+        )
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """The list-of-dicts form (plain Python floats and strings)."""
+        return [segment.to_dict() for segment in self]
+
+    # ---- sequence protocol ----
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, i: int) -> Segment:
+        return Segment(
+            float(self.starts[i]),
+            float(self.ends[i]),
+            None if self.texts is None else self.texts[i],
+            self._speakers.get(i),
+            None if self._sentiments is None else self._sentiments.get(i),
+            None if self.scores is None or np.isnan(self.scores[i]) else float(self.scores[i]),
+            None if self.words is None else self.words[i],
+        )
+
+    def __iter__(self) -> Iterator[Segment]:
+        n = len(self)
+        none = [None] * n
+        speakers = self._speakers.decode()
+        sentiments = none if self._sentiments is None else self._sentiments.decode()
+        scores = none if self.scores is None else [
+            None if score != score else score for score in self.scores.tolist()  # NaN → None
+        ]
+        columns = zip(
+            self.starts.tolist(), self.ends.tolist(), self.texts or none, speakers,
+            sentiments, scores, self.words or none,
+        )
+        for start, end, text, speaker, label, score, words in columns:
+            yield Segment(start, end, text, speaker, label, score, words)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the numeric columns."""
+        total = self.starts.nbytes + self.ends.nbytes + self.codes.nbytes
+        if self._sentiments is not None:
+            total += self._sentiments.codes.nbytes
+        if self.scores is not None:
+            total += self.scores.nbytes
+        return total
+
+
+def as_table(segments: Union[SegmentTable, Sequence[Dict[str, Any]]]) -> SegmentTable:
+    """Accept either representation where a table is wanted."""
+    return segments if isinstance(segments, SegmentTable) else SegmentTable.from_dicts(segments)
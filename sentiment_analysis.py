@@ -2,46 +2,398 @@
 Sentiment analysis using transformers (distilbert-base-uncased-finetuned-sst-2-english).
 """
 
-from typing import Dict, Any
-from transformers import pipeline as transformers_pipeline
+import atexit
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from core.model_registry import get_profile, get_profile_model, profile_params
+from core.segments import as_table
+from utils.audio_utils import SpeechMap
+from utils.config import (
+    SENTIMENT_MODEL,
+    SENTIMENT_BATCH_SIZE,
+    SENTIMENT_MAX_TOKENS,
+    SENTIMENT_CACHE_ENTRIES,
+    SENTIMENT_CACHE_MAX_CHARS,
+    SENTIMENT_CACHE_PERSIST,
+    SENTIMENT_CACHE_DIR,
+    SENTIMENT_CACHE_SAVE_S,
+    SENTIMENT_SERVER,
+    VAD_MIN_SPEECH_RATIO,
+)
 
 
-def analyze_sentiment(transcript: Dict[str, Any]) -> Dict:
+def classify_texts(
+    sentiment_pipe: Any,
+    texts: List[str],
+    batch_size: int = SENTIMENT_BATCH_SIZE,
+    max_tokens: int = SENTIMENT_MAX_TOKENS,
+) -> List[Dict[str, Any]]:
+    """
+    Classify texts in length-bucketed batches.
+
+    Texts are sorted by token count so each batch pads to a similar length,
+    then results are scattered back to input order. Truncation is done by
+    the tokenizer at ``max_tokens`` tokens.
+
+    Args:
+        sentiment_pipe: transformers sentiment pipeline (or compatible callable)
+        texts: Texts to classify
+        batch_size: Texts per forward pass (1 reproduces per-segment calls)
+        max_tokens: Token limit per text
+
+    Returns:
+        [{'label': str, 'score': float}, ...] aligned with ``texts``
+    """
+    if not texts:
+        return []
+    batch_size = max(1, int(batch_size))
+
+    tokenizer = getattr(sentiment_pipe, "tokenizer", None)
+    if tokenizer is not None:
+        encoded = tokenizer(texts, truncation=True, max_length=max_tokens)
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+    else:
+        lengths = [len(text) for text in texts]
+    order = sorted(range(len(texts)), key=lambda i: lengths[i])
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+    for pos in range(0, len(order), batch_size):
+        idx = order[pos:pos + batch_size]
+        outputs = sentiment_pipe(
+            [texts[i] for i in idx],
+            batch_size=len(idx),
+            truncation=True,
+            max_length=max_tokens,
+        )
+        for i, res in zip(idx, outputs):
+            results[i] = res
+    return results
+
+
+def get_sentiment_pipe(profile: Optional[str] = None) -> Any:
+    """
+    The ``profile``'s sentiment model (default: the process profile), or
+    with SENTIMENT_SERVER set a batching front with the same call
+    interface (core.inference_server).
+    """
+    if not SENTIMENT_SERVER:
+        return get_profile_model("sentiment", profile)
+    from core.inference_server import get_sentiment_pipe as get_server_pipe
+    return get_server_pipe(SENTIMENT_SERVER, profile)
+
+
+# =========================
+# Text Cache
+# =========================
+
+def normalize_text(text: str, lowercase: bool = False) -> str:
+    """
+    Cache key for an utterance: Unicode NFKC, whitespace collapsed, and
+    lowercased for uncased models (whose tokenizer lowercases anyway), so
+    " Yeah. " and "yeah." share an entry. Punctuation is kept; the model sees it.
+    """
+    text = " ".join(unicodedata.normalize("NFKC", text).split())
+    return text.lower() if lowercase else text
+
+
+def sentiment_model_id(profile: Optional[str] = None) -> str:
+    """Identifies the sentiment model variant of a profile (quantized outputs differ)."""
+    quantize = profile_params(profile or get_profile())["sentiment"]["quantize"]
+    return f"{SENTIMENT_MODEL}:int8" if quantize else SENTIMENT_MODEL
+
+
+class SentimentCache:
+    """
+    Bounded LRU of {'label', 'score'} by normalized utterance text for one
+    sentiment model, with hit/miss counters.
+
+    Only texts up to ``max_chars`` are cached: short acknowledgements
+    ("Yeah.", "Okay.", "Thank you.") repeat across meetings, long ones
+    rarely do. With ``path`` set the entries are loaded from, and saved
+    to, a JSON file so they carry over between meetings and restarts.
+    Saves are batched on a background timer (save_soon) and merged with
+    what other processes saved meanwhile.
+    """
+
+    def __init__(self, model_id: str, max_entries: int = SENTIMENT_CACHE_ENTRIES,
+                 max_chars: int = SENTIMENT_CACHE_MAX_CHARS, path: Optional[str] = None):
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.path = path
+        self.lowercase = "uncased" in model_id
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        if path is not None:
+            self._entries.update(self._read())
+
+    def key(self, text: str) -> Optional[str]:
+        """Normalized text, or None if the text is too long to cache."""
+        key = normalize_text(text, self.lowercase)
+        return key if len(key) <= self.max_chars else None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = {"label": result["label"], "score": float(result["score"])}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_id,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _read(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Entries saved for this model, least recently used first."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if data.get("model") != self.model_id:
+            return []
+        return [
+            (key, {"label": label, "score": score})
+            for key, (label, score) in list(data.get("entries", {}).items())[-self.max_entries:]
+        ]
+
+    def save_soon(self, delay_s: float = SENTIMENT_CACHE_SAVE_S) -> None:
+        """Save in ``delay_s`` on a background thread, so a burst of analyses writes the file once."""
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty or self._timer is not None:
+                return
+            self._timer = threading.Timer(delay_s, self._timed_save)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _timed_save(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.save()
+
+    def save(self) -> None:
+        """
+        Write the entries if anything changed since the last save, merged
+        with the file: under a lock, entries other processes saved are kept
+        and this process's take precedence as the most recently used. The
+        merged entries are also adopted here. The file is replaced atomically.
+        """
+        if self.path is None:
+            return
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            ours = list(self._entries.items())
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with _file_lock(f"{self.path}.lock"):
+            merged = OrderedDict(self._read())
+            for key, result in ours:
+                merged.pop(key, None)
+                merged[key] = result
+            while len(merged) > self.max_entries:
+                merged.popitem(last=False)
+            data = {
+                "model": self.model_id,
+                "entries": {key: [r["label"], r["score"]] for key, r in merged.items()},
+            }
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        with self._lock:
+            # Other processes' entries join as the least recently used
+            for key in reversed(merged):
+                if key not in self._entries and len(self._entries) < self.max_entries:
+                    self._entries[key] = merged[key]
+                    self._entries.move_to_end(key, last=False)
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock on ``path`` across processes (advisory; a no-op without fcntl)."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_caches: Dict[str, SentimentCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_sentiment_cache(model_id: Optional[str] = None) -> SentimentCache:
+    """
+    Process-wide cache for a sentiment model variant (the active profile's
+    by default), persisted under SENTIMENT_CACHE_DIR when
+    SENTIMENT_CACHE_PERSIST is set.
+    """
+    model_id = model_id or sentiment_model_id()
+    with _caches_lock:
+        if model_id not in _caches:
+            path = None
+            if SENTIMENT_CACHE_PERSIST:
+                path = os.path.join(SENTIMENT_CACHE_DIR, re.sub(r"[^\w.-]+", "_", model_id) + ".json")
+            _caches[model_id] = SentimentCache(model_id, path=path)
+        return _caches[model_id]
+
+
+@atexit.register
+def save_sentiment_caches() -> None:
+    """Write every cache's pending entries now (run at exit, as save timers are daemon threads)."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.save()
+
+
+def classify_cached(
+    sentiment_pipe: Any,
+    texts: List[str],
+    cache: Optional[SentimentCache],
+    batch_size: int = SENTIMENT_BATCH_SIZE,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    classify_texts with the text cache in front: cached utterances are
+    served from it, and repeats within ``texts`` go to the model once.
+
+    Returns:
+        ([{'label': str, 'score': float}, ...] aligned with ``texts``,
+         {'hits': served from the cache, 'repeats': duplicates of a miss,
+          'misses': texts sent to the model})
+    """
+    if cache is None:
+        return classify_texts(sentiment_pipe, texts, batch_size), {
+            "hits": 0, "repeats": 0, "misses": len(texts),
+        }
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+    pending: Dict[str, List[int]] = {}  # model input → positions needing it
+    keys: Dict[str, Optional[str]] = {}
+    for i, text in enumerate(texts):
+        key = cache.key(text)
+        if key is not None:
+            hit = cache.get(key)
+            if hit is not None:
+                results[i] = dict(hit)
+                continue
+        model_text = key if key is not None else text
+        keys[model_text] = key
+        pending.setdefault(model_text, []).append(i)
+
+    unique = list(pending)
+    for model_text, res in zip(unique, classify_texts(sentiment_pipe, unique, batch_size)):
+        if keys[model_text] is not None:
+            cache.put(keys[model_text], res)
+        for i in pending[model_text]:
+            results[i] = dict(res)
+    cache.save_soon()
+
+    served = sum(len(positions) for positions in pending.values())
+    return results, {
+        "hits": len(texts) - served,
+        "repeats": served - len(unique),
+        "misses": len(unique),
+    }
+
+
+def analyze_sentiment(
+    transcript: Dict[str, Any],
+    batch_size: int = SENTIMENT_BATCH_SIZE,
+    use_text_cache: bool = True,
+    profile: Optional[str] = None,
+) -> Dict:
     """
     Analyze sentiment for each segment.
     
     Args:
-        transcript: Transcript dict with segments
+        transcript: Transcript dict with segments (dicts or a SegmentTable)
+        batch_size: Segments per model call (1 = one call per segment)
+        use_text_cache: Serve repeated utterances from the text cache
+            (get_sentiment_cache) instead of the model
+        profile: Inference profile whose sentiment model to use (default:
+            the process profile)
         
     Returns:
         {
             'per_segment': [{'start': float, 'end': float, 'text': str, 
                            'label': str, 'score': float}, ...]
         }
+        Entries also carry 'speaker' when the transcript was aligned.
+        When the transcript has 'speech_regions' (voice-activity gating),
+        segments mostly outside speech are skipped as likely Whisper
+        hallucinations and counted in 'skipped_silent'. 'text_cache' holds
+        this call's classify_cached counts.
     """
-    sentiment_pipe = transformers_pipeline(
-        "sentiment-analysis",
-        model="distilbert-base-uncased-finetuned-sst-2-english",
-        device=-1  # CPU
+    sentiment_pipe = get_sentiment_pipe(profile)
+    table = as_table(transcript.get("segments", []))
+    texts = table.texts or [""] * len(table)
+    keep = [i for i, text in enumerate(texts) if text.strip()]
+    table = table.take(keep)
+    table.words = None
+
+    skipped = None
+    regions = transcript.get("speech_regions")
+    if regions is not None:
+        durations = table.ends - table.starts
+        speech = SpeechMap(regions, 0.0).speech_overlap(table.starts, table.ends)
+        voiced = speech >= VAD_MIN_SPEECH_RATIO * durations
+        skipped = int(len(table) - voiced.sum())
+        table = table.take(voiced.nonzero()[0])
+
+    if SENTIMENT_SERVER:
+        batch_size = max(1, len(table))  # one request; the server batches across analyses
+    cache = get_sentiment_cache(sentiment_model_id(profile)) if use_text_cache else None
+    results, counts = classify_cached(sentiment_pipe, table.texts or [], cache, batch_size)
+    table = table.with_sentiment(
+        [res["label"] for res in results], [res["score"] for res in results]
     )
-    segments = transcript.get("segments", [])
-    per_segment = []
-
-    for seg in segments:
-        text = seg.get("text", "")
-        if not text.strip():
-            continue
-        # Truncate for model limit
-        res = sentiment_pipe(text[:512])[0]
-        per_segment.append({
-            "start": seg.get("start", 0),
-            "end": seg.get("end", 0),
-            "text": text,
-            "label": res["label"],
-            "score": res["score"]
-        })
-    
-    return {
-        "per_segment": per_segment
-    }
 
+    sentiments = {
+        "per_segment": table.to_dicts()
+    }
+    if skipped is not None:
+        sentiments["skipped_silent"] = skipped
+    if cache is not None:
+        sentiments["text_cache"] = counts
+    return sentiments
@@ -2,27 +2,114 @@
 Speech-to-text transcription using Whisper (small, CPU-only).
 """
 
-from typing import Dict, Any
-import whisper
+import multiprocessing
+from typing import Any, Dict, Optional, Tuple, Union
+import numpy as np
+from core.model_registry import get_profile_model
+from core.segments import SegmentTable
+from utils.audio_utils import (
+    resolve_audio, load_audio, detect_speech, SpeechMap, TARGET_SR
+)
+from utils.config import (
+    WORD_TIMESTAMPS, VAD_ENABLED, TRANSCRIBE_WORKERS, TRANSCRIBE_PARALLEL_MIN_S
+)
 
 
-def transcribe_audio(audio_path: str) -> Dict[str, Any]:
+def transcribe_audio(
+    audio_path: Union[str, np.ndarray],
+    vad: Optional[bool] = None,
+    workers: Optional[int] = None,
+    profile: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     Transcribe audio file to text using Whisper (small).
     
     Args:
-        audio_path: Path to audio file
+        audio_path: Path to audio file, float32 mono samples at 16kHz,
+            or a .npy buffer from load_audio_to_mmap
+        vad: Transcribe only the detected speech regions (concatenated),
+            then map timestamps back onto the original timeline
+            (default: VAD_ENABLED)
+        workers: With more than one, recordings of at least
+            TRANSCRIBE_PARALLEL_MIN_S are split at silences and transcribed
+            in a process pool (core.parallel_transcription); default
+            TRANSCRIBE_WORKERS
+        profile: Inference profile whose Whisper to use (default: the
+            process profile)
         
     Returns:
         transcript: {
             'text': str,
             'segments': [{'start': float, 'end': float, 'text': str}, ...]
         }
+        With WORD_TIMESTAMPS, segments also carry 'words':
+        [{'word': str, 'start': float, 'end': float}, ...].
+        Whisper's other per-segment fields (tokens, avg_logprob, ...) are dropped.
+        With ``vad``, also 'speech_regions': [[start, end], ...] and
+        'vad': {'audio_s', 'speech_s', 'saved_s', 'saved_ratio'}.
+        Parallel runs add 'parallel': {'workers', 'chunks'}.
     """
-    model = whisper.load_model("small", device="cpu")
-    result = model.transcribe(audio_path, fp16=False)
-    return {
-        "text": result["text"],
-        "segments": result["segments"]
+    audio = resolve_audio(audio_path)
+    vad = VAD_ENABLED if vad is None else vad
+    workers = TRANSCRIBE_WORKERS if workers is None else workers
+
+    if workers > 1 and not multiprocessing.current_process().daemon:
+        if isinstance(audio, str):
+            audio = load_audio(audio)
+        if len(audio) / TARGET_SR >= TRANSCRIBE_PARALLEL_MIN_S:
+            from core.parallel_transcription import transcribe_parallel
+            return transcribe_parallel(audio, workers, vad, profile)
+
+    speech_map: Optional[SpeechMap] = None
+    if vad:
+        if isinstance(audio, str):
+            audio = load_audio(audio)
+        speech_map = SpeechMap(detect_speech(audio), len(audio) / TARGET_SR)
+
+    text, segments = transcribe_samples(get_profile_model("whisper", profile), audio, speech_map)
+    transcript = {
+        "text": text,
+        "segments": segments.to_dicts()
     }
+    if speech_map is not None:
+        transcript["speech_regions"] = [list(region) for region in speech_map.regions]
+        transcript["vad"] = speech_map.stats()
+    return transcript
+
+
+def transcribe_samples(
+    model: Any, audio: Union[str, np.ndarray], speech_map: Optional[SpeechMap] = None
+) -> Tuple[str, SegmentTable]:
+    """
+    One Whisper pass over ``audio`` (gated to ``speech_map``'s regions when
+    given), with timestamps on the ungated timeline of ``audio``.
+    """
+    if speech_map is not None:
+        audio = speech_map.gate(audio)
+    if speech_map is not None and not speech_map.regions:
+        result = {"text": "", "segments": []}  # nothing but silence
+    else:
+        result = model.transcribe(audio, fp16=False, word_timestamps=WORD_TIMESTAMPS)
+
+    segments = SegmentTable.from_dicts(result["segments"])
+    if segments.words is not None:
+        segments.words = [_compact_words(words, speech_map) for words in segments.words]
+    if speech_map is not None:
+        segments.starts = speech_map.to_original(segments.starts)
+        segments.ends = speech_map.to_original(segments.ends, end=True)
+    return result["text"], segments
 
+
+def _compact_words(words, speech_map: Optional[SpeechMap] = None):
+    if not words:
+        return words
+    if speech_map is None:
+        return [{"word": w["word"], "start": w["start"], "end": w["end"]} for w in words]
+    return [
+        {
+            "word": w["word"],
+            "start": speech_map.to_original(w["start"]),
+            "end": speech_map.to_original(w["end"], end=True),
+        }
+        for w in words
+    ]
@@ -0,0 +1,190 @@
+"""
+Streaming analysis for long recordings: overlapping windows through
+transcription, diarization and sentiment, stitched onto one timeline.
+"""
+
+from typing import Dict, List, Any, Iterator, Iterable, Optional, Tuple
+
+from utils.audio_utils import iter_audio_windows, TARGET_SR
+from utils.config import STREAM_WINDOW_S, STREAM_OVERLAP_S
+from core.speech_to_text import transcribe_audio
+from core.diarization import diarize_speakers
+from core.sentiment_analysis import analyze_sentiment
+from core.alignment import align_transcript
+
+
+def _overlap(a_start: float, a_end: float, b_start: float, b_end: float) -> float:
+    return max(0.0, min(a_end, b_end) - max(a_start, b_start))
+
+
+class SpeakerStitcher:
+    """
+    Maps per-window diarization labels onto meeting-wide speaker labels.
+
+    Each local label is matched to the global speaker it overlaps most
+    inside the region shared with the previous window. Local speakers
+    with no overlap there are given a new global label, so a speaker who
+    is silent in every overlap region may be split across labels.
+    """
+
+    def __init__(self, label_format: str = "SPEAKER_{:02d}"):
+        self.label_format = label_format
+        self._prev_turns: List[Dict] = []
+        self._next_id = 0
+
+    def stitch(
+        self, turns: List[Dict], overlap_start: float, overlap_end: float
+    ) -> List[Dict]:
+        """
+        Relabel turns (absolute timestamps) of the current window.
+
+        Args:
+            turns: Current window's turns with local speaker labels
+            overlap_start, overlap_end: Region shared with the previous window
+
+        Returns:
+            Copies of ``turns`` carrying global speaker labels
+        """
+        scores: Dict[Tuple[str, str], float] = {}
+        if overlap_end > overlap_start:
+            for cur in turns:
+                for prev in self._prev_turns:
+                    shared = _overlap(
+                        max(cur["start"], overlap_start), min(cur["end"], overlap_end),
+                        prev["start"], prev["end"],
+                    )
+                    if shared > 0:
+                        key = (cur["speaker"], prev["speaker"])
+                        scores[key] = scores.get(key, 0.0) + shared
+
+        # Greedy one-to-one assignment by overlap duration
+        mapping: Dict[str, str] = {}
+        used = set()
+        for (local, glob), _ in sorted(scores.items(), key=lambda kv: -kv[1]):
+            if local not in mapping and glob not in used:
+                mapping[local] = glob
+                used.add(glob)
+        for turn in turns:
+            if turn["speaker"] not in mapping:
+                mapping[turn["speaker"]] = self.label_format.format(self._next_id)
+                self._next_id += 1
+
+        stitched = [dict(turn, speaker=mapping[turn["speaker"]]) for turn in turns]
+        self._prev_turns = stitched
+        return stitched
+
+
+def shifted_speech_regions(transcript: Dict[str, Any], offset: float) -> Dict[str, Any]:
+    """Voice-activity regions of a window transcript, moved onto the meeting timeline."""
+    if "speech_regions" not in transcript:
+        return {}
+    return {"speech_regions": [[s + offset, e + offset] for s, e in transcript["speech_regions"]]}
+
+
+def stream_analysis(
+    audio_path: str,
+    window_s: float = STREAM_WINDOW_S,
+    overlap_s: float = STREAM_OVERLAP_S,
+    profile: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Analyze a recording window by window.
+
+    Each window owns the span between the midpoints of its overlaps with
+    its neighbours. Transcript and sentiment segments are kept by the
+    window owning their midpoint; diarization turns are clipped to the
+    owned span. Together the chunks cover the recording exactly once.
+
+    Args:
+        audio_path: Path to audio file
+        window_s: Window length in seconds
+        overlap_s: Overlap between consecutive windows in seconds
+        profile: Inference profile for Whisper and sentiment (default: the
+            process profile)
+
+    Yields:
+        {
+            'index': int,
+            'start': float, 'end': float,          # owned span
+            'segments': [...],                     # transcript segments with 'speaker'
+            'diarization': [...],                  # global speaker labels
+            'sentiment': [...],                    # per_segment entries
+        }
+    """
+    stitcher = SpeakerStitcher()
+    windows = iter_audio_windows(audio_path, window_s, overlap_s)
+    current = next(windows, None)
+    index = 0
+    prev_end: Optional[float] = None
+
+    while current is not None:
+        offset, samples = current
+        following = next(windows, None)
+        window_end = offset + len(samples) / TARGET_SR
+
+        own_start = offset if index == 0 else offset + overlap_s / 2
+        own_end = window_end if following is None else following[0] + overlap_s / 2
+
+        transcript = transcribe_audio(samples, profile=profile)
+        segments = []
+        for seg in transcript["segments"]:
+            seg = dict(seg, start=seg["start"] + offset, end=seg["end"] + offset)
+            midpoint = (seg["start"] + seg["end"]) / 2
+            if own_start <= midpoint < own_end:
+                segments.append(seg)
+
+        turns = [
+            dict(turn, start=turn["start"] + offset, end=turn["end"] + offset)
+            for turn in diarize_speakers(samples, TARGET_SR)
+        ]
+        overlap_end = prev_end if prev_end is not None else offset
+        turns = stitcher.stitch(turns, offset, overlap_end)
+        diarization = []
+        for turn in turns:
+            start, end = max(turn["start"], own_start), min(turn["end"], own_end)
+            if end > start:
+                diarization.append(dict(turn, start=start, end=end))
+
+        # Attribute against the full window's turns, not just the owned span
+        segments = align_transcript({"segments": segments}, turns)["segments"]
+        sentiment = analyze_sentiment({
+            "segments": segments, **shifted_speech_regions(transcript, offset)
+        }, profile=profile)["per_segment"]
+
+        yield {
+            "index": index,
+            "start": own_start,
+            "end": own_end,
+            "segments": segments,
+            "diarization": diarization,
+            "sentiment": sentiment,
+        }
+
+        prev_end = window_end
+        current = following
+        index += 1
+
+
+def merge_stream_chunks(
+    chunks: Iterable[Dict[str, Any]]
+) -> Tuple[Dict[str, Any], List[Dict], Dict]:
+    """
+    Combine streamed chunks into the whole-file stage outputs.
+
+    Returns:
+        (transcript, diarization, sentiments) in the same shapes as
+        transcribe_audio, diarize_speakers and analyze_sentiment
+    """
+    segments: List[Dict] = []
+    diarization: List[Dict] = []
+    per_segment: List[Dict] = []
+    for chunk in chunks:
+        segments.extend(chunk["segments"])
+        diarization.extend(chunk["diarization"])
+        per_segment.extend(chunk["sentiment"])
+
+    transcript = {
+        "text": "".join(seg.get("text", "") for seg in segments),
+        "segments": segments,
+    }
+    return transcript, diarization, {"per_segment": per_segment}
@@ -0,0 +1,19 @@
+"""
+Scheduler predictions: skipped stages must make a plan faster.
+"""
+
+from core.scheduler import HostCosts, _make_plan, predict
+
+
+def test_skipping_sentiment_lowers_serial_prediction(tmp_path):
+    costs = HostCosts(path=str(tmp_path / "host_costs.json"), host="test")
+    full = _make_plan("draft", 1, ["embed", "identify"], costs)
+    skipped = _make_plan("draft", 1, ["embed", "identify", "sentiment"], costs)
+
+    full_s, full_stages = predict(full, 3600.0, costs, mode="serial")
+    skipped_s, skipped_stages = predict(skipped, 3600.0, costs, mode="serial")
+
+    assert skipped_s < full_s
+    assert "sentiment" in full_stages
+    assert "sentiment" not in skipped_stages
+